@@ -1,7 +1,41 @@
-from typing import Optional, List, Dict, Any
+import base64
+import calendar
+import json
+import os
+from typing import Iterator, Optional, List, Dict, Any
 from app.db.database import Database
+from app.db.rows import Linhas, Pagina, linhas, ndjson
+from app.core import clientes as core_clientes
+from app.core.disponibilidade import ABERTURA, FECHAMENTO, SLOT_MINUTOS, para_minutos
 from datetime import datetime
 
+# teto da duração de um agendamento (padrão: o expediente, como na
+# disponibilidade): limita o trecho do índice (funcionario_id, data,
+# inicio_min) que a checagem de conflito percorre
+DURACAO_MAXIMA = int(os.getenv("AGENDA_DURACAO_MAXIMA", str(FECHAMENTO - ABERTURA)))
+# maior duração que a checagem de conflito cobre; o startup só a aumenta
+# se o banco já tiver agendamentos mais longos que o teto
+janela_conflito = DURACAO_MAXIMA
+
+
+class ConflitoHorario(ValueError):
+    """O funcionário já tem um agendamento que se sobrepõe ao intervalo pedido."""
+
+    def __init__(self, agendamento_id: int, horario: str):
+        super().__init__(f"conflito com o agendamento {agendamento_id} às {horario}")
+        self.agendamento_id = agendamento_id
+        self.horario = horario
+
+
+class HorarioBloqueado(ValueError):
+    """Um bloqueio do funcionário cobre o intervalo pedido."""
+
+    def __init__(self, bloqueio: Dict[str, Any]):
+        super().__init__(f"horário coberto pelo bloqueio {bloqueio.get('id')}")
+        self.bloqueio = bloqueio
+        self.tipo_bloqueio = bloqueio.get("tipo_bloqueio") or "dia_completo"
+
+
 def buscar_proximos_agendamentos(
     db,
     data_referencia: str,
@@ -14,6 +48,7 @@ def buscar_proximos_agendamentos(
       SELECT a.id,
              a.data,
              a.horario,
+             a.duracao,
              c.nome AS cliente_nome,
              a.servico,
              f.nome AS funcionario,
@@ -36,122 +71,321 @@ def buscar_proximos_agendamentos(
     cols = [c[0] for c in cur.description]
     return [dict(zip(cols, row)) for row in cur.fetchall()]
 
-def listar_agendamentos_por_dia(db: Database, data_str: str) -> List[Dict[str, Any]]:
+# Campos da resposta das listagens de agenda: (campo, coluna da consulta)
+CAMPOS_AGENDAMENTO = (
+    ("data", "data"),
+    ("id", "id"),
+    ("horario", "horario"),
+    ("duracao", "duracao"),
+    ("cliente_nome", "cliente_nome"),
+    ("cliente", "cliente_nome"),
+    ("servico", "servico"),
+    ("funcionario", "funcionario"),
+    ("valor_previsto", "valor_previsto"),
+    ("aprovado", "aprovado"),
+    ("pago", "pago"),
+)
+
+# visão do dia (gestor) devolve o id primeiro
+CAMPOS_AGENDAMENTO_DIA = (("id", "id"),) + tuple(
+    c for c in CAMPOS_AGENDAMENTO if c[0] != "id"
+)
+
+
+def listar_agendamentos_por_dia(db: Database, data_str: str) -> Linhas:
     rows = db.get_agendamentos_por_dia(data_str)
-    return [
-        {
-            "id": r[0],
-            "data": r[0],
-            "horario": r[1],
-            "cliente_nome": r[2],
-            "cliente": r[2],
-            "servico": r[3],
-            "funcionario": r[4],
-            "valor_previsto": r[5],
-            "aprovado": r[6],
-            "pago": r[7] if len(r) > 7 else False,
-        }
-        for r in rows
-    ]
+    return linhas(db.cursor, rows, CAMPOS_AGENDAMENTO_DIA)
+
 
 def listar_agendamentos_por_dia_e_funcionario(
     db: Database,
     data_str: str,
     funcionario_id: int,
-) -> List[Dict[str, Any]]:
+) -> Linhas:
     rows = db.get_agendamentos_por_dia_e_funcionario(data_str, funcionario_id)
-    return [
-        {
-            "data": r[0],
-            "id": r[1],
-            "horario": r[2],
-            "cliente_nome": r[3],
-            "cliente": r[3],
-            "servico": r[4],
-            "funcionario": r[5],
-            "valor_previsto": r[6],
-            "aprovado": r[7],
-            "pago": r[8] if len(r) > 8 else False,
-        }
-        for r in rows
-    ]
+    return linhas(db.cursor, rows, CAMPOS_AGENDAMENTO)
+
 
 def listar_agendamentos_funcionario_periodo(
     db: Database,
     data_ini: str,
     data_fim: str,
     funcionario_id: int,
-) -> List[Dict[str, Any]]:
+) -> Linhas:
     """
     Lista agendamentos de um funcionário em um período (de data_ini até data_fim).
     """
     rows = db.get_agendamentos_funcionario_periodo(data_ini, data_fim, funcionario_id)
-    return [
-        {
-            "data": r[0],
-            "id": r[1],
-            "horario": r[2],
-            "cliente_nome": r[3],
-            "cliente": r[3],
-            "servico": r[4],
-            "funcionario": r[5],
-            "valor_previsto": r[6],
-            "aprovado": r[7],
-            "pago": r[8] if len(r) > 8 else False,
-        }
-        for r in rows
-    ]
+    return linhas(db.cursor, rows, CAMPOS_AGENDAMENTO)
+
 
-def listar_agendamentos_por_periodo(db: Database, data_ini: str, data_fim: str) -> List[Dict[str, Any]]:
+def listar_agendamentos_por_periodo(db: Database, data_ini: str, data_fim: str) -> Linhas:
     rows = db.get_agendamentos_por_periodo(data_ini, data_fim)
-    return [
-        {
-            "data": r[0],
-            "id": r[1],
-            "horario": r[2],
-            "cliente_nome": r[3],
-            "cliente": r[3],
-            "servico": r[4],
-            "funcionario": r[5],
-            "valor_previsto": r[6],
-            "aprovado": r[7],
-            "pago": r[8],
+    return linhas(db.cursor, rows, CAMPOS_AGENDAMENTO)
+
+
+def etag_agenda(
+    db: Database,
+    data_ini: str,
+    data_fim: str,
+    funcionario_id: Optional[int] = None,
+) -> str:
+    """
+    ETag das listagens do período, a partir das versões em agenda_versoes
+    (não lê agendamentos). Deve ser calculada ANTES de ler os dados: se uma
+    escrita cair entre as duas leituras, a ETag sai velha e o cliente só
+    baixa a lista de novo na próxima requisição.
+    """
+    return f'W/"{db.versao_agenda(data_ini, data_fim, funcionario_id)}"'
+
+
+def etag_confere(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match (lista separada por vírgulas ou "*") contém a ETag?"""
+    if not if_none_match:
+        return False
+    valor = etag.removeprefix("W/")
+    return any(
+        tag == "*" or tag.removeprefix("W/") == valor
+        for tag in (t.strip() for t in if_none_match.split(","))
+    )
+
+def periodo_do_mes(ano: int, mes: int) -> tuple:
+    """(primeiro dia, último dia) do mês, como YYYY-MM-DD."""
+    ultimo = calendar.monthrange(ano, mes)[1]
+    return f"{ano:04d}-{mes:02d}-01", f"{ano:04d}-{mes:02d}-{ultimo:02d}"
+
+
+def resumo_mensal(db: Database, ano: int, mes: int) -> Dict[str, Any]:
+    """
+    Totais por dia do mês, lidos de agenda_resumo_diario (no máximo 31
+    linhas; a tabela é mantida por gatilhos em agendamentos).
+    """
+    data_ini, data_fim = periodo_do_mes(ano, mes)
+    dias = []
+    totais = {"agendados": 0, "aprovados": 0, "pagos": 0, "valor_previsto": 0.0, "faturamento": 0.0}
+    for data, agendados, aprovados, pagos, valor_previsto, faturamento in db.resumo_diario(data_ini, data_fim):
+        # somas de float feitas aos poucos pelos gatilhos: arredonda centavos
+        dia = {
+            "data": data,
+            "agendados": agendados,
+            "aprovados": aprovados,
+            "pagos": pagos,
+            "valor_previsto": round(float(valor_previsto), 2),
+            "faturamento": round(float(faturamento), 2),
         }
-        for r in rows
-    ]
+        dias.append(dia)
+        for campo in totais:
+            totais[campo] += dia[campo]
+    totais["valor_previsto"] = round(totais["valor_previsto"], 2)
+    totais["faturamento"] = round(totais["faturamento"], 2)
+    return {"ano": ano, "mes": mes, "dias": dias, "totais": totais}
+
+
+# ---------- períodos longos: keyset e streaming ----------
+
+def codificar_cursor(chave) -> str:
+    """Chave (ex.: data, horario, id) -> cursor opaco para o parâmetro `after`."""
+    bruto = json.dumps(list(chave), separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(bruto).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str, tipos: tuple = (str, str, int)) -> tuple:
+    """
+    Inverso de codificar_cursor; `tipos` são os tipos esperados de cada
+    parte da chave. ValueError se o cursor for inválido.
+    """
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        chave = tuple(json.loads(bruto))
+    except Exception:
+        raise ValueError("cursor inválido")
+    if len(chave) != len(tipos) or not all(
+        type(v) is t for v, t in zip(chave, tipos)
+    ):
+        raise ValueError("cursor inválido")
+    return chave
+
+
+def paginar_agendamentos_periodo(
+    db: Database,
+    data_ini: str,
+    data_fim: str,
+    limite: int,
+    apos: Optional[str] = None,
+    funcionario_id: Optional[int] = None,
+) -> Pagina:
+    """Uma página de até `limite` agendamentos, continuando depois do cursor `apos`."""
+    cur = db.cursor_agendamentos_periodo(
+        data_ini,
+        data_fim,
+        funcionario_id,
+        decodificar_cursor(apos) if apos else None,
+        limite + 1,  # uma a mais só para saber se existe próxima página
+    )
+    try:
+        rows = cur.fetchall()
+        pagina = linhas(cur, rows[:limite], CAMPOS_AGENDAMENTO)
+    finally:
+        cur.close()
+
+    proximo = None
+    if len(rows) > limite:
+        ultima = rows[limite - 1]
+        proximo = codificar_cursor((ultima["data"], ultima["horario"], ultima["id"]))
+    return Pagina(pagina, proximo)
+
+
+def stream_agendamentos_periodo(
+    db: Database,
+    data_ini: str,
+    data_fim: str,
+    apos: Optional[str] = None,
+    funcionario_id: Optional[int] = None,
+    limite: Optional[int] = None,
+) -> Iterator[bytes]:
+    """Agendamentos do período em NDJSON, lidos do cursor em lotes."""
+    cur = db.cursor_agendamentos_periodo(
+        data_ini,
+        data_fim,
+        funcionario_id,
+        decodificar_cursor(apos) if apos else None,
+        limite,
+    )
+    return ndjson(cur, CAMPOS_AGENDAMENTO)
+
 
 def obter_ou_criar_cliente(db: Database, nome_cliente: str) -> int:
     """
-    Busca um cliente por nome. Se não existir, cria um novo em pré-cadastro.
+    Busca um cliente por nome (sem diferenciar maiúsculas, acentos e
+    espaços). Se não existir, cria um novo em pré-cadastro.
     Retorna o ID do cliente.
+
+    A criação é um INSERT ... ON CONFLICT DO NOTHING no índice único de
+    nome_normalizado: duas marcações simultâneas para um nome novo acabam
+    no mesmo cliente.
     """
-    print(f"\n🔍 obter_ou_criar_cliente: nome='{nome_cliente}'")
-    
-    # Buscar cliente existente
-    db.cursor.execute(
-        "SELECT id FROM clientes WHERE LOWER(nome) = LOWER(?)",
-        (nome_cliente.strip(),),
-    )
+    chave = core_clientes.normalizar_nome(nome_cliente)
+    # lida antes de resolver: edição confirmada no meio invalida o que guardarmos
+    versao = db.versoes_cache([core_clientes.VERSAO_CACHE])[core_clientes.VERSAO_CACHE]
+    cliente_id = core_clientes.cache_nomes.obter(chave, versao)
+    if cliente_id is not None:
+        return cliente_id
+
+    db.cursor.execute("SELECT id FROM clientes WHERE nome_normalizado = ?", (chave,))
     row = db.cursor.fetchone()
 
     if row:
         cliente_id = row[0]
-        print(f"✅ Cliente encontrado! ID: {cliente_id}")
-        return cliente_id
+    else:
+        cliente_id = db.inserir_ou_ignorar(
+            """
+            INSERT INTO clientes (nome, nome_normalizado, status, tem_ficha, data_criacao)
+            VALUES (?, ?, 'pre_cadastro', ?, datetime('now'))
+            ON CONFLICT (nome_normalizado) DO NOTHING
+            """,
+            (nome_cliente.strip(), chave, False),
+        )
+        if cliente_id is None:
+            # outra transação criou o mesmo nome entre o SELECT e o INSERT
+            db.cursor.execute("SELECT id FROM clientes WHERE nome_normalizado = ?", (chave,))
+            cliente_id = db.cursor.fetchone()[0]
+        db.commit()
+
+    db.apos_commit(lambda: core_clientes.cache_nomes.guardar(chave, cliente_id, versao))
+    return cliente_id
+
+
+def verificar_bloqueio(
+    db: Database,
+    funcionario_id: Optional[int],
+    data: str,
+    horario: str,
+    duracao: int,
+) -> None:
+    """
+    Levanta HorarioBloqueado se algum bloqueio do funcionário cobre o
+    intervalo horario + duracao. Roda na transação que grava o
+    agendamento, junto com verificar_conflito.
+    """
+    if funcionario_id is None:
+        return
+    bloqueio = db.verificar_bloqueio(funcionario_id, data, horario, duracao)
+    if bloqueio:
+        raise HorarioBloqueado(bloqueio)
+
+
+def validar_duracao(duracao: int) -> None:
+    if duracao > DURACAO_MAXIMA:
+        raise ValueError(f"duracao deve ser de no máximo {DURACAO_MAXIMA} minutos")
+
 
-    # Cliente não existe, cria novo
-    print(f"➕ Cliente não existe, criando novo...")
+def ajustar_janela_conflito(db: Database) -> Optional[int]:
+    """
+    Roda no startup: se algum agendamento gravado for mais longo que
+    DURACAO_MAXIMA (de antes do teto existir), alarga a janela da checagem
+    de conflito para não deixá-lo de fora. Devolve essa duração, ou None.
+    """
+    global janela_conflito
+    db.cursor.execute("SELECT MAX(fim_min - inicio_min) FROM agendamentos")
+    maior = db.cursor.fetchone()[0]
+    if maior is None or maior <= DURACAO_MAXIMA:
+        janela_conflito = DURACAO_MAXIMA
+        return None
+    janela_conflito = maior
+    return maior
+
+
+def verificar_conflito(
+    db: Database,
+    funcionario_id: Optional[int],
+    data: str,
+    inicio_min: Optional[int],
+    fim_min: Optional[int],
+    ignorar_id: Optional[int] = None,
+) -> None:
+    """
+    Levanta ConflitoHorario se [inicio_min, fim_min) se sobrepõe a outro
+    agendamento do funcionário no dia. Deve rodar dentro da transação
+    que grava o agendamento.
+
+    Nenhum agendamento passa de janela_conflito minutos, então só os que
+    começam entre inicio_min - janela_conflito e fim_min podem sobrepor:
+    uma faixa no índice (funcionario_id, data, inicio_min), de tamanho
+    fixo, seja qual for o número de agendamentos do dia. Dentro dela cada
+    um é comparado pelo intervalo inteiro, então sobreposições antigas,
+    de antes da checagem existir, não escondem um conflito. Agendamento
+    sem inicio_min (horário ilegível no banco) conta como conflito e tem
+    a sua própria busca no índice.
+    """
+    if funcionario_id is None:
+        return
+    if inicio_min is None:
+        raise ValueError("horario deve estar no formato HH:MM")
+    db.dialeto.travar_agenda(db.cursor, funcionario_id, data)
+
+    filtro, filtro_params = ("", []) if ignorar_id is None else (" AND id <> ?", [ignorar_id])
     db.cursor.execute(
         """
-        INSERT INTO clientes (nome, status, tem_ficha, data_criacao)
-        VALUES (?, 'pre_cadastro', 0, datetime('now'))
-        """,
-        (nome_cliente.strip(),),
+        SELECT id, horario
+        FROM agendamentos
+        WHERE funcionario_id = ? AND data = ? AND inicio_min IS NULL
+        """ + filtro + " LIMIT 1",
+        [funcionario_id, data, *filtro_params],
     )
-    db.conn.commit()
-    cliente_id = db.cursor.lastrowid
-    print(f"✅ Cliente criado! ID: {cliente_id}")
-    return cliente_id
+    conflito = db.cursor.fetchone()
+    if conflito is None:
+        db.cursor.execute(
+            """
+            SELECT id, horario
+            FROM agendamentos
+            WHERE funcionario_id = ? AND data = ?
+              AND inicio_min > ? AND inicio_min < ? AND fim_min > ?
+            """ + filtro + " ORDER BY inicio_min LIMIT 1",
+            [funcionario_id, data, inicio_min - janela_conflito, fim_min, inicio_min, *filtro_params],
+        )
+        conflito = db.cursor.fetchone()
+    if conflito is not None:
+        raise ConflitoHorario(conflito[0], conflito[1])
 
 
 def criar_agendamento(
@@ -163,42 +397,116 @@ def criar_agendamento(
     tipo: str = "tatuagem",
     valor_previsto: Optional[float] = None,
     funcionario_id: Optional[int] = None,
-) -> None:
+    duracao: Optional[int] = None,
+) -> int:
     """
     Cria um agendamento. Se o cliente não existir, cria automaticamente.
+    Cliente, agendamento e solicitação entram numa única transação, junto
+    com as checagens de bloqueio (HorarioBloqueado) e de conflito de
+    horário (ConflitoHorario).
     """
-    cliente_id = obter_ou_criar_cliente(db, cliente)
+    duracao = duracao or SLOT_MINUTOS
+    validar_duracao(duracao)
+    inicio_min = para_minutos(horario)
+    with db.transaction():
+        verificar_bloqueio(db, funcionario_id, data, horario, duracao)
+        verificar_conflito(
+            db,
+            funcionario_id,
+            data,
+            inicio_min,
+            inicio_min + duracao if inicio_min is not None else None,
+        )
+        cliente_id = obter_ou_criar_cliente(db, cliente)
 
-    aprovado = True
+        aprovado = True
 
-    # Só verifica requer_aprovacao se funcionario_id foi fornecido
-    if funcionario_id is not None:
-        row = db.obter_funcionario_por_id(funcionario_id)
-        if row is not None:
-            requer_aprovacao = row[5]
-            aprovado = not bool(requer_aprovacao)
+        # Só verifica requer_aprovacao se funcionario_id foi fornecido
+        if funcionario_id is not None:
+            row = db.obter_funcionario_por_id(funcionario_id)
+            if row is not None:
+                requer_aprovacao = row[5]
+                aprovado = not bool(requer_aprovacao)
 
-    db.criar_agendamento(
-        data,
-        horario,
-        cliente_id,
-        servico,
-        tipo,
-        valor_previsto,
-        funcionario_id,
-        aprovado,
-    )
+        agendamento_id = db.criar_agendamento(
+            data,
+            horario,
+            cliente_id,
+            servico,
+            tipo,
+            valor_previsto,
+            funcionario_id,
+            aprovado,
+            duracao=duracao,
+            inicio_min=inicio_min,
+        )
 
-    # Só cria solicitação se requer aprovação E tem funcionário
-    if not aprovado and funcionario_id is not None:
-        agendamento_id = db.cursor.lastrowid
-        agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        db.cursor.execute(
-            """
-            INSERT INTO solicitacoes
-                (tipo, agendamento_id, funcionario_id, data, horario, cliente_id, servico, status, data_solicitacao)
-            VALUES ('inclusao', ?, ?, ?, ?, ?, ?, 'pendente', ?)
-            """,
-            (agendamento_id, funcionario_id, data, horario, cliente_id, servico, agora),
+        # Só cria solicitação se requer aprovação E tem funcionário
+        if not aprovado and funcionario_id is not None:
+            agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            solicitacao_id = db.inserir(
+                """
+                INSERT INTO solicitacoes
+                    (tipo, agendamento_id, funcionario_id, data, horario, cliente_id, servico, status, data_solicitacao)
+                VALUES ('inclusao', ?, ?, ?, ?, ?, ?, 'pendente', ?)
+                """,
+                (agendamento_id, funcionario_id, data, horario, cliente_id, servico, agora),
+            )
+            db.emitir(
+                "solicitacao", "criada",
+                id=solicitacao_id, agendamento_id=agendamento_id,
+                data=data, horario=horario, funcionario_id=funcionario_id,
+            )
+    return agendamento_id
+
+
+def atualizar_agendamento(
+    db: Database,
+    agendamento_id: int,
+    data: str,
+    horario: str,
+    cliente: str,
+    servico: str,
+    valor_previsto: Optional[float] = None,
+    funcionario_id: Optional[int] = None,
+    duracao: Optional[int] = None,
+) -> bool:
+    """
+    Atualiza um agendamento (sem duração informada, mantém a atual);
+    devolve False se ele não existe. Levanta HorarioBloqueado se um bloqueio cobre o novo intervalo e
+    ConflitoHorario se ele se sobrepõe a outro agendamento do funcionário.
+    """
+    if duracao is not None:
+        validar_duracao(duracao)
+    inicio_min = para_minutos(horario)
+    with db.transaction():
+        db.cursor.execute("SELECT duracao FROM agendamentos WHERE id = ?", (agendamento_id,))
+        row = db.cursor.fetchone()
+        if row is None:
+            # nada de cliente novo nem checagens para um id inexistente
+            return False
+        if duracao is None:
+            duracao = row[0] or SLOT_MINUTOS
+
+        verificar_bloqueio(db, funcionario_id, data, horario, duracao)
+        verificar_conflito(
+            db,
+            funcionario_id,
+            data,
+            inicio_min,
+            inicio_min + duracao if inicio_min is not None else None,
+            ignorar_id=agendamento_id,
+        )
+        # agendamentos.cliente_id guarda o id do cliente, não o nome digitado
+        cliente_id = obter_ou_criar_cliente(db, cliente)
+        return db.atualizar_agendamento(
+            agendamento_id,
+            data,
+            horario,
+            cliente_id,
+            servico,
+            valor_previsto,
+            funcionario_id,
+            duracao=duracao,
+            inicio_min=inicio_min,
         )
-        db.conn.commit()
@@ -0,0 +1,274 @@
+"""
+Cache dos bloqueios por (funcionário, dia).
+
+Toda marcação e remarcação passa por `Database.verificar_bloqueio`; com o
+cache, um dia já consultado não relê os bloqueios até algum bloqueio
+daquele funcionário mudar (em qualquer worker): só confere a versão do
+funcionário em cache_versoes, uma busca pela chave primária. Cada
+entrada guarda todos os bloqueios que cobrem o dia (inclusive os por
+período), já com a máscara de slots, e a checagem vira um teste de bits
+em memória.
+
+`verificar_lote` responde vários (funcionário, dia, horário) de uma vez,
+para telas que mostram a semana ou testam horários candidatos.
+
+`listar_bloqueios_ativos` / `paginar_bloqueios_ativos` servem o
+GET /bloqueios/ativos, com filtro por funcionário e janela de datas.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from app.core.agenda import codificar_cursor, decodificar_cursor
+from app.core.disponibilidade import SLOT_MINUTOS, mascara_dia, para_minutos
+from app.db.rows import Linhas, Pagina, linhas
+
+# Campos de GET /bloqueios/ativos: (campo, coluna da consulta)
+CAMPOS_BLOQUEIO_ATIVO = (
+    ("id", "id"),
+    ("funcionario_id", "funcionario_id"),
+    ("funcionario_nome", "funcionario_nome"),
+    ("data", "data"),
+    ("tipo_bloqueio", "tipo_bloqueio"),
+    ("horarios_bloqueados", "horarios_bloqueados"),
+    ("motivo", "motivo"),
+    ("criado_em", "criado_em"),
+    ("data_fim", "data_fim"),
+)
+
+# compacto=true: só o que a grade precisa para pintar o bloqueio
+CAMPOS_BLOQUEIO_COMPACTO = (
+    ("id", "id"),
+    ("funcionario_id", "funcionario_id"),
+    ("data", "data"),
+    ("data_fim", "data_fim"),
+    ("tipo_bloqueio", "tipo_bloqueio"),
+    ("horarios_bloqueados", "horarios_bloqueados"),
+)
+
+# cursor de /bloqueios/ativos: (data, funcionario_id, id)
+TIPOS_CURSOR = (str, int, int)
+
+
+class CacheBloqueios:
+    """
+    LRU (funcionario_id, "YYYY-MM-DD") -> tupla de bloqueios do dia
+    (id, tipo_bloqueio, horarios_bloqueados, motivo, data, data_fim, mascara),
+    dia completo primeiro. Tupla vazia também é guardada: dia sem bloqueio
+    é o caso mais comum.
+
+    Cada entrada guarda a versão do funcionário em cache_versoes lida
+    antes dos bloqueios; `obter` só devolve a entrada se a versão atual
+    for a mesma. Toda escrita de bloqueio (criar, atualizar, remover, e a
+    remoção do funcionário) incrementa essa versão na própria transação,
+    então uma escrita feita em outro worker também invalida este cache.
+    As escritas deste processo ainda descartam as entradas na hora e
+    avançam a geração: uma leitura que começou antes não guarda o
+    resultado. Leituras feitas dentro de uma transação (a checagem da
+    marcação) também são guardadas, a menos que a própria transação
+    tenha escrito bloqueios do funcionário: só aí a leitura veria algo
+    ainda não confirmado.
+    """
+
+    def __init__(self, tamanho: int):
+        self.tamanho = tamanho
+        self._itens: OrderedDict = OrderedDict()
+        # funcionario_id -> datas em cache, para invalidar sem varrer o LRU
+        self._por_funcionario: dict = {}
+        self._lock = threading.Lock()
+        self._geracao = 0
+        self.hits = 0
+        self.misses = 0
+        self.desatualizados = 0
+        self.invalidacoes = 0
+
+    @property
+    def geracao(self) -> int:
+        return self._geracao
+
+    def obter(self, funcionario_id: int, data: str, versao: int) -> Optional[tuple]:
+        """Bloqueios do dia, se estão em cache e foram lidos na `versao` atual."""
+        chave = (funcionario_id, data)
+        with self._lock:
+            entrada = self._itens.get(chave)
+            if entrada is not None and entrada[0] != versao:
+                # escrita (talvez em outro worker) depois da leitura
+                self._itens.pop(chave)
+                self._descartar_indice(funcionario_id, data)
+                self.desatualizados += 1
+                entrada = None
+            if entrada is None:
+                self.misses += 1
+                return None
+            self._itens.move_to_end(chave)
+            self.hits += 1
+            return entrada[1]
+
+    def guardar(
+        self, funcionario_id: int, data: str, bloqueios: tuple, geracao: int, versao: int
+    ) -> None:
+        """
+        Guarda o que foi lido na `geracao` local e na `versao` do
+        funcionário informadas, se nada mudou neste processo desde então.
+        """
+        chave = (funcionario_id, data)
+        with self._lock:
+            if geracao != self._geracao:
+                return
+            self._itens[chave] = (versao, bloqueios)
+            self._itens.move_to_end(chave)
+            self._por_funcionario.setdefault(funcionario_id, set()).add(data)
+            if len(self._itens) > self.tamanho:
+                (func, dia), _ = self._itens.popitem(last=False)
+                self._descartar_indice(func, dia)
+
+    def esquecer(self, funcionario_id: int, data_ini: Optional[str] = None, data_fim: Optional[str] = None) -> None:
+        """Descarta os dias do funcionário em [data_ini, data_fim] (sem datas: todos)."""
+        with self._lock:
+            self._geracao += 1
+            self.invalidacoes += 1
+            datas = self._por_funcionario.get(funcionario_id)
+            if not datas:
+                return
+            if data_ini is None:
+                alvo = list(datas)
+            else:
+                data_fim = data_fim or data_ini
+                alvo = [d for d in datas if data_ini <= d <= data_fim]
+            for dia in alvo:
+                self._itens.pop((funcionario_id, dia), None)
+                self._descartar_indice(funcionario_id, dia)
+
+    def _descartar_indice(self, funcionario_id: int, data: str) -> None:
+        datas = self._por_funcionario.get(funcionario_id)
+        if datas is not None:
+            datas.discard(data)
+            if not datas:
+                del self._por_funcionario[funcionario_id]
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._geracao += 1
+            self._itens.clear()
+            self._por_funcionario.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "tamanho": len(self._itens),
+                "capacidade": self.tamanho,
+                "hits": self.hits,
+                "misses": self.misses,
+                "taxa_acerto": round(self.hits / consultas, 4) if consultas else None,
+                "desatualizados": self.desatualizados,
+                "invalidacoes": self.invalidacoes,
+            }
+
+
+cache_bloqueios = CacheBloqueios(int(os.getenv("BLOQUEIOS_CACHE_DIAS", "4096")))
+
+
+def chave_versao(funcionario_id: int) -> str:
+    """Chave em cache_versoes dos bloqueios do funcionário."""
+    return f"bloqueios:{funcionario_id}"
+
+
+def esquecer(db, funcionario_id: int, data_ini: Optional[str] = None, data_fim: Optional[str] = None) -> None:
+    # a versão vale para todos os workers; o descarte local, agora e de
+    # novo no commit, só libera a memória deste processo mais cedo
+    db.tocar_versao_cache(chave_versao(funcionario_id))
+    cache_bloqueios.esquecer(funcionario_id, data_ini, data_fim)
+    db.apos_commit(lambda: cache_bloqueios.esquecer(funcionario_id, data_ini, data_fim))
+
+
+def bloqueio_que_cobre(bloqueios: tuple, horario: str, duracao: Optional[int] = None) -> Optional[tuple]:
+    """Primeiro bloqueio do dia que cobre horario (+ duracao); dia completo vem antes."""
+    inicio = para_minutos(horario)
+    mascara = 0 if inicio is None else mascara_dia(inicio, inicio + (duracao or SLOT_MINUTOS))
+    return next(
+        (b for b in bloqueios if b[1] == "dia_completo" or (b[6] or 0) & mascara),
+        None,
+    )
+
+
+def como_dict(bloqueio: tuple) -> dict:
+    return {
+        "id": bloqueio[0],
+        "tipo_bloqueio": bloqueio[1],
+        "horarios_bloqueados": bloqueio[2],
+        "motivo": bloqueio[3],
+        "data": bloqueio[4],
+        "data_fim": bloqueio[5],
+    }
+
+
+def verificar_lote(db, candidatos: List[dict]) -> List[dict]:
+    """
+    Veredito para cada candidato {funcionario_id, data, horario, duracao?},
+    na ordem recebida. Os bloqueios de todos os (funcionário, dia) vêm de
+    uma chamada a db.bloqueios_por_dia (cache + no máximo uma consulta).
+    """
+    por_dia = db.bloqueios_por_dia((c["funcionario_id"], c["data"]) for c in candidatos)
+    resultado = []
+    for c in candidatos:
+        bloqueio = bloqueio_que_cobre(
+            por_dia[(c["funcionario_id"], c["data"])], c["horario"], c.get("duracao")
+        )
+        resultado.append({
+            "funcionario_id": c["funcionario_id"],
+            "data": c["data"],
+            "horario": c["horario"],
+            "bloqueado": bloqueio is not None,
+            "bloqueio": como_dict(bloqueio) if bloqueio is not None else None,
+        })
+    return resultado
+
+
+def listar_bloqueios_ativos(
+    db,
+    data_ini: str,
+    data_fim: Optional[str] = None,
+    funcionario_id: Optional[int] = None,
+    compacto: bool = False,
+) -> Linhas:
+    cur = db.cursor_bloqueios_ativos(data_ini, data_fim, funcionario_id)
+    try:
+        rows = cur.fetchall()
+        return linhas(cur, rows, CAMPOS_BLOQUEIO_COMPACTO if compacto else CAMPOS_BLOQUEIO_ATIVO)
+    finally:
+        cur.close()
+
+
+def paginar_bloqueios_ativos(
+    db,
+    data_ini: str,
+    limite: int,
+    apos: Optional[str] = None,
+    data_fim: Optional[str] = None,
+    funcionario_id: Optional[int] = None,
+    compacto: bool = False,
+) -> Pagina:
+    """Uma página de até `limite` bloqueios ativos, continuando depois do cursor `apos`."""
+    cur = db.cursor_bloqueios_ativos(
+        data_ini,
+        data_fim,
+        funcionario_id,
+        decodificar_cursor(apos, TIPOS_CURSOR) if apos else None,
+        limite + 1,  # uma a mais só para saber se existe próxima página
+    )
+    try:
+        rows = cur.fetchall()
+        pagina = linhas(
+            cur, rows[:limite], CAMPOS_BLOQUEIO_COMPACTO if compacto else CAMPOS_BLOQUEIO_ATIVO
+        )
+    finally:
+        cur.close()
+
+    proximo = None
+    if len(rows) > limite:
+        ultima = rows[limite - 1]
+        proximo = codificar_cursor((ultima[3], ultima[1], ultima[0]))
+    return Pagina(pagina, proximo)
@@ -0,0 +1,227 @@
+import os
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.db.database import Database
+from app.db.rows import Linhas, linhas
+
+
+def normalizar_nome(nome: str) -> str:
+    """'  José   da SILVA ' -> 'jose da silva' (minúsculas, sem acentos, espaços simples)."""
+    decomposto = unicodedata.normalize("NFKD", nome or "")
+    sem_acento = "".join(c for c in decomposto if not unicodedata.combining(c))
+    return " ".join(sem_acento.casefold().split())
+
+
+class CacheNomes:
+    """
+    LRU nome normalizado -> id do cliente, para marcações repetidas não
+    irem ao índice de clientes. Só recebe ids já confirmados
+    (db.apos_commit). Cada entrada guarda a versão "clientes" de
+    cache_versoes lida antes de resolver o nome; editar ou remover
+    cliente incrementa essa versão na própria transação, então a entrada
+    deixa de valer em todos os workers (o id não fica apontando para um
+    cliente removido ou renomeado em outro processo).
+    """
+
+    def __init__(self, tamanho: int):
+        self.tamanho = tamanho
+        self._itens: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str, versao: int) -> Optional[int]:
+        with self._lock:
+            entrada = self._itens.get(chave)
+            if entrada is None:
+                return None
+            if entrada[0] != versao:
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return entrada[1]
+
+    def guardar(self, chave: str, cliente_id: int, versao: int) -> None:
+        with self._lock:
+            self._itens[chave] = (versao, cliente_id)
+            self._itens.move_to_end(chave)
+            if len(self._itens) > self.tamanho:
+                self._itens.popitem(last=False)
+
+    def esquecer_cliente(self, cliente_id: int) -> None:
+        with self._lock:
+            for chave in [k for k, v in self._itens.items() if v[1] == cliente_id]:
+                del self._itens[chave]
+
+    def limpar(self) -> None:
+        with self._lock:
+            self._itens.clear()
+
+
+cache_nomes = CacheNomes(int(os.getenv("CLIENTES_CACHE_NOMES", "1024")))
+# chave de cache_nomes em cache_versoes
+VERSAO_CACHE = "clientes"
+
+# nome_normalizado é único: um nome que já pertence a outro cliente fica
+# NULL (cadastro manual de homônimo), e a marcação continua achando o antigo
+_NOME_NORMALIZADO_LIVRE = (
+    "CASE WHEN EXISTS (SELECT 1 FROM clientes WHERE nome_normalizado = ? AND id <> ?)"
+    " THEN NULL ELSE ? END"
+)
+
+
+def _esquecer(db: Database, cliente_id: int) -> None:
+    # a versão invalida o cache de todos os workers; o descarte local,
+    # agora e de novo no commit, só libera a memória deste processo
+    db.tocar_versao_cache(VERSAO_CACHE)
+    cache_nomes.esquecer_cliente(cliente_id)
+    db.apos_commit(lambda: cache_nomes.esquecer_cliente(cliente_id))
+
+
+CAMPOS_CLIENTE = tuple(
+    (c, c) for c in (
+        "id", "nome", "telefone", "email", "cpf", "endereco", "status", "tem_ficha",
+        "data_criacao", "data_cadastro", "informacao", "valor", "funcionario_id",
+    )
+)
+
+
+def listar_clientes(db: Database) -> Linhas:
+    db.cursor.execute(
+        f"""
+        SELECT {", ".join(c for c, _ in CAMPOS_CLIENTE)}
+        FROM clientes
+        ORDER BY nome ASC
+        """
+    )
+    return linhas(db.cursor, db.cursor.fetchall(), CAMPOS_CLIENTE)
+
+
+def cliente_existe(db: Database, cliente_id: int) -> bool:
+    db.cursor.execute("SELECT id FROM clientes WHERE id = ?", (cliente_id,))
+    return db.cursor.fetchone() is not None
+
+
+def criar_cliente(db: Database, data: dict) -> int:
+    normalizado = normalizar_nome(data.get("nome")) or None
+    cliente_id = db.inserir(
+        f"""
+        INSERT INTO clientes (nome, nome_normalizado, telefone, email, cpf, endereco, status, tem_ficha, data_criacao)
+        VALUES (?, {_NOME_NORMALIZADO_LIVRE}, ?, ?, ?, ?, ?, ?, datetime('now'))
+        """,
+        (
+            data.get("nome"),
+            normalizado, 0, normalizado,
+            data.get("telefone"),
+            data.get("email"),
+            data.get("cpf"),
+            data.get("endereco"),
+            data.get("status", "pre_cadastro"),
+            False,
+        ),
+    )
+    db.commit()
+    return cliente_id
+
+
+def atualizar_cliente(db: Database, cliente_id: int, data: dict) -> None:
+    normalizado = normalizar_nome(data.get("nome")) or None
+    db.cursor.execute(
+        f"""
+        UPDATE clientes
+        SET nome = ?, nome_normalizado = {_NOME_NORMALIZADO_LIVRE},
+            telefone = ?, email = ?, cpf = ?, endereco = ?, status = ?,
+            data_cadastro = ?, informacao = ?, valor = ?, funcionario_id = ?
+        WHERE id = ?
+        """,
+        (
+            data.get("nome"),
+            normalizado, cliente_id, normalizado,
+            data.get("telefone"),
+            data.get("email"),
+            data.get("cpf"),
+            data.get("endereco"),
+            data.get("status", "confirmado"),
+            data.get("data_cadastro"),
+            data.get("informacao"),
+            data.get("valor"),
+            data.get("funcionario_id"),
+            cliente_id,
+        ),
+    )
+    _esquecer(db, cliente_id)
+    # o nome do cliente aparece em toda a agenda
+    db.tocar_agenda_global()
+    db.emitir("cliente", "atualizado", id=cliente_id)
+    db.commit()
+
+
+def deletar_cliente(db: Database, cliente_id: int) -> None:
+    db.cursor.execute(
+        """
+        DELETE FROM clientes
+        WHERE id = ?
+        """,
+        (cliente_id,),
+    )
+    _esquecer(db, cliente_id)
+    db.tocar_agenda_global()
+    db.emitir("cliente", "removido", id=cliente_id)
+    db.commit()
+
+
+def registrar_ficha(db: Database, cliente_id: int, filepath: str) -> None:
+    db.cursor.execute(
+        """
+        UPDATE clientes
+        SET tem_ficha = ?, ficha_path = ?
+        WHERE id = ?
+        """,
+        (True, filepath, cliente_id),
+    )
+    db.commit()
+
+
+def listar_historico(db: Database, cliente_id: int) -> List[Dict[str, Any]]:
+    """
+    Histórico de atendimentos/pagamentos do cliente. Se a tabela
+    cliente_historico não existir, devolve lista vazia.
+    """
+    try:
+        db.cursor.execute(
+            """
+            SELECT id, tipo, descricao, valor, funcionario_id, data_registro
+            FROM cliente_historico
+            WHERE cliente_id = ?
+            ORDER BY data_registro DESC
+            """,
+            (cliente_id,),
+        )
+        rows = db.cursor.fetchall()
+    except sqlite3.OperationalError as e:
+        if "no such table: cliente_historico" in str(e):
+            rows = []
+        else:
+            raise
+
+    return [dict(row) for row in rows]
+
+
+def adicionar_historico(db: Database, cliente_id: int, data: dict) -> Optional[int]:
+    historico_id = db.inserir(
+        """
+        INSERT INTO cliente_historico (cliente_id, tipo, descricao, valor, funcionario_id, data_registro)
+        VALUES (?, ?, ?, ?, ?, datetime('now'))
+        """,
+        (
+            cliente_id,
+            data.get("tipo"),
+            data.get("descricao"),
+            data.get("valor"),
+            data.get("funcionario_id"),
+        ),
+    )
+    db.commit()
+    return historico_id
@@ -0,0 +1,88 @@
+"""
+Painel do gestor em uma requisição só.
+
+Junta o que o GestorApp buscava em quatro chamadas (próximos
+agendamentos, bloqueios ativos, funcionários, solicitações pendentes e
+faturamento de hoje/semana/mês), lido dentro de um único snapshot do
+banco. O JSON pronto fica em cache por alguns segundos, com a versão da
+agenda inteira (soma de agenda_versoes) como chave: agendamentos,
+bloqueios, solicitações e funcionários tocam essa versão na mesma
+transação da escrita, então uma escrita em qualquer worker descarta a
+entrada dos outros na próxima leitura.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Optional
+
+from app.core import agenda as core_agenda
+from app.core import funcionarios as core_funcionarios
+from app.core import solicitacoes as core_sol
+from app.db.database import Database
+
+CACHE_SEGUNDOS = float(os.getenv("DASHBOARD_CACHE_SEGUNDOS", "5"))
+
+_lock = threading.Lock()
+# (chave, expira_em, json em bytes); chave = (dia, versão da agenda)
+_cache: Optional[tuple] = None
+
+
+def _versao(db: Database) -> int:
+    # a agenda inteira, não só de hoje em diante: solicitações pendentes não
+    # têm limite de data e aprovar uma de dia passado toca aquele dia
+    return db.versao_agenda("", "9999-12-31")
+
+
+def _montar(db: Database, hoje: date) -> Dict[str, Any]:
+    hoje_str = hoje.strftime("%Y-%m-%d")
+    proximos = core_agenda.buscar_proximos_agendamentos(db, hoje_str)
+    bloqueios = db.listar_bloqueios_ativos(hoje_str)
+    funcionarios = core_funcionarios.listar_funcionarios(db)
+    solicitacoes = core_sol.listar_solicitacoes_pendentes(db)
+    total_hoje, total_semana, total_mes = db.calcularresumo(hoje)
+
+    return {
+        "data_referencia": hoje_str,
+        "proximos": proximos,
+        "bloqueios_ativos": bloqueios,
+        "funcionarios": funcionarios,
+        "solicitacoes_pendentes": solicitacoes,
+        "totais": {
+            "hoje": float(total_hoje or 0),
+            "semana": float(total_semana or 0),
+            "mes": float(total_mes or 0),
+        },
+    }
+
+
+def montar_dashboard_gestor(db: Database, hoje: date) -> Dict[str, Any]:
+    with db.leitura_consistente():
+        return _montar(db, hoje)
+
+
+def dashboard_gestor_json(db: Database, hoje: date) -> bytes:
+    """Dashboard serializado, do cache quando a versão da agenda não mudou desde a última montagem."""
+    global _cache
+    agora = time.monotonic()
+    # versão e dados no mesmo snapshot: a entrada guardada nunca é mais
+    # velha que a chave dela
+    with db.leitura_consistente():
+        chave = (hoje, _versao(db))
+        with _lock:
+            if _cache is not None and _cache[0] == chave and _cache[1] > agora:
+                return _cache[2]
+        dados = _montar(db, hoje)
+
+    corpo = json.dumps(dados, ensure_ascii=False, default=str).encode("utf-8")
+    with _lock:
+        _cache = (chave, agora + CACHE_SEGUNDOS, corpo)
+    return corpo
+
+
+def limpar_cache() -> None:
+    global _cache
+    with _lock:
+        _cache = None
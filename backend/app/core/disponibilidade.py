@@ -0,0 +1,294 @@
+"""
+Horários livres por funcionário e por dia.
+
+A grade do estúdio é de slots de SLOT_MINUTOS entre AGENDA_ABERTURA e
+AGENDA_FECHAMENTO (os mesmos "HH:MM" de 30 em 30 minutos usados nos
+bloqueios). Cada (funcionário, dia) vira uma máscara de bits com os slots
+ocupados por agendamentos e bloqueios, montada com uma consulta indexada
+por tabela para o período inteiro. Os inícios livres para um serviço de
+N slots são os bits em que N slots seguidos estão livres.
+"""
+
+import json
+import os
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from app.db.database import BLOQUEIO_COBRE, Database, dias_do_periodo, janela_bloqueios
+
+SLOT_MINUTOS = 30
+
+
+def para_minutos(hhmm: str) -> Optional[int]:
+    """"09:30" -> 570; None para valores fora do formato."""
+    try:
+        h, m = str(hhmm).strip().split(":")[:2]
+        return int(h) * 60 + int(m)
+    except (ValueError, AttributeError):
+        return None
+
+
+def _hhmm(minutos: int) -> str:
+    return f"{minutos // 60:02d}:{minutos % 60:02d}"
+
+
+ABERTURA = para_minutos(os.getenv("AGENDA_ABERTURA", "09:00"))
+FECHAMENTO = para_minutos(os.getenv("AGENDA_FECHAMENTO", "18:00"))
+TOTAL_SLOTS = (FECHAMENTO - ABERTURA) // SLOT_MINUTOS
+DIA_INTEIRO = (1 << TOTAL_SLOTS) - 1
+MAX_DIAS = int(os.getenv("AGENDA_DISPONIBILIDADE_MAX_DIAS", "120"))
+# a busca do próximo horário lê a ocupação em janelas deste tamanho
+BLOCO_BUSCA_DIAS = int(os.getenv("AGENDA_BUSCA_BLOCO_DIAS", "7"))
+
+# cargo livre no cadastro: o tipo de serviço casa com funcionários cujo
+# cargo contém o radical; cargos sem nenhum radical conhecido atendem tudo
+_RADICAIS_TIPO = {"tatuagem": "tatu", "piercing": "pierc"}
+
+
+def slots_necessarios(duracao_minutos: int) -> int:
+    """Quantidade de slots que um serviço ocupa (arredonda para cima)."""
+    return max(1, -(-int(duracao_minutos) // SLOT_MINUTOS))
+
+
+@lru_cache(maxsize=1024)
+def _bit(horario: str) -> int:
+    """Bit do slot que contém o horário; 0 se estiver fora do expediente."""
+    m = para_minutos(horario)
+    if m is None or m < ABERTURA or m >= FECHAMENTO:
+        return 0
+    return 1 << ((m - ABERTURA) // SLOT_MINUTOS)
+
+
+@lru_cache(maxsize=4096)
+def mascara_intervalo(inicio_min: int, fim_min: int) -> int:
+    """Slots tocados pelo intervalo [inicio_min, fim_min), dentro do expediente."""
+    primeiro = max(0, (inicio_min - ABERTURA) // SLOT_MINUTOS)
+    ultimo = min(TOTAL_SLOTS, -(-(fim_min - ABERTURA) // SLOT_MINUTOS))
+    if ultimo <= primeiro:
+        return 0
+    return ((1 << (ultimo - primeiro)) - 1) << primeiro
+
+
+# ---------- máscara do dia inteiro (gravada em bloqueios.mascara) ----------
+# bit i = slot que começa i * SLOT_MINUTOS após a meia-noite; não depende do
+# expediente configurado, então continua valendo se AGENDA_ABERTURA mudar
+
+SLOTS_DIA = 24 * 60 // SLOT_MINUTOS
+MASCARA_DIA_TODO = (1 << SLOTS_DIA) - 1
+
+
+def mascara_dia(inicio_min: int, fim_min: int) -> int:
+    """Slots do dia (a partir da meia-noite) tocados por [inicio_min, fim_min)."""
+    primeiro = max(0, inicio_min // SLOT_MINUTOS)
+    ultimo = min(SLOTS_DIA, -(-fim_min // SLOT_MINUTOS))
+    if ultimo <= primeiro:
+        return 0
+    return ((1 << (ultimo - primeiro)) - 1) << primeiro
+
+
+def mascara_dia_bloqueio(tipo_bloqueio: str, horarios_bloqueados) -> int:
+    """Máscara do dia inteiro de um bloqueio; é o que vai para bloqueios.mascara."""
+    if tipo_bloqueio == "dia_completo":
+        return MASCARA_DIA_TODO
+    try:
+        horarios = json.loads(horarios_bloqueados or "[]")
+    except (TypeError, ValueError):
+        return 0
+    mascara = 0
+    for h in horarios if isinstance(horarios, list) else ():
+        m = para_minutos(h)
+        if m is not None:
+            mascara |= mascara_dia(m, m + 1)
+    return mascara
+
+
+def do_expediente(mascara: int) -> int:
+    """Máscara do dia inteiro -> máscara da grade do expediente (DIA_INTEIRO)."""
+    deslocamento, resto = divmod(ABERTURA, SLOT_MINUTOS)
+    grade = mascara >> deslocamento
+    if resto:
+        # abertura fora do múltiplo do slot: cada slot da grade pega dois do dia
+        grade |= mascara >> (deslocamento + 1)
+    return grade & DIA_INTEIRO
+
+
+def inicios_livres(ocupados: int, n_slots: int) -> int:
+    """Bits dos slots onde começam `n_slots` slots livres seguidos."""
+    livres = ~ocupados & DIA_INTEIRO
+    inicios = livres
+    for i in range(1, n_slots):
+        inicios &= livres >> i
+    return inicios
+
+
+@lru_cache(maxsize=4096)
+def _horarios_da_mascara(mascara: int) -> tuple:
+    # poucos formatos distintos se repetem muito (ex.: dia todo livre)
+    return tuple(
+        _hhmm(ABERTURA + i * SLOT_MINUTOS)
+        for i in range(TOTAL_SLOTS)
+        if mascara >> i & 1
+    )
+
+
+def _ocupacao(cur, ini: str, fim: str, filtro: str = "", filtro_params=()) -> dict:
+    """
+    {(funcionario_id, dia): máscara dos slots ocupados} no período, com uma
+    consulta indexada em agendamentos e outra em bloqueios. `filtro` é
+    anexado ao WHERE das duas (ex.: " AND funcionario_id = ?").
+    """
+    params = [ini, fim, *filtro_params]
+    ocupados: dict = {}
+
+    cur.execute(
+        "SELECT funcionario_id, data, horario, inicio_min, fim_min FROM agendamentos "
+        "WHERE data BETWEEN ? AND ?" + filtro,
+        params,
+    )
+    for func, dia, horario, inicio, fim_min in cur.fetchall():
+        chave = (func, dia)
+        mascara = mascara_intervalo(inicio, fim_min) if inicio is not None else _bit(horario)
+        ocupados[chave] = ocupados.get(chave, 0) | mascara
+
+    cur.execute(
+        "SELECT funcionario_id, data, data_fim, mascara FROM bloqueios "
+        "WHERE " + BLOQUEIO_COBRE + filtro,
+        [*janela_bloqueios(ini, fim), *filtro_params],
+    )
+    for func, inicio, fim_bloqueio, mascara in cur.fetchall():
+        grade = do_expediente(mascara or 0)
+        # bloqueio por período: só os dias que caem dentro da consulta
+        for dia in dias_do_periodo(max(inicio, ini), min(fim_bloqueio or inicio, fim)):
+            chave = (func, dia)
+            ocupados[chave] = ocupados.get(chave, 0) | grade
+    return ocupados
+
+
+def calcular_disponibilidade(
+    db: Database,
+    data_ini: date,
+    data_fim: date,
+    duracao_minutos: int = SLOT_MINUTOS,
+    funcionario_id: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Horários de início livres para um serviço de `duracao_minutos`, por
+    funcionário e por dia, entre data_ini e data_fim (inclusive).
+    """
+    ini, fim = data_ini.isoformat(), data_fim.isoformat()
+
+    cur = db.cursor
+    if funcionario_id is not None:
+        cur.execute("SELECT id, nome FROM funcionarios WHERE id = ?", (funcionario_id,))
+    else:
+        cur.execute("SELECT id, nome FROM funcionarios ORDER BY id")
+    funcionarios = cur.fetchall()
+
+    if funcionario_id is not None:
+        ocupados = _ocupacao(cur, ini, fim, " AND funcionario_id = ?", (funcionario_id,))
+    else:
+        ocupados = _ocupacao(cur, ini, fim)
+
+    n_slots = slots_necessarios(duracao_minutos)
+    dias = [
+        (data_ini + timedelta(days=i)).isoformat()
+        for i in range((data_fim - data_ini).days + 1)
+    ]
+    dia_livre = _horarios_da_mascara(inicios_livres(0, n_slots))
+
+    resultado = []
+    for func_id, nome in funcionarios:
+        por_dia = {}
+        for dia in dias:
+            mascara = ocupados.get((func_id, dia))
+            por_dia[dia] = (
+                dia_livre if mascara is None
+                else _horarios_da_mascara(inicios_livres(mascara, n_slots))
+            )
+        resultado.append({"funcionario_id": func_id, "funcionario": nome, "dias": por_dia})
+
+    return {
+        "data_ini": ini,
+        "data_fim": fim,
+        "duracao": duracao_minutos,
+        "slot_minutos": SLOT_MINUTOS,
+        "abertura": _hhmm(ABERTURA),
+        "fechamento": _hhmm(FECHAMENTO),
+        "funcionarios": resultado,
+    }
+
+
+def _atende(cargo: Optional[str], tipo: Optional[str]) -> bool:
+    radical = _RADICAIS_TIPO.get((tipo or "").strip().lower())
+    if radical is None:
+        return True
+    cargo = (cargo or "").lower()
+    return radical in cargo or not any(r in cargo for r in _RADICAIS_TIPO.values())
+
+
+def _slots_passados(agora: datetime) -> int:
+    """Máscara dos slots de hoje que já começaram."""
+    minutos = agora.hour * 60 + agora.minute
+    if minutos < ABERTURA:
+        return 0
+    return mascara_intervalo(ABERTURA, minutos + 1)
+
+
+def buscar_proximos_horarios(
+    db: Database,
+    duracao_minutos: int = SLOT_MINUTOS,
+    tipo: Optional[str] = None,
+    funcionario_id: Optional[int] = None,
+    a_partir: Optional[date] = None,
+    limite: int = 5,
+    agora: Optional[datetime] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Os `limite` primeiros horários livres (data, horário) a partir de
+    `a_partir`, entre os funcionários que atendem o `tipo`. Avança em
+    janelas de BLOCO_BUSCA_DIAS dias, até MAX_DIAS, e para na primeira
+    janela que completa o limite.
+    """
+    agora = agora or datetime.now()
+    inicio = max(a_partir or agora.date(), agora.date())
+    n_slots = slots_necessarios(duracao_minutos)
+
+    cur = db.cursor
+    if funcionario_id is not None:
+        cur.execute("SELECT id, nome, cargo FROM funcionarios WHERE id = ?", (funcionario_id,))
+    else:
+        cur.execute("SELECT id, nome, cargo FROM funcionarios ORDER BY id")
+    funcionarios = [(f_id, nome) for f_id, nome, cargo in cur.fetchall() if _atende(cargo, tipo)]
+    if not funcionarios:
+        return []
+    marcadores = ", ".join("?" for _ in funcionarios)
+    ids = [f_id for f_id, _ in funcionarios]
+
+    encontrados: List[Dict[str, Any]] = []
+    hoje = agora.date()
+    for bloco in range(0, MAX_DIAS, BLOCO_BUSCA_DIAS):
+        ini = inicio + timedelta(days=bloco)
+        fim = inicio + timedelta(days=min(bloco + BLOCO_BUSCA_DIAS, MAX_DIAS) - 1)
+        ocupados = _ocupacao(
+            cur, ini.isoformat(), fim.isoformat(),
+            f" AND funcionario_id IN ({marcadores})", ids,
+        )
+        for i in range((fim - ini).days + 1):
+            dia = ini + timedelta(days=i)
+            dia_str = dia.isoformat()
+            passados = _slots_passados(agora) if dia == hoje else 0
+            do_dia = []
+            for f_id, nome in funcionarios:
+                livres = inicios_livres(ocupados.get((f_id, dia_str), 0) | passados, n_slots)
+                do_dia.extend(
+                    (horario, f_id, nome) for horario in _horarios_da_mascara(livres)
+                )
+            # mais cedo primeiro; no mesmo horário, na ordem dos funcionários
+            for horario, f_id, nome in sorted(do_dia, key=lambda h: h[0]):
+                encontrados.append(
+                    {"data": dia_str, "horario": horario, "funcionario_id": f_id, "funcionario": nome}
+                )
+                if len(encontrados) >= limite:
+                    return encontrados
+    return encontrados
@@ -74,16 +74,15 @@ def salvar_funcionario(
         db.atualizar_funcionario(func_id, nome, cargo, perc_funcionario, req, senha)
         return func_id
     else:
-        novo_id = db.criar_funcionario(nome, cargo, perc_funcionario, req, senha)
-        
-        # NOVO: cria usuário automaticamente se tiver senha
-        if senha:
-            tipo_usuario = "admin" if cargo == "Administrador" else "funcionario"
-            db.cursor.execute(
-                "INSERT OR IGNORE INTO usuarios (login, senha, tipo, funcionario_id) VALUES (?, ?, ?, ?)",
-                (nome, senha, tipo_usuario, novo_id)
-            )
-            db.conn.commit()
-
-        
+        with db.transaction():
+            novo_id = db.criar_funcionario(nome, cargo, perc_funcionario, req, senha)
+
+            # NOVO: cria usuário automaticamente se tiver senha
+            if senha:
+                tipo_usuario = "admin" if cargo == "Administrador" else "funcionario"
+                db.cursor.execute(
+                    "INSERT OR IGNORE INTO usuarios (login, senha, tipo, funcionario_id) VALUES (?, ?, ?, ?)",
+                    (nome, senha, tipo_usuario, novo_id)
+                )
+
         return novo_id
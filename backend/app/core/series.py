@@ -0,0 +1,243 @@
+"""
+Séries de agendamentos: uma tatuagem grande em várias sessões.
+
+A série inteira é gravada numa transação: cliente resolvido uma vez,
+bloqueios e conflitos de todas as datas checados numa única consulta,
+sessões inseridas com executemany. Cada ocorrência volta com o próprio
+status ("criado", "bloqueado", "conflito", "repetido"); com
+`atomica=True`, basta uma ocorrência com problema para nada ser gravado.
+"""
+
+import calendar
+import json
+import os
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from app.core.agenda import obter_ou_criar_cliente, validar_duracao
+from app.core.disponibilidade import SLOT_MINUTOS, mascara_dia, para_minutos
+from app.db.database import BLOQUEIO_COBRE, Database, janela_bloqueios
+
+MAX_OCORRENCIAS = int(os.getenv("AGENDA_SERIE_MAX_OCORRENCIAS", "52"))
+
+
+def _somar_meses(inicio: date, meses: int) -> date:
+    # mesmo dia do mês; 31/01 + 1 mês vira o último dia de fevereiro
+    mes = inicio.month - 1 + meses
+    ano, mes = inicio.year + mes // 12, mes % 12 + 1
+    return date(ano, mes, min(inicio.day, calendar.monthrange(ano, mes)[1]))
+
+
+def datas_da_regra(
+    inicio: date,
+    frequencia: str = "semanal",
+    intervalo: int = 1,
+    ocorrencias: Optional[int] = None,
+    ate: Optional[date] = None,
+) -> List[date]:
+    """
+    Datas de uma recorrência (diaria | semanal | mensal, a cada `intervalo`),
+    até `ocorrencias` sessões ou até a data `ate`. ValueError se a regra
+    for inválida ou passar de MAX_OCORRENCIAS.
+    """
+    if ocorrencias is None and ate is None:
+        raise ValueError("Informe 'ocorrencias' ou 'ate' na recorrência")
+    if intervalo < 1:
+        raise ValueError("intervalo deve ser >= 1")
+
+    datas: List[date] = []
+    i = 0
+    while True:
+        if frequencia == "mensal":
+            atual = _somar_meses(inicio, i * intervalo)
+        elif frequencia == "semanal":
+            atual = inicio + timedelta(weeks=i * intervalo)
+        elif frequencia == "diaria":
+            atual = inicio + timedelta(days=i * intervalo)
+        else:
+            raise ValueError("frequencia deve ser 'diaria', 'semanal' ou 'mensal'")
+
+        if ate is not None and atual > ate:
+            break
+        if ocorrencias is not None and len(datas) >= ocorrencias:
+            break
+        datas.append(atual)
+        if len(datas) > MAX_OCORRENCIAS:
+            raise ValueError(f"A série passa do limite de {MAX_OCORRENCIAS} sessões")
+        i += 1
+    return datas
+
+
+def _ocupacao(db: Database, funcionario_id: int, datas: List[str]):
+    """Agendamentos e bloqueios do funcionário em todas as datas, numa consulta."""
+    marcadores = ", ".join("?" for _ in datas)
+    db.cursor.execute(
+        f"""
+        SELECT 'agendamento', data, NULL, id, horario, inicio_min, fim_min, NULL
+        FROM agendamentos
+        WHERE funcionario_id = ? AND data IN ({marcadores})
+        UNION ALL
+        SELECT 'bloqueio', data, data_fim, id, NULL, NULL, NULL, mascara
+        FROM bloqueios
+        WHERE funcionario_id = ? AND {BLOQUEIO_COBRE}
+        """,
+        [funcionario_id, *datas, funcionario_id, *janela_bloqueios(min(datas), max(datas))],
+    )
+    agendamentos: Dict[str, list] = {}
+    bloqueios: Dict[str, list] = {}
+    pedidas = set(datas)
+    for origem, dia, dia_fim, reg_id, horario, ini, fim, mascara in db.cursor.fetchall():
+        if origem == "agendamento":
+            agendamentos.setdefault(dia, []).append((reg_id, horario, ini, fim))
+            continue
+        # bloqueio por período: só as datas da série que ele cobre
+        for coberto in (d for d in pedidas if dia <= d <= (dia_fim or dia)):
+            bloqueios.setdefault(coberto, []).append((reg_id, mascara or 0))
+    return agendamentos, bloqueios
+
+
+def criar_serie(
+    db: Database,
+    datas: List[date],
+    horario: str,
+    cliente: str,
+    servico: str,
+    tipo: str = "tatuagem",
+    valor_previsto: Optional[float] = None,
+    funcionario_id: Optional[int] = None,
+    duracao: Optional[int] = None,
+    regra: Optional[Dict[str, Any]] = None,
+    atomica: bool = False,
+) -> Dict[str, Any]:
+    """
+    Cria as sessões da série que estão livres e devolve
+    {"serie_id", "criados", "ocorrencias": [{data, horario, status, ...}]}.
+    """
+    if not datas:
+        raise ValueError("A série precisa de pelo menos uma data")
+    if len(datas) > MAX_OCORRENCIAS:
+        raise ValueError(f"A série passa do limite de {MAX_OCORRENCIAS} sessões")
+    inicio_min = para_minutos(horario)
+    if inicio_min is None:
+        raise ValueError("horario deve estar no formato HH:MM")
+    duracao = duracao or SLOT_MINUTOS
+    validar_duracao(duracao)
+    fim_min = inicio_min + duracao
+    mascara = mascara_dia(inicio_min, fim_min)
+
+    dias = [d.isoformat() for d in datas]
+    distintos = sorted(set(dias))
+
+    with db.transaction():
+        agendamentos: Dict[str, list] = {}
+        bloqueios: Dict[str, list] = {}
+        if funcionario_id is not None:
+            db.dialeto.travar_agenda_dias(db.cursor, funcionario_id, distintos)
+            agendamentos, bloqueios = _ocupacao(db, funcionario_id, distintos)
+
+        ocorrencias = []
+        vistos = set()
+        for dia in dias:
+            ocorrencia = {"data": dia, "horario": horario, "status": "criado"}
+            if dia in vistos:
+                ocorrencia["status"] = "repetido"
+            else:
+                vistos.add(dia)
+                bloqueio = next(
+                    (b for b in bloqueios.get(dia, ()) if b[1] & mascara),
+                    None,
+                )
+                # sem inicio_min (horário ilegível no banco) conta como conflito
+                conflito = next(
+                    (
+                        a for a in agendamentos.get(dia, ())
+                        if a[2] is None or (a[2] < fim_min and a[3] > inicio_min)
+                    ),
+                    None,
+                )
+                if bloqueio is not None:
+                    ocorrencia.update(status="bloqueado", bloqueio_id=bloqueio[0])
+                elif conflito is not None:
+                    ocorrencia.update(
+                        status="conflito", agendamento_id=conflito[0], horario_conflito=conflito[1]
+                    )
+            ocorrencias.append(ocorrencia)
+
+        livres = [o for o in ocorrencias if o["status"] == "criado"]
+        if atomica and len(livres) < len(ocorrencias):
+            for o in livres:
+                o["status"] = "nao_criado"
+            livres = []
+        if not livres:
+            return {"serie_id": None, "criados": 0, "ocorrencias": ocorrencias}
+
+        cliente_id = obter_ou_criar_cliente(db, cliente)
+        aprovado = True
+        if funcionario_id is not None:
+            row = db.obter_funcionario_por_id(funcionario_id)
+            if row is not None:
+                aprovado = not bool(row[5])
+
+        serie_id = db.inserir(
+            """
+            INSERT INTO agendamento_series
+                (cliente_id, funcionario_id, servico, tipo, horario, duracao, valor_previsto, regra)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                cliente_id, funcionario_id, servico, tipo, horario, duracao, valor_previsto,
+                json.dumps(regra, default=str) if regra else None,
+            ),
+        )
+        db.cursor.executemany(
+            """
+            INSERT INTO agendamentos
+                (data, horario, cliente_id, servico, tipo,
+                valor_previsto, funcionario_id, aprovado, status,
+                duracao, inicio_min, fim_min, serie_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pre_cadastro', ?, ?, ?, ?)
+            """,
+            [
+                (
+                    o["data"], horario, cliente_id, servico, tipo, valor_previsto,
+                    funcionario_id, 1 if aprovado else 0,
+                    duracao, inicio_min, fim_min, serie_id,
+                )
+                for o in livres
+            ],
+        )
+        db.cursor.execute(
+            "SELECT id, data FROM agendamentos WHERE serie_id = ?", (serie_id,)
+        )
+        ids = {dia: ag_id for ag_id, dia in db.cursor.fetchall()}
+        for o in livres:
+            o["agendamento_id"] = ids[o["data"]]
+
+        if not aprovado and funcionario_id is not None:
+            agora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            db.cursor.executemany(
+                """
+                INSERT INTO solicitacoes
+                    (tipo, agendamento_id, funcionario_id, data, horario, cliente_id, servico, status, data_solicitacao)
+                VALUES ('inclusao', ?, ?, ?, ?, ?, ?, 'pendente', ?)
+                """,
+                [
+                    (o["agendamento_id"], funcionario_id, o["data"], horario, cliente_id, servico, agora)
+                    for o in livres
+                ],
+            )
+
+        db.tocar_agenda_varios([(o["data"], funcionario_id) for o in livres])
+        for o in livres:
+            db.emitir(
+                "agendamento", "criado",
+                id=o["agendamento_id"], data=o["data"], horario=horario,
+                funcionario_id=funcionario_id, serie_id=serie_id,
+            )
+        if not aprovado and funcionario_id is not None:
+            db.emitir(
+                "solicitacao", "criada",
+                serie_id=serie_id, data=livres[0]["data"], funcionario_id=funcionario_id,
+            )
+
+    return {"serie_id": serie_id, "criados": len(livres), "ocorrencias": ocorrencias}
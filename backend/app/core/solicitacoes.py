@@ -27,6 +27,14 @@ def listar_solicitacoes_pendentes(db: Database) -> List[Dict[str, Any]]:
         for r in rows
     ]
 
+def _emitir(db: Database, acao: str, solicitacao_id: int, agendamento_id: int, chave) -> None:
+    data, funcionario_id = chave or (None, None)
+    db.emitir(
+        "solicitacao", acao,
+        id=solicitacao_id, agendamento_id=agendamento_id,
+        data=data, funcionario_id=funcionario_id,
+    )
+
 def aprovar_solicitacao(db: Database, solicitacao_id: int) -> Dict[str, Any]:
     db.cursor.execute(
         "SELECT agendamento_id FROM solicitacoes WHERE id = ?",
@@ -43,13 +51,15 @@ def aprovar_solicitacao(db: Database, solicitacao_id: int) -> Dict[str, Any]:
         "UPDATE agendamentos SET aprovado = 1 WHERE id = ?",
         (agendamento_id,)
     )
+    chave = db.tocar_agendamento(agendamento_id)
+    _emitir(db, "aprovada", solicitacao_id, agendamento_id, chave)
 
     # marca solicitação como aprovada
     db.cursor.execute(
         "UPDATE solicitacoes SET status = 'aprovado' WHERE id = ?",
         (solicitacao_id,)
     )
-    db.conn.commit()
+    db.commit()
     return {"ok": True}
 
 def rejeitar_solicitacao(db: Database, solicitacao_id: int) -> Dict[str, Any]:
@@ -64,6 +74,8 @@ def rejeitar_solicitacao(db: Database, solicitacao_id: int) -> Dict[str, Any]:
     agendamento_id = row[0]
 
     # deleta agendamento
+    chave = db.tocar_agendamento(agendamento_id)
+    _emitir(db, "rejeitada", solicitacao_id, agendamento_id, chave)
     db.cursor.execute(
         "DELETE FROM agendamentos WHERE id = ?",
         (agendamento_id,)
@@ -74,5 +86,5 @@ def rejeitar_solicitacao(db: Database, solicitacao_id: int) -> Dict[str, Any]:
         "UPDATE solicitacoes SET status = 'rejeitado' WHERE id = ?",
         (solicitacao_id,)
     )
-    db.conn.commit()
+    db.commit()
     return {"ok": True}
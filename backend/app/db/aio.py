@@ -0,0 +1,36 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncDatabase:
+    """
+    Acesso ao banco para rotas `async def`.
+
+    Cada chamada pega uma conexão do Storage e roda a função síncrona
+    (ex.: uma função do core) num executor dedicado, então o event loop
+    nunca fica parado esperando o SQLite ou o disco.
+
+        clientes = await adb.run(core_clientes.listar_clientes, somente_leitura=True)
+    """
+
+    def __init__(self, storage, max_workers: int):
+        self.storage = storage
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="db"
+        )
+
+    async def run(self, fn, *args, somente_leitura: bool = False, **kwargs):
+        """Executa `fn(db, *args, **kwargs)` no executor e devolve o resultado."""
+        def tarefa():
+            with self.storage.checkout(somente_leitura=somente_leitura) as db:
+                return fn(db, *args, **kwargs)
+
+        # run_in_executor não propaga contextvars (ex.: a rota da requisição
+        # usada pela instrumentação das consultas)
+        contexto = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, contexto.run, tarefa)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
@@ -1,34 +1,176 @@
 import os
-import sqlite3
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from contextlib import contextmanager
 from datetime import date, timedelta
 
+from app.db import eventos
+from app.db.dialect import SQLITE
+from app.db.sqlite import conectar_sqlite
+
+# Bloqueios valem de `data` até `data_fim` (inclusive). Com o período
+# limitado a BLOQUEIO_MAX_DIAS, "algum bloqueio cobre [ini, fim]?" vira um
+# intervalo no índice (funcionario_id, data, data_fim):
+#     data BETWEEN ini - (BLOQUEIO_MAX_DIAS - 1) AND fim AND data_fim >= ini
+BLOQUEIO_MAX_DIAS = int(os.getenv("BLOQUEIO_MAX_DIAS", "366"))
+BLOQUEIO_COBRE = "data BETWEEN ? AND ? AND data_fim >= ?"
+
+
+def janela_bloqueios(data_ini: str, data_fim: str) -> tuple:
+    """Parâmetros de BLOQUEIO_COBRE para o período [data_ini, data_fim]."""
+    try:
+        minimo = date.fromisoformat(data_ini) - timedelta(days=BLOQUEIO_MAX_DIAS - 1)
+    except (TypeError, ValueError):
+        # data fora do formato: só casa com bloqueio que começa nela
+        return (data_ini, data_fim, data_ini)
+    return (minimo.isoformat(), data_fim, data_ini)
+
+
+def dias_do_periodo(data_ini: str, data_fim: str) -> list:
+    """["YYYY-MM-DD", ...] de data_ini a data_fim (inclusive)."""
+    try:
+        ini, fim = date.fromisoformat(data_ini), date.fromisoformat(data_fim or data_ini)
+    except (TypeError, ValueError):
+        return [data_ini]
+    return [(ini + timedelta(days=i)).isoformat() for i in range((fim - ini).days + 1)]
+
+
+# Pares de agendamentos do mesmo funcionário que se sobrepõem no dia.
+# Agendamento sem inicio_min (horário ilegível) entra em par com todos os
+# do dia, como na checagem de conflito. Servem as marcações anteriores à
+# checagem, que o gestor precisa remarcar à mão.
+SOBREPOSICOES = """
+    SELECT a.id, b.id, a.funcionario_id, a.data, a.horario, b.horario
+    FROM agendamentos a
+    JOIN agendamentos b
+      ON b.funcionario_id = a.funcionario_id AND b.data = a.data AND b.id > a.id
+     AND (a.inicio_min IS NULL OR b.inicio_min IS NULL
+          OR (b.inicio_min < a.fim_min AND b.fim_min > a.inicio_min))
+    WHERE a.data >= ?
+    ORDER BY a.data, a.funcionario_id, a.id, b.id
+"""
+
+
 class Database:
-    def __init__(self):
-        database_url = os.getenv("DATABASE_URL")
-        self.is_postgres = False  # Força SQLite por enquanto
-        
-        # Comentado por enquanto
-        # if database_url:
-        #     ...PostgreSQL...
-        
-        # Usa sempre SQLite
-        self.conn = sqlite3.connect("studio_tattoo.db", check_same_thread=False)
-        self.conn.row_factory = sqlite3.Row
+    def __init__(self, conn=None):
+        # Com conn: handle de um checkout do pool (um cursor por checkout).
+        # Sem conn: abre uma conexão própria (uso avulso/scripts), no
+        # PostgreSQL se DATABASE_URL estiver definida.
+        if conn is None:
+            database_url = os.getenv("DATABASE_URL")
+            if database_url:
+                from app.db.postgres import conectar_postgres
+
+                conn = conectar_postgres(database_url)
+            else:
+                conn = conectar_sqlite()
+
+        self.conn = conn
+        self.dialeto = getattr(conn, "dialeto", SQLITE)
+        self.is_postgres = self.dialeto.nome == "postgres"
         self.cursor = self.conn.cursor()
-        print("✅ Conectado ao SQLite local")
+        self._nivel_transacao = 0
+        self._eventos: list = []
+        self._apos_commit: list = []
+        # chaves de cache_versoes incrementadas pela transação em curso
+        self._versoes_tocadas: set = set()
+
+    # ---------- transações ----------
+
+    @contextmanager
+    def transaction(self):
+        """
+        Unidade de trabalho: tudo que roda dentro do bloco (métodos do
+        Database e funções do core) vira uma única transação, com um só
+        commit no fim. Blocos aninhados entram na transação mais externa;
+        qualquer exceção desfaz tudo.
+        """
+        if self._nivel_transacao == 0:
+            self.dialeto.iniciar_escrita(self.cursor)
+        self._nivel_transacao += 1
+        try:
+            yield self
+        except BaseException:
+            self._nivel_transacao -= 1
+            if self._nivel_transacao == 0:
+                self.conn.rollback()
+                self._eventos.clear()
+                self._apos_commit.clear()
+                self._versoes_tocadas.clear()
+            raise
+        self._nivel_transacao -= 1
+        if self._nivel_transacao == 0:
+            self.conn.commit()
+            self._publicar_eventos()
+
+    @contextmanager
+    def leitura_consistente(self):
+        """
+        Várias consultas vendo o mesmo estado do banco (um snapshot só),
+        sem travar escritas. Dentro de transaction() apenas reaproveita a
+        transação em curso.
+        """
+        if self._nivel_transacao:
+            yield self
+            return
+        self.dialeto.iniciar_leitura(self.cursor)
+        try:
+            yield self
+        finally:
+            # só leitura: encerra o snapshot sem nada a gravar
+            self.conn.rollback()
+
+    def commit(self):
+        """Commit imediato; dentro de transaction() fica para o fim do bloco."""
+        if self._nivel_transacao == 0:
+            self.conn.commit()
+            self._publicar_eventos()
+
+    # ---------- eventos de mudança (SSE) ----------
+
+    def apos_commit(self, fn):
+        """
+        Roda `fn()` quando a transação em curso for confirmada (na hora, fora
+        de transaction()); um rollback a descarta. Para caches em memória
+        não guardarem linhas que podem não existir.
+        """
+        if self._nivel_transacao == 0:
+            fn()
+        else:
+            self._apos_commit.append(fn)
 
+    def emitir(self, tipo: str, acao: str, **dados):
+        """
+        Registra um evento para `/eventos/stream`; só é publicado no próximo
+        commit (um rollback dentro de transaction() o descarta).
+        """
+        self._eventos.append((tipo, {"acao": acao, **dados}))
+
+    def _publicar_eventos(self):
+        self._versoes_tocadas.clear()
+        funcoes, self._apos_commit = self._apos_commit, []
+        for fn in funcoes:
+            fn()
+        pendentes, self._eventos = self._eventos, []
+        for tipo, dados in pendentes:
+            eventos.broker.publicar(tipo, dados)
 
     # ---------- helpers genéricos ----------
 
+    def inserir(self, sql: str, params=()) -> int:
+        """Executa um INSERT e devolve o id gerado (lastrowid / RETURNING id)."""
+        return self.dialeto.inserir(self.cursor, sql, params)
+
+    def inserir_ou_ignorar(self, sql: str, params=()) -> int | None:
+        """INSERT ... ON CONFLICT DO NOTHING: id gerado, ou None se a linha já existia."""
+        return self.dialeto.inserir_ou_ignorar(self.cursor, sql, params)
+
     def get_one(self, table: str, where: dict):
         """Pega um único registro WHERE."""
         if not where:
             raise ValueError("where não pode ser vazio em get_one")
         where_clause = " AND ".join([f"{k}=?" for k in where.keys()])
         query = f"SELECT * FROM {table} WHERE {where_clause}"
-        row = self.conn.execute(query, list(where.values())).fetchone()
+        self.cursor.execute(query, list(where.values()))
+        row = self.cursor.fetchone()
         if row is None:
             return None
         return dict(row)
@@ -48,202 +190,119 @@ class Database:
             placeholders = ", ".join(["?" for _ in data])
             query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders})"
             values = list(data.values())
-        self.conn.execute(query, values)
+        self.cursor.execute(query, values)
 
-    # ---------- criação de tabelas ----------
+    # ---------- versões da agenda (ETag) ----------
+    # Cada escrita incrementa a versão do (data, funcionario_id) que tocou,
+    # antes do commit da escrita, então versão e dados mudam juntos.
 
-    def create_tables(self):
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS config (
-                id INTEGER PRIMARY KEY,
-                nome_estudio TEXT DEFAULT 'Estúdio Tatuagem',
-                cor_primaria TEXT DEFAULT '#FF4500',
-                cor_secundaria TEXT DEFAULT '#FFD700',
-                logo_path TEXT
-            )
-        """
-        )
+    _TOCAR = (
+        " ON CONFLICT (data, funcionario_id)"
+        " DO UPDATE SET versao = agenda_versoes.versao + 1"
+    )
 
+    def tocar_agenda(self, data_str: str, funcionario_id: int | None = None):
+        """Incrementa a versão de (data, funcionario_id)."""
         self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS funcionarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT,
-                cargo TEXT,
-                porcentagem REAL DEFAULT 0.7,
-                perc_estudio REAL DEFAULT 30,
-                perc_funcionario REAL DEFAULT 70,
-                requer_aprovacao INTEGER DEFAULT 1,
-                senha TEXT
-            )
-        """
+            "INSERT INTO agenda_versoes (data, funcionario_id, versao) VALUES (?, ?, 1)"
+            + self._TOCAR,
+            (data_str, funcionario_id or 0),
         )
 
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS bloqueios_funcionario (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                funcionario_id INTEGER NOT NULL,
-                data DATE,
-                horario_inicio TIME,
-                horario_fim TIME,
-                tipo TEXT DEFAULT 'dia',
-                motivo TEXT,
-                data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
-            )
-        """
+    def tocar_agenda_varios(self, chaves):
+        """tocar_agenda para vários (data, funcionario_id) com um executemany."""
+        self.cursor.executemany(
+            "INSERT INTO agenda_versoes (data, funcionario_id, versao) VALUES (?, ?, 1)"
+            + self._TOCAR,
+            [(data_str, funcionario_id or 0) for data_str, funcionario_id in chaves],
         )
 
-        self.cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS bloqueios_funcionario (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            funcionario_id INTEGER NOT NULL,
-            data DATE,
-            horario_inicio TIME,
-            horario_fim TIME,
-            tipo TEXT DEFAULT 'dia',
-            motivo TEXT,
-            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
-        )
-    """
-    )
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS bloqueios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                funcionario_id INTEGER NOT NULL,
-                data TEXT NOT NULL,
-                tipo_bloqueio TEXT NOT NULL,
-                horarios_bloqueados TEXT,
-                motivo TEXT,
-                criado_em TEXT,
-                FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
-            )
-            """
-        )
+    def tocar_agenda_global(self):
+        """Versão global: muda a ETag de toda a agenda (nomes de cliente/funcionário)."""
+        self.tocar_agenda("*", 0)
 
+    def _tocar_por_id(self, tabela: str, registro_id: int):
+        # versão do dia/funcionário em que o registro está agora; em updates
+        # que mudam data/funcionário, chame antes e depois da escrita.
+        # Devolve (data, funcionario_id) do registro, ou None se não existe.
         self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS bloqueios_historico (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                gestor_id INTEGER NOT NULL,
-                funcionario_id INTEGER NOT NULL,
-                data TEXT NOT NULL,
-                tipo_bloqueio TEXT NOT NULL,      -- 'dia_completo' ou 'horarios_especificos'
-                horarios_bloqueados TEXT,         -- JSON string com horários, se aplicável
-                acao TEXT NOT NULL,               -- 'bloquear' ou 'desbloquear'
-                motivo TEXT,
-                criado_em TEXT DEFAULT (datetime('now'))
-            )
-            """
+            f"SELECT data, funcionario_id FROM {tabela} WHERE id = ?", (registro_id,)
         )
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        self.tocar_agenda(row[0], row[1])
+        return row[0], row[1]
 
-        
-        self.conn.commit()
+    def tocar_agendamento(self, agendamento_id: int):
+        return self._tocar_por_id("agendamentos", agendamento_id)
+
+    def tocar_bloqueio(self, bloqueio_id: int):
+        # bloqueio por período muda a versão de cada dia coberto; os mesmos
+        # dias saem do cache de bloqueios (agora e no commit)
+        from app.core import bloqueios as core_bloqueios
 
         self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS agendamentos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                data TEXT,
-                horario TEXT,
-                cliente TEXT,
-                funcionario_id INTEGER,
-                servico TEXT,
-                pago INTEGER DEFAULT 0,
-                valor_previsto REAL,
-                aprovado INTEGER DEFAULT 0,
-                cancelado_solicitado INTEGER DEFAULT 0,
-                tipo TEXT DEFAULT 'tatuagem'
-            )
-        """
+            "SELECT data, data_fim, funcionario_id FROM bloqueios WHERE id = ?", (bloqueio_id,)
         )
-
+        row = self.cursor.fetchone()
+        if row is None:
+            return None
+        data, data_fim, funcionario_id = row
+        self.tocar_agenda_varios([(dia, funcionario_id) for dia in dias_do_periodo(data, data_fim)])
+        core_bloqueios.esquecer(self, funcionario_id, data, data_fim)
+        return data, funcionario_id
+
+    def tocar_versao_cache(self, chave: str):
+        """Incrementa a versão de um cache em memória (tabela cache_versoes)."""
+        self._versoes_tocadas.add(chave)
         self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS pagamentos (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                agendamento_id INTEGER,
-                valor REAL,
-                data_pagto TEXT
-            )
-        """
+            "INSERT INTO cache_versoes (chave, versao) VALUES (?, 1)"
+            " ON CONFLICT (chave) DO UPDATE SET versao = cache_versoes.versao + 1",
+            (chave,),
         )
 
+    def versoes_cache(self, chaves) -> dict:
+        """{chave: versão atual} das chaves pedidas (0 se nunca foi tocada)."""
+        chaves = list(dict.fromkeys(chaves))
+        if not chaves:
+            return {}
+        marcadores = ", ".join("?" for _ in chaves)
         self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS usuarios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                login TEXT NOT NULL UNIQUE,
-                senha TEXT NOT NULL,
-                tipo TEXT NOT NULL,
-                funcionario_id INTEGER NULL
-            )
-        """
+            f"SELECT chave, versao FROM cache_versoes WHERE chave IN ({marcadores})", chaves
         )
+        versoes = dict.fromkeys(chaves, 0)
+        versoes.update((chave, versao) for chave, versao in self.cursor.fetchall())
+        return versoes
 
-        # usuário gestor padrão (cria ou garante senha) - agora como superadmin
-        self.cursor.execute("SELECT id FROM usuarios WHERE login = ?", ("gestor",))
-        row = self.cursor.fetchone()
-        if not row:
-            self.cursor.execute(
-                """
-                INSERT INTO usuarios (login, senha, tipo, funcionario_id)
-                VALUES (?, ?, 'superadmin', NULL)
-                """,
-                ("gestor", "2512"),
-            )
-        else:
-            self.cursor.execute(
-                """
-                UPDATE usuarios
-                SET senha = ?, tipo = 'superadmin', funcionario_id = NULL
-                WHERE login = ?
-                """,
-                ("2512", "gestor"),
-            )
-
-        self.cursor.execute("INSERT OR IGNORE INTO config (id) VALUES (1)")
-        self.conn.commit()
-
-        self.cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS solicitacoes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                tipo TEXT,
-                agendamento_id INTEGER,
-                funcionario_id INTEGER,
-                data TEXT,
-                horario TEXT,
-                cliente TEXT,
-                servico TEXT,
-                status TEXT DEFAULT 'pendente',
-                data_solicitacao TEXT
-            )
+    def versao_agenda(self, data_ini: str, data_fim: str, funcionario_id: int | None = None) -> int:
         """
-        )
+        Soma das versões no período (+ a global). Como versões só crescem,
+        qualquer escrita no período muda a soma.
+        """
+        sql = "SELECT COALESCE(SUM(versao), 0) FROM agenda_versoes WHERE data = '*' OR (data BETWEEN ? AND ?"
+        params = [data_ini, data_fim]
+        if funcionario_id is not None:
+            sql += " AND funcionario_id = ?"
+            params.append(funcionario_id)
+        self.cursor.execute(sql + ")", params)
+        return self.cursor.fetchone()[0]
 
+    def resumo_diario(self, data_ini: str, data_fim: str):
+        """Linhas de agenda_resumo_diario do período (uma por dia com agendamento)."""
         self.cursor.execute(
             """
-            CREATE TABLE IF NOT EXISTS clientes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                nome TEXT NOT NULL,
-                telefone TEXT,
-                email TEXT,
-                cpf TEXT,
-                endereco TEXT,
-                data_criacao TEXT,
-                status TEXT DEFAULT 'pre_cadastro'
-            )
-        """
+            SELECT data, agendados, aprovados, pagos, valor_previsto, faturamento
+            FROM agenda_resumo_diario
+            WHERE data BETWEEN ? AND ? AND agendados > 0
+            ORDER BY data
+            """,
+            (data_ini, data_fim),
         )
+        return self.cursor.fetchall()
 
-        self.cursor.execute("INSERT OR IGNORE INTO config (id) VALUES (1)")
-        self.conn.commit()
+    # ---------- tabelas extras ----------
+    # (o schema principal é criado/migrado por app.db.migrations)
 
     def criar_tabelas_tatuagem(self):
         self.cursor.execute(
@@ -264,184 +323,48 @@ class Database:
             )
         """
         )
-        self.conn.commit()
-
-    def aplicar_migracoes_simples(self):
-        # funcionarios
-        self.cursor.execute("PRAGMA table_info(funcionarios)")
-        cols_func = [c[1] for c in self.cursor.fetchall()]
-        if "perc_estudio" not in cols_func:
-            self.cursor.execute(
-                "ALTER TABLE funcionarios ADD COLUMN perc_estudio REAL DEFAULT 30"
-            )
-        if "perc_funcionario" not in cols_func:
-            self.cursor.execute(
-                "ALTER TABLE funcionarios ADD COLUMN perc_funcionario REAL DEFAULT 70"
-            )
-        if "requer_aprovacao" not in cols_func:
-            self.cursor.execute(
-                "ALTER TABLE funcionarios ADD COLUMN requer_aprovacao INTEGER DEFAULT 1"
-            )
-        if "senha" not in cols_func:
-            self.cursor.execute(
-                "ALTER TABLE funcionarios ADD COLUMN senha TEXT"
-            )
-
-        # agendamentos
-        self.cursor.execute("PRAGMA table_info(agendamentos)")
-        cols_ag = [c[1] for c in self.cursor.fetchall()]
-        if "cliente_id" not in cols_ag:
-            self.cursor.execute(
-                "ALTER TABLE agendamentos ADD COLUMN cliente_id INTEGER"
-            )
-        if "status" not in cols_ag:
-            self.cursor.execute(
-                "ALTER TABLE agendamentos ADD COLUMN status TEXT DEFAULT 'pre_cadastro'"
-            )
-
-        # clientes (mantém o que já existe)
-        self.cursor.execute("PRAGMA table_info(clientes)")
-        cols_clientes = [c[1] for c in self.cursor.fetchall()]
-        if "status" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN status TEXT DEFAULT 'pre_cadastro'"
-            )
-        if "tem_ficha" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN tem_ficha BOOLEAN DEFAULT FALSE"
-            )
-        # ... resto das colunas de clientes que você já tem ...
-
-        self.conn.commit()
-
-
-        # clientes
-        self.cursor.execute("PRAGMA table_info(clientes)")
-        cols_clientes = [c[1] for c in self.cursor.fetchall()]
-        if "status" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN status TEXT DEFAULT 'pre_cadastro'"
-            )
-        if "tem_ficha" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN tem_ficha BOOLEAN DEFAULT FALSE"
-            )
-        if "data_cadastro" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN data_cadastro DATE"
-            )
-        if "celular" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN celular TEXT"
-            )
-        if "alergias" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN alergias TEXT"
-            )
-        if "usa_pomada_anestesica" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN usa_pomada_anestesica TEXT"
-            )
-        if "fuma" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN fuma TEXT"
-            )
-        if "bebe" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN bebe TEXT"
-            )
-        if "procedimento" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN procedimento TEXT"
-            )
-        if "endereco" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN endereco TEXT"
-            )
-        if "informacao" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN informacao TEXT"
-            )
-        if "valor" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN valor REAL"
-            )
-        if "funcionario_id" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN funcionario_id INTEGER"
-            )
-
-        self.conn.commit()
-
-
-        # agendamentos
-        self.cursor.execute("PRAGMA table_info(agendamentos)")
-        cols_ag = [c[1] for c in self.cursor.fetchall()]
-        if "valor_previsto" not in cols_ag:
-            self.cursor.execute(
-                "ALTER TABLE agendamentos ADD COLUMN valor_previsto REAL"
-            )
-        if "aprovado" not in cols_ag:
-            self.cursor.execute(
-                "ALTER TABLE agendamentos ADD COLUMN aprovado INTEGER DEFAULT 0"
-            )
-        if "cancelado_solicitado" not in cols_ag:
-            self.cursor.execute(
-                "ALTER TABLE agendamentos ADD COLUMN cancelado_solicitado INTEGER DEFAULT 0"
-            )
-        if "tipo" not in cols_ag:
-            self.cursor.execute(
-                "ALTER TABLE agendamentos ADD COLUMN tipo TEXT DEFAULT 'tatuagem'"
-            )
-        if "status" not in cols_ag:
-            self.cursor.execute(
-                "ALTER TABLE agendamentos ADD COLUMN status TEXT DEFAULT 'pre_cadastro'"
-            )
-
-        # clientes
-        self.cursor.execute("PRAGMA table_info(clientes)")
-        cols_clientes = [c[1] for c in self.cursor.fetchall()]
-        if "status" not in cols_clientes:
-            self.cursor.execute(
-                "ALTER TABLE clientes ADD COLUMN status TEXT DEFAULT 'pre_cadastro'"
-            )
-
-        self.conn.commit()
+        self.commit()
 
     # ---------- autenticação ----------
 
     def autenticar_usuario(self, login: str, senha: str):
-        if self.is_postgres:
-            # PostgreSQL usa %s
-            self.cursor.execute(
-                """
-                SELECT id, login, tipo, funcionario_id
-                FROM usuarios
-                WHERE login = %s AND senha = %s
-                """,
-                (login, senha),
-            )
-        else:
-            # SQLite usa ?
-            self.cursor.execute(
-                """
-                SELECT id, login, tipo, funcionario_id
-                FROM usuarios
-                WHERE login = ? AND senha = ?
-                """,
-                (login, senha),
-            )
+        # `?` serve para os dois bancos: o cursor do PostgreSQL traduz para %s
+        self.cursor.execute(
+            """
+            SELECT id, login, tipo, funcionario_id
+            FROM usuarios
+            WHERE login = ? AND senha = ?
+            """,
+            (login, senha),
+        )
         return self.cursor.fetchone()
 
     # ---------- métodos usados pela agenda ----------
+    def listar_sobreposicoes(self, data_ini: str = ""):
+        """Agendamentos sobrepostos (ver SOBREPOSICOES) a partir de data_ini."""
+        self.cursor.execute(SOBREPOSICOES, (data_ini,))
+        return [
+            {
+                "agendamento_id": row[0],
+                "outro_id": row[1],
+                "funcionario_id": row[2],
+                "data": row[3],
+                "horario": row[4],
+                "outro_horario": row[5],
+            }
+            for row in self.cursor.fetchall()
+        ]
+
     def get_agendamentos_por_dia(self, data_str):
         self.cursor.execute(
             """
             SELECT a.id,
+                a.data,
                 a.horario,
-                c.nome,
+                a.duracao,
+                c.nome AS cliente_nome,
                 a.servico,
-                f.nome,
+                f.nome AS funcionario,
                 a.valor_previsto,
                 a.aprovado,
                 a.pago
@@ -466,13 +389,16 @@ class Database:
         funcionario_id,
         aprovado=True,
         status: str = "pre_cadastro",
+        duracao: int = 30,
+        inicio_min: int | None = None,
     ):
-        self.cursor.execute(
+        novo_id = self.inserir(
             """
             INSERT INTO agendamentos
                 (data, horario, cliente_id, servico, tipo,
-                valor_previsto, funcionario_id, aprovado, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                valor_previsto, funcionario_id, aprovado, status,
+                duracao, inicio_min, fim_min)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
             (
                 data_str,
@@ -484,9 +410,18 @@ class Database:
                 funcionario_id,
                 1 if aprovado else 0,
                 status,
+                duracao,
+                inicio_min,
+                inicio_min + duracao if inicio_min is not None else None,
             ),
         )
-        self.conn.commit()
+        self.tocar_agenda(data_str, funcionario_id)
+        self.emitir(
+            "agendamento", "criado",
+            id=novo_id, data=data_str, horario=horario, funcionario_id=funcionario_id,
+        )
+        self.commit()
+        return novo_id
 
     def atualizar_agendamento(
         self,
@@ -497,7 +432,11 @@ class Database:
         servico: str,
         valor_previsto: float | None,
         funcionario_id: int | None,
+        duracao: int = 30,
+        inicio_min: int | None = None,
     ) -> bool:
+        # versão do dia/funcionário de origem e do de destino
+        anterior = self.tocar_agendamento(agendamento_id)
         self.cursor.execute(
             """
             UPDATE agendamentos
@@ -506,7 +445,10 @@ class Database:
                 cliente_id = ?,
                 servico = ?,
                 valor_previsto = ?,
-                funcionario_id = ?
+                funcionario_id = ?,
+                duracao = ?,
+                inicio_min = ?,
+                fim_min = ?
             WHERE id = ?
             """,
             (
@@ -516,19 +458,42 @@ class Database:
                 servico,
                 valor_previsto,
                 funcionario_id,
+                duracao,
+                inicio_min,
+                inicio_min + duracao if inicio_min is not None else None,
                 agendamento_id,
             ),
         )
-        self.conn.commit()
-        return self.cursor.rowcount > 0
+        alterados = self.cursor.rowcount
+        if alterados:
+            self.tocar_agenda(data_str, funcionario_id)
+            # trocou de funcionário: o antigo também precisa saber
+            destinos = {funcionario_id}
+            if anterior:
+                destinos.add(anterior[1])
+            for func in destinos:
+                self.emitir(
+                    "agendamento", "atualizado",
+                    id=agendamento_id, data=data_str, horario=horario, funcionario_id=func,
+                    anterior=dict(zip(("data", "funcionario_id"), anterior)) if anterior else None,
+                )
+        self.commit()
+        return alterados > 0
 
     def remover_agendamento(self, agendamento_id: int) -> bool:
+        chave = self.tocar_agendamento(agendamento_id)
         self.cursor.execute(
             "DELETE FROM agendamentos WHERE id = ?",
             (agendamento_id,),
         )
-        self.conn.commit()
-        return self.cursor.rowcount > 0
+        removidos = self.cursor.rowcount
+        if chave and removidos:
+            self.emitir(
+                "agendamento", "removido",
+                id=agendamento_id, data=chave[0], funcionario_id=chave[1],
+            )
+        self.commit()
+        return removidos > 0
 
     def get_agendamentos_por_dia_e_funcionario(self, data_str, funcionario_id):
         self.cursor.execute(
@@ -537,9 +502,10 @@ class Database:
                 a.data,
                 a.id,
                 a.horario,
-                c.nome,
+                a.duracao,
+                c.nome AS cliente_nome,
                 a.servico,
-                f.nome,
+                f.nome AS funcionario,
                 a.valor_previsto,
                 a.aprovado,
                 a.pago
@@ -560,9 +526,10 @@ class Database:
                 a.data,
                 a.id,
                 a.horario,
-                c.nome,
+                a.duracao,
+                c.nome AS cliente_nome,
                 a.servico,
-                f.nome,
+                f.nome AS funcionario,
                 a.valor_previsto,
                 a.aprovado,
                 a.pago
@@ -583,9 +550,10 @@ class Database:
                 a.data,
                 a.id,
                 a.horario,
-                c.nome,
+                a.duracao,
+                c.nome AS cliente_nome,
                 a.servico,
-                f.nome,
+                f.nome AS funcionario,
                 a.valor_previsto,
                 a.aprovado,
                 a.pago
@@ -600,12 +568,64 @@ class Database:
         )
         return self.cursor.fetchall()
 
+    def cursor_agendamentos_periodo(
+        self,
+        data_ini: str,
+        data_fim: str,
+        funcionario_id: int | None = None,
+        apos: tuple | None = None,
+        limite: int | None = None,
+    ):
+        """
+        Agendamentos do período na ordem de keyset (data, horario, id), num
+        cursor próprio para ser lido em lotes. `apos` é a chave
+        (data, horario, id) da última linha já entregue.
+        """
+        sql = """
+            SELECT
+                a.data,
+                a.id,
+                a.horario,
+                a.duracao,
+                c.nome AS cliente_nome,
+                a.servico,
+                f.nome AS funcionario,
+                a.valor_previsto,
+                a.aprovado,
+                a.pago
+            FROM agendamentos a
+            LEFT JOIN clientes c ON c.id = a.cliente_id
+            LEFT JOIN funcionarios f ON a.funcionario_id = f.id
+            WHERE a.data BETWEEN ? AND ?
+        """
+        params: list = [data_ini, data_fim]
+        if funcionario_id is not None:
+            sql += " AND a.funcionario_id = ?"
+            params.append(funcionario_id)
+        if apos is not None:
+            sql += " AND (a.data, a.horario, a.id) > (?, ?, ?)"
+            params.extend(apos)
+        sql += " ORDER BY a.data ASC, a.horario ASC, a.id ASC"
+        if limite is not None:
+            sql += " LIMIT ?"
+            params.append(limite)
+
+        cur = self.dialeto.cursor_em_lotes(self.conn)
+        cur.execute(sql, params)
+        return cur
+
     def marcar_agendamento_como_pago(self, agendamento_id):
         self.cursor.execute(
             "UPDATE agendamentos SET pago = 1 WHERE id = ?",
             (agendamento_id,),
         )
-        self.conn.commit()
+        chave = self.tocar_agendamento(agendamento_id)
+        if chave:
+            self.emitir(
+                "agendamento", "pagamento",
+                id=agendamento_id, data=chave[0], funcionario_id=chave[1], pago=True,
+            )
+        self.commit()
 
     # ---------- FUNCIONÁRIOS ----------
 
@@ -641,7 +661,7 @@ class Database:
         senha: str | None = None,
     ):
         perc_estudio = 100.0 - perc_funcionario
-        self.cursor.execute(
+        novo_id = self.inserir(
             """
             INSERT INTO funcionarios
                 (nome, cargo, perc_funcionario, perc_estudio,
@@ -650,8 +670,11 @@ class Database:
         """,
             (nome, cargo, perc_funcionario, perc_estudio, requer_aprovacao, senha),
         )
-        self.conn.commit()
-        return self.cursor.lastrowid
+        # funcionário novo entra nas listas (painel do gestor) sem tocar dia nenhum
+        self.tocar_agenda_global()
+        self.emitir("funcionario", "criado", funcionario_id=novo_id)
+        self.commit()
+        return novo_id
 
     def atualizar_funcionario(
         self,
@@ -676,28 +699,36 @@ class Database:
         """,
             (nome, cargo, perc_funcionario, perc_estudio, requer_aprovacao, senha, func_id),
         )
-        self.conn.commit()
+        self.tocar_agenda_global()
+        self.emitir("funcionario", "atualizado", funcionario_id=func_id)
+        self.commit()
     def remover_funcionario(self, funcionario_id: int) -> bool:
-        # Remove bloqueios do funcionário
-        self.cursor.execute(
-            "DELETE FROM bloqueios WHERE funcionario_id = ?",
-            (funcionario_id,),
-        )
+        from app.core import bloqueios as core_bloqueios
 
-        # Remove usuários vinculados a esse funcionário
-        self.cursor.execute(
-            "DELETE FROM usuarios WHERE funcionario_id = ?",
-            (funcionario_id,),
-        )
+        with self.transaction():
+            # Remove bloqueios do funcionário
+            self.cursor.execute(
+                "DELETE FROM bloqueios WHERE funcionario_id = ?",
+                (funcionario_id,),
+            )
+            core_bloqueios.esquecer(self, funcionario_id)
 
-        # Remove o próprio funcionário
-        self.cursor.execute(
-            "DELETE FROM funcionarios WHERE id = ?",
-            (funcionario_id,),
-        )
+            # Remove usuários vinculados a esse funcionário
+            self.cursor.execute(
+                "DELETE FROM usuarios WHERE funcionario_id = ?",
+                (funcionario_id,),
+            )
 
-        removidos = self.cursor.rowcount
-        self.conn.commit()
+            # Remove o próprio funcionário
+            self.cursor.execute(
+                "DELETE FROM funcionarios WHERE id = ?",
+                (funcionario_id,),
+            )
+
+            removidos = self.cursor.rowcount
+            self.tocar_agenda_global()
+            if removidos:
+                self.emitir("funcionario", "removido", funcionario_id=funcionario_id)
         return removidos > 0
 
 
@@ -939,6 +970,7 @@ class Database:
         horarios_bloqueados: str | None,
         acao: str,
         motivo: str | None = None,
+        data_fim: str | None = None,
     ):
         """
         Registra uma ação de bloqueio/desbloqueio feita pelo gestor
@@ -947,37 +979,52 @@ class Database:
         self.cursor.execute(
             """
             INSERT INTO bloqueios_historico 
-                (gestor_id, funcionario_id, data, tipo_bloqueio, horarios_bloqueados, acao, motivo)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+                (gestor_id, funcionario_id, data, data_fim, tipo_bloqueio, horarios_bloqueados, acao, motivo)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
             """,
-            (gestor_id, funcionario_id, data, tipo_bloqueio, horarios_bloqueados, acao, motivo),
+            (gestor_id, funcionario_id, data, data_fim or data, tipo_bloqueio, horarios_bloqueados, acao, motivo),
         )
-        self.conn.commit()
+        self.commit()
 
 
-    def criar_bloqueio(self, funcionario_id, data, tipo_bloqueio, horarios_bloqueados=None, motivo=None):
+    def criar_bloqueio(self, funcionario_id, data, tipo_bloqueio, horarios_bloqueados=None, motivo=None, data_fim=None):
         """
         Cria um novo bloqueio para um funcionário.
         
         Args:
             funcionario_id: ID do funcionário
-            data: Data do bloqueio (formato YYYY-MM-DD)
+            data: Data do bloqueio, ou primeiro dia do período (formato YYYY-MM-DD)
             tipo_bloqueio: 'dia_completo' ou 'horarios_especificos'
             horarios_bloqueados: JSON string com array de horários (opcional)
             motivo: Motivo do bloqueio (opcional)
+            data_fim: Último dia do período (opcional; padrão: o próprio dia)
         
         Returns:
             ID do bloqueio criado
         """
-        self.cursor.execute(
-            """
-            INSERT INTO bloqueios (funcionario_id, data, tipo_bloqueio, horarios_bloqueados, motivo, criado_em)
-            VALUES (?, ?, ?, ?, ?, datetime('now'))
-            """,
-            (funcionario_id, data, tipo_bloqueio, horarios_bloqueados, motivo)
-        )
-        self.conn.commit()
-        return self.cursor.lastrowid
+        from app.core import bloqueios as core_bloqueios
+        from app.core.disponibilidade import mascara_dia_bloqueio
+
+        data_fim = data_fim or data
+        with self.transaction():
+            novo_id = self.inserir(
+                """
+                INSERT INTO bloqueios (funcionario_id, data, data_fim, tipo_bloqueio, horarios_bloqueados, mascara, motivo, criado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))
+                """,
+                (
+                    funcionario_id, data, data_fim, tipo_bloqueio, horarios_bloqueados,
+                    mascara_dia_bloqueio(tipo_bloqueio, horarios_bloqueados), motivo,
+                )
+            )
+            self.tocar_agenda_varios([(dia, funcionario_id) for dia in dias_do_periodo(data, data_fim)])
+            core_bloqueios.esquecer(self, funcionario_id, data, data_fim)
+            self.emitir(
+                "bloqueio", "criado",
+                id=novo_id, data=data, data_fim=data_fim,
+                funcionario_id=funcionario_id, tipo_bloqueio=tipo_bloqueio,
+            )
+        return novo_id
 
 
     def listar_bloqueios_por_funcionario(self, funcionario_id):
@@ -993,7 +1040,8 @@ class Database:
                 tipo_bloqueio,
                 horarios_bloqueados,
                 motivo,
-                criado_em
+                criado_em,
+                data_fim
             FROM bloqueios
             WHERE funcionario_id = ?
             ORDER BY data DESC
@@ -1013,80 +1061,186 @@ class Database:
                 "horarios_bloqueados": row[4],
                 "motivo": row[5],
                 "criado_em": row[6],
+                "data_fim": row[7],
             }
             resultado.append(bloqueio)
         
         return resultado
 
 
+    def cursor_bloqueios_ativos(
+        self,
+        data_ini: str,
+        data_fim: str | None = None,
+        funcionario_id: int | None = None,
+        apos: tuple | None = None,
+        limite: int | None = None,
+    ):
+        """
+        Bloqueios que cobrem algum dia de [data_ini, data_fim] (sem data_fim:
+        de data_ini em diante), ignorando os de funcionários que não existem
+        mais. Ordem de keyset (data, funcionario_id, id), a do índice
+        idx_bloqueios_data_funcionario; `apos` é a chave da última linha
+        já entregue.
+        """
+        minimo, maximo, ref = janela_bloqueios(data_ini, data_fim or data_ini)
+        sql = """
+            SELECT
+                b.id,
+                b.funcionario_id,
+                f.nome AS funcionario_nome,
+                b.data,
+                b.tipo_bloqueio,
+                b.horarios_bloqueados,
+                b.motivo,
+                b.criado_em,
+                b.data_fim
+            FROM bloqueios b
+            JOIN funcionarios f ON f.id = b.funcionario_id
+            WHERE b.data >= ? AND b.data_fim >= ?
+        """
+        params: list = [minimo, ref]
+        if data_fim is not None:
+            sql += " AND b.data <= ?"
+            params.append(maximo)
+        if funcionario_id is not None:
+            sql += " AND b.funcionario_id = ?"
+            params.append(funcionario_id)
+        if apos is not None:
+            sql += " AND (b.data, b.funcionario_id, b.id) > (?, ?, ?)"
+            params.extend(apos)
+        sql += " ORDER BY b.data ASC, b.funcionario_id ASC, b.id ASC"
+        if limite is not None:
+            sql += " LIMIT ?"
+            params.append(limite)
+
+        cur = self.dialeto.cursor_em_lotes(self.conn)
+        cur.execute(sql, params)
+        return cur
+
+    def listar_bloqueios_ativos(self, data_ref: str):
+        """
+        Bloqueios que ainda valem em data_ref ou depois (data_fim >= data_ref)
+        de todos os funcionários, ignorando os de funcionários que não
+        existem mais.
+        """
+        cur = self.cursor_bloqueios_ativos(data_ref)
+        try:
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+        return [
+            {
+                "id": row[0],
+                "funcionario_id": row[1],
+                "funcionario_nome": row[2],
+                "data": row[3],
+                "tipo_bloqueio": row[4],
+                "horarios_bloqueados": row[5],
+                "motivo": row[6],
+                "criado_em": row[7],
+                "data_fim": row[8],
+            }
+            for row in rows
+        ]
+
+
     def remover_bloqueio(self, bloqueio_id):
         """
         Remove um bloqueio pelo ID.
         """
-        self.cursor.execute(
-            "DELETE FROM bloqueios WHERE id = ?",
-            (bloqueio_id,)
-        )
-        self.conn.commit()
-        return self.cursor.rowcount > 0
+        with self.transaction():
+            chave = self.tocar_bloqueio(bloqueio_id)
+            self.cursor.execute(
+                "DELETE FROM bloqueios WHERE id = ?",
+                (bloqueio_id,)
+            )
+            removidos = self.cursor.rowcount
+            if chave and removidos:
+                self.emitir(
+                    "bloqueio", "removido",
+                    id=bloqueio_id, data=chave[0], funcionario_id=chave[1],
+                )
+        return removidos > 0
 
 
-    def verificar_bloqueio(self, funcionario_id, data, horario):
+    def bloqueios_por_dia(self, chaves) -> dict:
         """
-        Verifica se existe bloqueio para um funcionário em uma data/horário específico.
-        
-        Returns:
-            Dict com informações do bloqueio se existir, None caso contrário
+        {(funcionario_id, data): tupla dos bloqueios que cobrem o dia} para
+        cada chave pedida. O cache de bloqueios vale enquanto a versão do
+        funcionário em cache_versoes não mudar; o resto vem de uma consulta
+        só (funcionario_id IN ... + janela de datas) e é guardado.
+        Linhas: (id, tipo_bloqueio, horarios_bloqueados, motivo, data,
+        data_fim, mascara), dia completo primeiro.
         """
-        print(f"\n🔍 VERIFICAR_BLOQUEIO:")
-        print(f"   funcionario_id: {funcionario_id}")
-        print(f"   data: {data}")
-        print(f"   horario: {horario}")
-        
+        from app.core.bloqueios import cache_bloqueios, chave_versao
+
+        chaves = list(dict.fromkeys(chaves))
+        # versões lidas antes dos bloqueios: uma escrita que confirmar no
+        # meio deixa o que for guardado agora já desatualizado
+        versoes = self.versoes_cache(chave_versao(f) for f, _ in chaves)
+        resultado = {}
+        faltando: dict = {}
+        for funcionario_id, data in chaves:
+            bloqueios = cache_bloqueios.obter(
+                funcionario_id, data, versoes[chave_versao(funcionario_id)]
+            )
+            if bloqueios is None:
+                faltando.setdefault(funcionario_id, []).append(data)
+            else:
+                resultado[(funcionario_id, data)] = bloqueios
+        if not faltando:
+            return resultado
+
+        geracao = cache_bloqueios.geracao
+        dias = [d for datas in faltando.values() for d in datas]
+        marcadores = ", ".join("?" for _ in faltando)
         self.cursor.execute(
-            """
-            SELECT id, tipo_bloqueio, horarios_bloqueados, motivo
+            f"""
+            SELECT funcionario_id, id, tipo_bloqueio, horarios_bloqueados, motivo, data, data_fim, mascara
             FROM bloqueios
-            WHERE funcionario_id = ? AND data = ?
+            WHERE funcionario_id IN ({marcadores}) AND {BLOQUEIO_COBRE}
+            ORDER BY CASE WHEN tipo_bloqueio = 'dia_completo' THEN 0 ELSE 1 END, id
             """,
-            (funcionario_id, data)
+            (*faltando, *janela_bloqueios(min(dias), max(dias))),
         )
-        
-        row = self.cursor.fetchone()
-        print(f"   Query resultado: {row}")
-        
-        if not row:
-            print(f"   ❌ Nenhum bloqueio encontrado")
-            return None
-        
-        bloqueio = {
-            "id": row[0],
-            "tipo_bloqueio": row[1],
-            "horarios_bloqueados": row[2],
-            "motivo": row[3]
-        }
-        
-        print(f"   📌 Bloqueio encontrado: {bloqueio}")
-        
-        # Se for dia completo, retorna o bloqueio
-        if bloqueio["tipo_bloqueio"] == "dia_completo":
-            print(f"   🚫 DIA COMPLETO BLOQUEADO!")
-            return bloqueio
-        
-        # Se for horários específicos, verifica se o horário está na lista
-        if bloqueio["tipo_bloqueio"] == "horarios_especificos" and bloqueio["horarios_bloqueados"]:
-            try:
-                import json
-                horarios_lista = json.loads(bloqueio["horarios_bloqueados"])
-                print(f"   📋 Horários bloqueados: {horarios_lista}")
-                print(f"   🔍 Verificando se {horario} está em {horarios_lista}")
-                if horario in horarios_lista:
-                    print(f"   🚫 HORÁRIO BLOQUEADO!")
-                    return bloqueio
-                else:
-                    print(f"   ✅ Horário não está bloqueado")
-            except Exception as e:
-                print(f"   ❌ Erro ao parsear horários: {e}")
-        
-        print(f"   ✅ Sem bloqueio para este horário")
-        return None
+        achados = {(f, d): [] for f, datas in faltando.items() for d in datas}
+        for funcionario_id, *row in self.cursor.fetchall():
+            inicio, fim = row[4], row[5] or row[4]
+            for data in faltando[funcionario_id]:
+                if inicio <= data <= fim:
+                    achados[(funcionario_id, data)].append(tuple(row))
+
+        for (funcionario_id, data), bloqueios in achados.items():
+            resultado[(funcionario_id, data)] = bloqueios = tuple(bloqueios)
+            chave = chave_versao(funcionario_id)
+            if chave in self._versoes_tocadas:
+                # esta transação mexeu nos bloqueios do funcionário: a
+                # leitura inclui escritas que um rollback pode desfazer
+                continue
+            # sem escrita própria, a leitura só vê bloqueios confirmados:
+            # vale guardar mesmo dentro de transaction() (a marcação checa
+            # na própria transação e, recusada, termina em rollback).
+            # Geração e versão são as de antes da consulta, então uma
+            # escrita no meio invalida a entrada
+            cache_bloqueios.guardar(funcionario_id, data, bloqueios, geracao, versoes[chave])
+        return resultado
+
+    def verificar_bloqueio(self, funcionario_id, data, horario, duracao=None):
+        """
+        Verifica se algum bloqueio do funcionário na data cobre o horário
+        (ou o intervalo horario + duracao, em minutos).
+
+        Os bloqueios que cobrem o dia (inclusive os por período) vêm de
+        bloqueios_por_dia (cache ou índice (funcionario_id, data, data_fim));
+        a checagem é um teste de bits na máscara de slots, com dia completo
+        tendo prioridade.
+
+        Returns:
+            Dict com informações do bloqueio se existir, None caso contrário
+        """
+        from app.core.bloqueios import bloqueio_que_cobre, como_dict
+
+        bloqueios = self.bloqueios_por_dia([(funcionario_id, data)])[(funcionario_id, data)]
+        row = bloqueio_que_cobre(bloqueios, horario, duracao)
+        return como_dict(row) if row else None
@@ -0,0 +1,25 @@
+from typing import Iterator
+
+from fastapi import Request
+
+from app.db.aio import AsyncDatabase
+from app.db.database import Database
+
+
+def get_db(request: Request) -> Iterator[Database]:
+    """
+    Dependency única dos routers síncronos: empresta uma conexão do Storage
+    criado no startup (leitura para GET/HEAD) e a devolve ao pool quando a
+    requisição termina, mesmo em caso de erro.
+
+    Respostas em streaming (formato=ndjson) leem do cursor depois que a
+    rota retorna: só funciona porque, desde o FastAPI 0.118, a saída do
+    yield roda depois de a resposta ser enviada (requirements.txt).
+    """
+    with request.app.state.storage.checkout_para(request) as db:
+        yield db
+
+
+def get_adb(request: Request) -> AsyncDatabase:
+    """Dependency dos routers async: fachada com executor dedicado do Storage."""
+    return request.app.state.storage.aio
@@ -0,0 +1,248 @@
+"""
+Diferenças de SQL entre SQLite e PostgreSQL.
+
+O código do app escreve SQL no dialeto do SQLite (placeholders `?`,
+`datetime('now')`, `INSERT OR IGNORE`, DDL com AUTOINCREMENT). No
+PostgreSQL o cursor traduz cada statement uma vez (com cache) antes de
+executar, e o que não dá para traduzir por texto fica nos métodos do
+dialeto: id do registro inserido, início da transação de escrita,
+colunas existentes de uma tabela, lock das migrações e gatilhos.
+"""
+
+import itertools
+import re
+import sqlite3
+from functools import lru_cache
+
+# ---------- tradução de SQL (SQLite -> PostgreSQL) ----------
+
+# strings e comentários passam intactos; fora deles, `?` vira `%s`
+_TOKENS = re.compile(r"'(?:[^']|'')*'|--[^\n]*|\?|%")
+
+_AGORA_PG = "to_char(now(), 'YYYY-MM-DD HH24:MI:SS')"
+
+_SUBSTITUICOES = (
+    (re.compile(r"datetime\('now'\)", re.I), _AGORA_PG),
+    (re.compile(r"\bDEFAULT\s+CURRENT_TIMESTAMP\b", re.I), f"DEFAULT ({_AGORA_PG})"),
+    (re.compile(r"\bINTEGER\s+PRIMARY\s+KEY\s+AUTOINCREMENT\b", re.I), "SERIAL PRIMARY KEY"),
+    # REAL do PostgreSQL é float4; valores de dinheiro precisam de float8
+    (re.compile(r"\bREAL\b"), "DOUBLE PRECISION"),
+    # datas/horas continuam texto, como no SQLite (comparação por string)
+    (re.compile(r"\b(?:DATETIME|DATE|TIME|TIMESTAMP)\b"), "TEXT"),
+)
+
+_INSERT_OR_IGNORE = re.compile(r"\bINSERT\s+OR\s+IGNORE\s+INTO\b", re.I)
+
+# statements que têm plano de execução (DDL, BEGIN, PRAGMA... não têm)
+_EXPLICAVEL = re.compile(r"^\s*(?:SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.I)
+
+
+@lru_cache(maxsize=1024)
+def traduzir_para_postgres(sql: str, com_params: bool) -> str:
+    """
+    Converte um statement escrito para o SQLite. `%` literal só é escapado
+    quando há parâmetros (sem parâmetros o psycopg2 não interpola).
+    """
+    def token(m):
+        t = m.group(0)
+        if t == "?":
+            return "%s"
+        if t == "%":
+            return "%%" if com_params else "%"
+        if t.startswith("'") and com_params:
+            return t.replace("%", "%%")
+        return t
+
+    sql = _TOKENS.sub(token, sql)
+    for padrao, novo in _SUBSTITUICOES:
+        sql = padrao.sub(novo, sql)
+    if _INSERT_OR_IGNORE.search(sql):
+        sql = _INSERT_OR_IGNORE.sub("INSERT INTO", sql).rstrip().rstrip(";")
+        sql += " ON CONFLICT DO NOTHING"
+    return sql
+
+
+# ---------- dialetos ----------
+
+class SQLiteDialect:
+    nome = "sqlite"
+
+    def inserir(self, cursor, sql: str, params=()) -> int:
+        cursor.execute(sql, params)
+        return cursor.lastrowid
+
+    def inserir_ou_ignorar(self, cursor, sql: str, params=()):
+        cursor.execute(sql, params)
+        # ignorado: rowcount 0 e lastrowid seria o do INSERT anterior
+        return cursor.lastrowid if cursor.rowcount == 1 else None
+
+    def iniciar_escrita(self, cursor):
+        # já pega o lock de escrita: leituras feitas dentro do bloco
+        # (ex.: checar se o cliente existe) ficam consistentes com as escritas
+        if not cursor.connection.in_transaction:
+            cursor.execute("BEGIN IMMEDIATE")
+
+    def iniciar_leitura(self, cursor):
+        # BEGIN adiado: o snapshot (WAL) / lock SHARED vem no primeiro SELECT
+        # e vale para todas as leituras até o fim da transação
+        if not cursor.connection.in_transaction:
+            cursor.execute("BEGIN")
+
+    def travar_migracoes(self, cursor):
+        cursor.execute("BEGIN IMMEDIATE")
+
+    def cursor_em_lotes(self, conn):
+        # o sqlite3 já percorre o resultado sob demanda a cada fetch
+        return conn.cursor()
+
+    def travar_agenda(self, cursor, funcionario_id: int, data: str):
+        # o BEGIN IMMEDIATE da transação já serializa todas as escritas
+        pass
+
+    def travar_agenda_dias(self, cursor, funcionario_id: int, datas) -> None:
+        pass
+
+    def criar_gatilho(self, cursor, nome: str, tabela: str, colunas, desfazer: str, aplicar: str):
+        """
+        Gatilho AFTER por linha: `desfazer` (usa OLD) roda em DELETE e UPDATE,
+        `aplicar` (usa NEW) em INSERT e UPDATE; UPDATE só dispara quando
+        alguma das `colunas` está no SET.
+        """
+        for sufixo, evento, corpo in (
+            ("ins", "INSERT", [aplicar]),
+            ("del", "DELETE", [desfazer]),
+            ("upd", f"UPDATE OF {', '.join(colunas)}", [desfazer, aplicar]),
+        ):
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {nome}_{sufixo} AFTER {evento} ON {tabela} "
+                f"BEGIN {'; '.join(corpo)}; END"
+            )
+
+    def colunas(self, cursor, tabela: str) -> set:
+        cursor.execute(f"PRAGMA table_info({tabela})")
+        return {c[1] for c in cursor.fetchall()}
+
+    def plano(self, conn, sql: str, params=None) -> list:
+        """Linhas do EXPLAIN QUERY PLAN (cursor simples, fora da instrumentação)."""
+        if not _EXPLICAVEL.match(sql):
+            return []
+        cur = conn.cursor(sqlite3.Cursor)
+        try:
+            cur.execute("EXPLAIN QUERY PLAN " + sql, params or ())
+            return [row[3] for row in cur.fetchall()]
+        finally:
+            cur.close()
+
+
+class PostgresDialect:
+    nome = "postgres"
+
+    # chave do pg_advisory_xact_lock que serializa as migrações entre workers
+    LOCK_MIGRACOES = 0x5354_5544
+
+    _cursores = itertools.count(1)
+
+    def inserir(self, cursor, sql: str, params=()) -> int:
+        cursor.execute(sql.rstrip().rstrip(";") + " RETURNING id", params)
+        return cursor.fetchone()[0]
+
+    def inserir_ou_ignorar(self, cursor, sql: str, params=()):
+        # DO NOTHING não devolve linha no RETURNING
+        cursor.execute(sql.rstrip().rstrip(";") + " RETURNING id", params)
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def iniciar_escrita(self, cursor):
+        # psycopg2 abre a transação sozinho no primeiro statement;
+        # locks de linha vêm das próprias escritas
+        pass
+
+    def iniciar_leitura(self, cursor):
+        # em READ COMMITTED cada SELECT vê um snapshot diferente; REPEATABLE
+        # READ fixa um só para a transação inteira (só dá para pedir no início)
+        from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+
+        if cursor.connection.get_transaction_status() == TRANSACTION_STATUS_IDLE:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+
+    def travar_migracoes(self, cursor):
+        cursor.execute("SELECT pg_advisory_xact_lock(?)", (self.LOCK_MIGRACOES,))
+
+    def cursor_em_lotes(self, conn):
+        # cursor nomeado (lado do servidor): o psycopg2 só traz as linhas
+        # pedidas em cada fetchmany, em vez do resultado inteiro no execute
+        return conn.cursor(name=f"lotes_{next(self._cursores)}")
+
+    def travar_agenda(self, cursor, funcionario_id: int, data: str):
+        # em READ COMMITTED duas transações veriam o mesmo dia livre; o lock
+        # por (funcionário, dia) vale até o fim da transação
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(?, hashtext(?))", (funcionario_id, data)
+        )
+
+    def travar_agenda_dias(self, cursor, funcionario_id: int, datas) -> None:
+        # mesmos locks do travar_agenda, vários dias num statement só; em
+        # ordem de data para duas séries concorrentes não se travarem
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(?, hashtext(d)) "
+            "FROM unnest(?::text[]) AS d ORDER BY d",
+            (funcionario_id, sorted(datas)),
+        )
+
+    def criar_gatilho(self, cursor, nome: str, tabela: str, colunas, desfazer: str, aplicar: str):
+        # um gatilho só, com a função em PL/pgSQL decidindo pelo TG_OP
+        cursor.execute(
+            f"""
+            CREATE OR REPLACE FUNCTION {nome}() RETURNS trigger LANGUAGE plpgsql AS $$
+            BEGIN
+                IF TG_OP <> 'INSERT' THEN {desfazer}; END IF;
+                IF TG_OP <> 'DELETE' THEN {aplicar}; END IF;
+                RETURN NULL;
+            END
+            $$
+            """
+        )
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nome} ON {tabela}")
+        cursor.execute(
+            f"CREATE TRIGGER {nome} AFTER INSERT OR DELETE OR UPDATE OF {', '.join(colunas)} "
+            f"ON {tabela} FOR EACH ROW EXECUTE PROCEDURE {nome}()"
+        )
+
+    def colunas(self, cursor, tabela: str) -> set:
+        cursor.execute(
+            """
+            SELECT column_name FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = ?
+            """,
+            (tabela,),
+        )
+        return {c[0] for c in cursor.fetchall()}
+
+    def plano(self, conn, sql: str, params=None) -> list:
+        """
+        Linhas do EXPLAIN (sem ANALYZE: não executa o statement). Roda num
+        savepoint para que um erro não aborte a transação da requisição.
+        """
+        if not _EXPLICAVEL.match(sql):
+            return []
+        import psycopg2.extensions
+
+        cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+        try:
+            cur.execute("SAVEPOINT plano")
+            try:
+                cur.execute(
+                    "EXPLAIN " + traduzir_para_postgres(sql, params is not None), params
+                )
+                return [row[0] for row in cur.fetchall()]
+            except Exception:
+                cur.execute("ROLLBACK TO SAVEPOINT plano")
+                raise
+            finally:
+                cur.execute("RELEASE SAVEPOINT plano")
+        finally:
+            cur.close()
+
+
+SQLITE = SQLiteDialect()
+POSTGRES = PostgresDialect()
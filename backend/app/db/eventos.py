@@ -0,0 +1,118 @@
+"""
+Eventos de mudança da agenda, bloqueios e solicitações.
+
+As escritas registram eventos no Database (`db.emitir`); eles só são
+publicados depois do commit (rollback descarta). O Broker faz o fan-out
+em memória para as conexões SSE abertas (`/eventos/stream`): cada
+assinante tem uma fila própria no event loop, e o publicador (thread do
+threadpool) entrega com call_soon_threadsafe, sem travar ninguém.
+
+O broker é por processo: com vários workers, cada um só vê as escritas
+que ele mesmo fez.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from typing import Optional
+
+TAMANHO_FILA = int(os.getenv("EVENTOS_FILA", "256"))
+TAMANHO_HISTORICO = int(os.getenv("EVENTOS_HISTORICO", "512"))
+
+
+def mensagem_sse(evento_id: int, tipo: str, dados: dict) -> bytes:
+    corpo = json.dumps(dados, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {evento_id}\nevent: {tipo}\ndata: {corpo}\n\n".encode("utf-8")
+
+
+# pedido ao cliente para recarregar tudo: perdeu eventos (fila cheia ou
+# Last-Event-ID antigo demais / de outro processo)
+RESSINCRONIZAR = b"event: resync\ndata: {}\n\n"
+
+
+class Assinatura:
+    """Uma conexão SSE: fila de mensagens já serializadas e filtro por funcionário."""
+
+    def __init__(self, loop, funcionario_id: Optional[int]):
+        self.loop = loop
+        self.funcionario_id = funcionario_id
+        self.fila: asyncio.Queue = asyncio.Queue(maxsize=TAMANHO_FILA)
+        self.perdeu_eventos = False
+
+    def quer(self, funcionario_id) -> bool:
+        return self.funcionario_id is None or funcionario_id == self.funcionario_id
+
+    def entregar(self, mensagem: bytes):
+        # roda no event loop
+        if self.perdeu_eventos:
+            return
+        try:
+            self.fila.put_nowait(mensagem)
+        except asyncio.QueueFull:
+            # cliente lento: em vez de acumular memória, manda recarregar
+            self.perdeu_eventos = True
+            self.fila.get_nowait()
+            self.fila.put_nowait(RESSINCRONIZAR)
+
+
+class Broker:
+    def __init__(self, historico: int = TAMANHO_HISTORICO):
+        self._lock = threading.Lock()
+        self._assinantes: set = set()
+        self._sequencia = itertools.count(1)
+        # (id, funcionario_id, mensagem) recentes, para quem reconecta com Last-Event-ID
+        self._historico: deque = deque(maxlen=historico)
+        self._ultimo_id = 0
+        self._publicados = 0
+
+    def assinar(self, funcionario_id: Optional[int] = None, ultimo_id: Optional[int] = None) -> Assinatura:
+        """Nova assinatura no event loop atual, já com os eventos perdidos desde `ultimo_id`."""
+        assinatura = Assinatura(asyncio.get_running_loop(), funcionario_id)
+        with self._lock:
+            self._assinantes.add(assinatura)
+            if ultimo_id is not None:
+                mais_antigo = self._historico[0][0] if self._historico else self._ultimo_id + 1
+                if ultimo_id > self._ultimo_id or ultimo_id + 1 < mais_antigo:
+                    assinatura.entregar(RESSINCRONIZAR)
+                else:
+                    for evento_id, func, mensagem in self._historico:
+                        if evento_id > ultimo_id and assinatura.quer(func):
+                            assinatura.entregar(mensagem)
+        return assinatura
+
+    def cancelar(self, assinatura: Assinatura):
+        with self._lock:
+            self._assinantes.discard(assinatura)
+
+    def publicar(self, tipo: str, dados: dict):
+        """Serializa uma vez e entrega a todos os assinantes interessados (thread-safe)."""
+        funcionario_id = dados.get("funcionario_id")
+        with self._lock:
+            evento_id = next(self._sequencia)
+            mensagem = mensagem_sse(evento_id, tipo, dados)
+            self._historico.append((evento_id, funcionario_id, mensagem))
+            self._ultimo_id = evento_id
+            self._publicados += 1
+            # agendar dentro do lock mantém a ordem dos ids entre publicadores
+            for assinatura in self._assinantes:
+                if not assinatura.quer(funcionario_id):
+                    continue
+                try:
+                    assinatura.loop.call_soon_threadsafe(assinatura.entregar, mensagem)
+                except RuntimeError:
+                    # loop encerrado (shutdown); a assinatura some no cancelar()
+                    pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "assinantes": len(self._assinantes),
+                "publicados": self._publicados,
+                "ultimo_id": self._ultimo_id,
+            }
+
+
+broker = Broker()
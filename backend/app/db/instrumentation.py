@@ -0,0 +1,304 @@
+"""
+Instrumentação por consulta.
+
+Os cursores do SQLite e do PostgreSQL passam cada execute por
+`ConsultaMedida`, que registra, por fingerprint do statement (SQL com
+literais trocados por `?`): execuções, duração, linhas e a rota HTTP que
+disparou a consulta. A medição vai do execute até o último fetch, porque o
+SQLite só percorre as linhas ao buscá-las.
+
+Consultas acima de DB_SLOW_MS têm o plano (EXPLAIN QUERY PLAN / EXPLAIN)
+capturado e gravado no log rotativo DB_SLOW_LOG; as mais recentes também
+ficam em memória para o endpoint /admin/consultas.
+"""
+
+import contextvars
+import hashlib
+import json
+import logging
+import logging.handlers
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+from functools import lru_cache
+
+ATIVA = os.getenv("DB_QUERY_STATS", "1") != "0"
+LIMITE_LENTA_MS = float(os.getenv("DB_SLOW_MS", "100"))
+SLOW_LOG = os.getenv("DB_SLOW_LOG", "logs/consultas_lentas.log")
+SLOW_LOG_BYTES = int(os.getenv("DB_SLOW_LOG_BYTES", str(1024 * 1024)))
+SLOW_LOG_ARQUIVOS = int(os.getenv("DB_SLOW_LOG_BACKUPS", "5"))
+AMOSTRAS = int(os.getenv("DB_QUERY_SAMPLES", "512"))
+
+# escopo ASGI da requisição em andamento (ver RotaMiddleware)
+rota_atual: contextvars.ContextVar = contextvars.ContextVar("rota_atual", default=None)
+
+FORA_DE_REQUISICAO = "(sem rota)"
+
+
+def nome_da_rota() -> str:
+    """"GET /agenda/{data}": o template da rota, não o path com valores."""
+    scope = rota_atual.get()
+    if scope is None:
+        return FORA_DE_REQUISICAO
+    return f"{scope.get('method', '')} {_template(scope.get('route'), scope.get('path', ''))}"
+
+
+_templates: dict = {}
+
+
+def _template(rota, caminho: str) -> str:
+    # routers incluídos ficam aninhados: rota.path não tem o prefixo do
+    # include_router, que é a parte do path antes do trecho que a rota casa
+    regex = getattr(rota, "path_regex", None)
+    if regex is None:
+        return caminho
+    chave = (id(rota), caminho)
+    template = _templates.get(chave)
+    if template is None:
+        template = rota.path
+        for i, c in enumerate(caminho):
+            if c == "/" and regex.match(caminho[i:]):
+                template = caminho[:i] + rota.path
+                break
+        if len(_templates) > 4096:
+            _templates.clear()
+        _templates[chave] = template
+    return template
+
+
+class RotaMiddleware:
+    """Deixa o escopo da requisição visível para as consultas que ela dispara."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        # o roteador grava scope["route"] no mesmo dict ao casar a rota
+        token = rota_atual.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            rota_atual.reset(token)
+
+
+# ---------- fingerprint ----------
+
+_COMENTARIOS = re.compile(r"--[^\n]*")
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ESPACOS = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql: str) -> tuple:
+    """(id curto, SQL normalizado) — o mesmo para qualquer valor dos literais."""
+    normal = _COMENTARIOS.sub(" ", sql)
+    normal = _STRINGS.sub("?", normal)
+    normal = _NUMEROS.sub("?", normal)
+    normal = _LISTAS.sub("(?...)", normal)
+    normal = _ESPACOS.sub(" ", normal).strip()
+    return hashlib.sha1(normal.encode("utf-8")).hexdigest()[:12], normal
+
+
+# ---------- estatísticas ----------
+
+class EstatisticaConsulta:
+    __slots__ = ("id", "sql", "execucoes", "total_ms", "max_ms", "linhas", "amostras", "rotas")
+
+    def __init__(self, id_: str, sql: str):
+        self.id = id_
+        self.sql = sql
+        self.execucoes = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.linhas = 0
+        self.amostras: deque = deque(maxlen=AMOSTRAS)
+        self.rotas: Counter = Counter()
+
+    def resumo(self) -> dict:
+        ordenadas = sorted(self.amostras)
+        return {
+            "id": self.id,
+            "sql": self.sql,
+            "execucoes": self.execucoes,
+            "total_ms": round(self.total_ms, 3),
+            "media_ms": round(self.total_ms / self.execucoes, 3) if self.execucoes else 0.0,
+            "p50_ms": _percentil(ordenadas, 50),
+            "p95_ms": _percentil(ordenadas, 95),
+            "p99_ms": _percentil(ordenadas, 99),
+            "max_ms": round(self.max_ms, 3),
+            "linhas_media": round(self.linhas / self.execucoes, 2) if self.execucoes else 0.0,
+            "rotas": dict(self.rotas.most_common(5)),
+        }
+
+
+def _percentil(ordenadas: list, p: int) -> float:
+    """Nearest-rank sobre as amostras recentes."""
+    if not ordenadas:
+        return 0.0
+    indice = max(0, -(-p * len(ordenadas) // 100) - 1)
+    return round(ordenadas[indice], 3)
+
+
+_lock = threading.Lock()
+_consultas: dict = {}
+_lentas: deque = deque(maxlen=100)
+_log_lentas = None
+
+
+def _logger_lentas() -> logging.Logger:
+    global _log_lentas
+    if _log_lentas is None:
+        logger = logging.getLogger("app.db.consultas_lentas")
+        logger.propagate = False
+        if not logger.handlers:
+            pasta = os.path.dirname(SLOW_LOG)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                SLOW_LOG,
+                maxBytes=SLOW_LOG_BYTES,
+                backupCount=SLOW_LOG_ARQUIVOS,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+        _log_lentas = logger
+    return _log_lentas
+
+
+def _registrar(medicao: "Medicao", cursor):
+    id_, normal = fingerprint(medicao.sql)
+    duracao_ms = medicao.duracao * 1000
+    with _lock:
+        est = _consultas.get(id_)
+        if est is None:
+            est = _consultas[id_] = EstatisticaConsulta(id_, normal)
+        est.execucoes += 1
+        est.total_ms += duracao_ms
+        est.linhas += medicao.linhas
+        est.amostras.append(duracao_ms)
+        est.rotas[medicao.rota] += 1
+        if duracao_ms > est.max_ms:
+            est.max_ms = duracao_ms
+
+    if duracao_ms >= LIMITE_LENTA_MS:
+        _registrar_lenta(medicao, cursor, id_, duracao_ms)
+
+
+def _registrar_lenta(medicao: "Medicao", cursor, id_: str, duracao_ms: float):
+    try:
+        plano = cursor.connection.dialeto.plano(cursor.connection, medicao.sql, medicao.params)
+    except Exception as e:
+        plano = [f"(plano indisponível: {e})"]
+    entrada = {
+        "quando": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "id": id_,
+        "duracao_ms": round(duracao_ms, 3),
+        "linhas": medicao.linhas,
+        "rota": medicao.rota,
+        "sql": fingerprint(medicao.sql)[1],
+        "plano": plano,
+    }
+    with _lock:
+        _lentas.append(entrada)
+    try:
+        _logger_lentas().info(json.dumps(entrada, ensure_ascii=False))
+    except OSError as e:
+        print(f"⚠️ Não foi possível gravar o log de consultas lentas: {e}")
+
+
+def estatisticas(ordem: str = "total_ms", limite: int = 50) -> list:
+    with _lock:
+        resumos = [est.resumo() for est in _consultas.values()]
+    resumos.sort(key=lambda r: r.get(ordem, 0), reverse=True)
+    return resumos[:limite]
+
+
+def consultas_lentas(limite: int = 50) -> list:
+    with _lock:
+        return list(_lentas)[-limite:][::-1]
+
+
+def limpar():
+    with _lock:
+        _consultas.clear()
+        _lentas.clear()
+
+
+# ---------- integração com os cursores ----------
+
+class Medicao:
+    __slots__ = ("sql", "params", "rota", "duracao", "linhas", "contar_no_fetch")
+
+    def __init__(self, sql, params, rota, duracao, rowcount):
+        self.sql = sql
+        self.params = params
+        self.rota = rota
+        self.duracao = duracao
+        # SELECT no SQLite não tem rowcount (-1): as linhas são contadas no fetch
+        self.contar_no_fetch = rowcount < 0
+        self.linhas = 0 if self.contar_no_fetch else rowcount
+
+
+class ConsultaMedida:
+    """
+    Mixin dos cursores. A subclasse chama `self._medir(sql, params, executar)`
+    no seu execute; os fetch* somam tempo e linhas à medição em aberto, que
+    é registrada no próximo execute, quando o resultado se esgota ou em
+    `finalizar_medicao()` (fim do checkout).
+    """
+
+    _medicao = None
+
+    def _medir(self, sql, params, executar):
+        if not ATIVA:
+            return executar()
+        self.finalizar_medicao()
+        inicio = time.perf_counter()
+        resultado = executar()
+        duracao = time.perf_counter() - inicio
+        self._medicao = Medicao(sql, params, nome_da_rota(), duracao, self.rowcount)
+        return resultado
+
+    def _buscar(self, buscar, *args, esgota: bool = False):
+        medicao = self._medicao
+        if medicao is None:
+            return buscar(*args)
+        inicio = time.perf_counter()
+        resultado = buscar(*args)
+        medicao.duracao += time.perf_counter() - inicio
+        if medicao.contar_no_fetch:
+            if isinstance(resultado, list):
+                medicao.linhas += len(resultado)
+            elif resultado is not None:
+                medicao.linhas += 1
+        # resultado esgotado: a medição está completa
+        if esgota or not resultado:
+            self.finalizar_medicao()
+        return resultado
+
+    def fetchone(self):
+        return self._buscar(super().fetchone)
+
+    def fetchmany(self, *args):
+        return self._buscar(super().fetchmany, *args)
+
+    def fetchall(self):
+        return self._buscar(super().fetchall, esgota=True)
+
+    def finalizar_medicao(self):
+        medicao = self._medicao
+        if medicao is not None:
+            self._medicao = None
+            _registrar(medicao, self)
+
+    def close(self):
+        self.finalizar_medicao()
+        return super().close()
@@ -0,0 +1,553 @@
+"""
+Migrações versionadas do schema.
+
+Cada passo tem um número crescente e roda uma única vez, dentro de uma
+transação, registrando a versão aplicada em `schema_version`. Com o banco
+já na última versão, o startup faz só um SELECT (sem PRAGMA table_info e
+sem reexecutar DDL). Para mudar o schema, acrescente um novo passo no fim
+da lista; nunca edite um passo que já foi aplicado em produção.
+"""
+
+import sqlite3
+
+import psycopg2
+
+MIGRACOES: list = []
+
+
+def migracao(versao: int, descricao: str):
+    """Registra uma função `fn(cursor)` como o passo `versao` do schema."""
+    def registrar(fn):
+        MIGRACOES.append((versao, descricao, fn))
+        MIGRACOES.sort(key=lambda m: m[0])
+        return fn
+    return registrar
+
+
+def versao_atual(cursor) -> int:
+    try:
+        cursor.execute("SELECT MAX(versao) FROM schema_version")
+    except (sqlite3.OperationalError, psycopg2.ProgrammingError):
+        # tabela ainda não existe; no PostgreSQL o erro aborta a transação
+        cursor.connection.rollback()
+        return 0
+    row = cursor.fetchone()
+    return row[0] or 0
+
+
+def ultima_versao() -> int:
+    return MIGRACOES[-1][0] if MIGRACOES else 0
+
+
+def aplicar_migracoes(db) -> int:
+    """
+    Leva o banco até a última versão e devolve a versão final.
+
+    O lock das migrações (BEGIN IMMEDIATE no SQLite, advisory lock no
+    PostgreSQL) serializa workers que sobem ao mesmo tempo: o primeiro
+    aplica os passos; os demais esperam o lock, releem a versão dentro da
+    transação e não fazem nada.
+    """
+    cur = db.cursor
+    alvo = ultima_versao()
+    if versao_atual(cur) >= alvo:
+        return alvo
+
+    db.dialeto.travar_migracoes(cur)
+    try:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS schema_version (
+                versao INTEGER PRIMARY KEY,
+                descricao TEXT,
+                aplicada_em TEXT DEFAULT (datetime('now'))
+            )
+            """
+        )
+        atual = versao_atual(cur)
+        for versao, descricao, fn in MIGRACOES:
+            if versao <= atual:
+                continue
+            print(f"🔧 Migração {versao}: {descricao}")
+            fn(cur)
+            cur.execute(
+                "INSERT INTO schema_version (versao, descricao) VALUES (?, ?)",
+                (versao, descricao),
+            )
+        db.conn.commit()
+    except Exception:
+        db.conn.rollback()
+        raise
+    return alvo
+
+
+# ---------- helpers ----------
+
+def _adicionar_colunas(cur, tabela: str, colunas: dict):
+    """ALTER TABLE ADD COLUMN para as colunas que ainda não existem."""
+    existentes = cur.connection.dialeto.colunas(cur, tabela)
+    for nome, tipo in colunas.items():
+        if nome not in existentes:
+            cur.execute(f"ALTER TABLE {tabela} ADD COLUMN {nome} {tipo}")
+
+
+# ---------- passos ----------
+
+@migracao(1, "schema base")
+def _schema_base(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS config (
+            id INTEGER PRIMARY KEY,
+            nome_estudio TEXT DEFAULT 'Estúdio Tatuagem',
+            cor_primaria TEXT DEFAULT '#FF4500',
+            cor_secundaria TEXT DEFAULT '#FFD700',
+            logo_path TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS funcionarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT,
+            cargo TEXT,
+            porcentagem REAL DEFAULT 0.7,
+            perc_estudio REAL DEFAULT 30,
+            perc_funcionario REAL DEFAULT 70,
+            requer_aprovacao INTEGER DEFAULT 1,
+            senha TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS bloqueios_funcionario (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            funcionario_id INTEGER NOT NULL,
+            data DATE,
+            horario_inicio TIME,
+            horario_fim TIME,
+            tipo TEXT DEFAULT 'dia',
+            motivo TEXT,
+            data_criacao TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS bloqueios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            funcionario_id INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            tipo_bloqueio TEXT NOT NULL,
+            horarios_bloqueados TEXT,
+            motivo TEXT,
+            criado_em TEXT,
+            FOREIGN KEY (funcionario_id) REFERENCES funcionarios(id)
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS bloqueios_historico (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            gestor_id INTEGER NOT NULL,
+            funcionario_id INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            tipo_bloqueio TEXT NOT NULL,      -- 'dia_completo' ou 'horarios_especificos'
+            horarios_bloqueados TEXT,         -- JSON string com horários, se aplicável
+            acao TEXT NOT NULL,               -- 'bloquear' ou 'desbloquear'
+            motivo TEXT,
+            criado_em TEXT DEFAULT (datetime('now'))
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS agendamentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TEXT,
+            horario TEXT,
+            cliente TEXT,
+            funcionario_id INTEGER,
+            servico TEXT,
+            pago INTEGER DEFAULT 0,
+            valor_previsto REAL,
+            aprovado INTEGER DEFAULT 0,
+            cancelado_solicitado INTEGER DEFAULT 0,
+            tipo TEXT DEFAULT 'tatuagem'
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS pagamentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            agendamento_id INTEGER,
+            valor REAL,
+            data_pagto TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            login TEXT NOT NULL UNIQUE,
+            senha TEXT NOT NULL,
+            tipo TEXT NOT NULL,
+            funcionario_id INTEGER NULL
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS solicitacoes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT,
+            agendamento_id INTEGER,
+            funcionario_id INTEGER,
+            data TEXT,
+            horario TEXT,
+            cliente TEXT,
+            servico TEXT,
+            status TEXT DEFAULT 'pendente',
+            data_solicitacao TEXT
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS clientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            telefone TEXT,
+            email TEXT,
+            cpf TEXT,
+            endereco TEXT,
+            data_criacao TEXT,
+            status TEXT DEFAULT 'pre_cadastro'
+        )
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS cliente_historico (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER NOT NULL REFERENCES clientes(id),
+            tipo VARCHAR(50),
+            descricao TEXT,
+            valor DECIMAL(10, 2),
+            funcionario_id INTEGER REFERENCES funcionarios(id),
+            data_registro DATETIME DEFAULT CURRENT_TIMESTAMP,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+    # bancos antigos, criados antes destas colunas existirem
+    _adicionar_colunas(cur, "funcionarios", {
+        "perc_estudio": "REAL DEFAULT 30",
+        "perc_funcionario": "REAL DEFAULT 70",
+        "requer_aprovacao": "INTEGER DEFAULT 1",
+        "senha": "TEXT",
+    })
+    _adicionar_colunas(cur, "agendamentos", {
+        "cliente_id": "INTEGER",
+        "status": "TEXT DEFAULT 'pre_cadastro'",
+        "valor_previsto": "REAL",
+        "aprovado": "INTEGER DEFAULT 0",
+        "cancelado_solicitado": "INTEGER DEFAULT 0",
+        "tipo": "TEXT DEFAULT 'tatuagem'",
+    })
+    _adicionar_colunas(cur, "clientes", {
+        "status": "TEXT DEFAULT 'pre_cadastro'",
+        "tem_ficha": "BOOLEAN DEFAULT FALSE",
+        "data_cadastro": "DATE",
+        "celular": "TEXT",
+        "alergias": "TEXT",
+        "usa_pomada_anestesica": "TEXT",
+        "fuma": "TEXT",
+        "bebe": "TEXT",
+        "procedimento": "TEXT",
+        "endereco": "TEXT",
+        "informacao": "TEXT",
+        "valor": "REAL",
+        "funcionario_id": "INTEGER",
+    })
+
+    # usuário gestor padrão (cria ou garante senha) - como superadmin
+    cur.execute("SELECT id FROM usuarios WHERE login = ?", ("gestor",))
+    if not cur.fetchone():
+        cur.execute(
+            """
+            INSERT INTO usuarios (login, senha, tipo, funcionario_id)
+            VALUES (?, ?, 'superadmin', NULL)
+            """,
+            ("gestor", "2512"),
+        )
+    else:
+        cur.execute(
+            """
+            UPDATE usuarios
+            SET senha = ?, tipo = 'superadmin', funcionario_id = NULL
+            WHERE login = ?
+            """,
+            ("2512", "gestor"),
+        )
+
+    cur.execute("INSERT OR IGNORE INTO config (id) VALUES (1)")
+
+
+@migracao(2, "colunas usadas pelo código e ausentes no schema")
+def _colunas_faltantes(cur):
+    # solicitacoes.cliente_id: gravada por core.agenda.criar_agendamento
+    _adicionar_colunas(cur, "solicitacoes", {"cliente_id": "INTEGER"})
+    # clientes.ficha_path: gravada pelo upload de ficha
+    _adicionar_colunas(cur, "clientes", {"ficha_path": "TEXT"})
+
+
+@migracao(3, "índices das consultas quentes")
+def _indices(cur):
+    # Cobrem os filtros/ordenações da agenda por dia/período, bloqueios por
+    # funcionário+data, busca de cliente por nome sem distinção de
+    # maiúsculas, solicitações pendentes e históricos.
+    for ddl in (
+        "CREATE INDEX IF NOT EXISTS idx_agendamentos_data_horario "
+        "ON agendamentos (data, horario)",
+        "CREATE INDEX IF NOT EXISTS idx_agendamentos_funcionario_data "
+        "ON agendamentos (funcionario_id, data, horario)",
+        "CREATE INDEX IF NOT EXISTS idx_bloqueios_funcionario_data "
+        "ON bloqueios (funcionario_id, data)",
+        "CREATE INDEX IF NOT EXISTS idx_bloqueios_data_funcionario "
+        "ON bloqueios (data, funcionario_id)",
+        "CREATE INDEX IF NOT EXISTS idx_bloqueios_historico_funcionario "
+        "ON bloqueios_historico (funcionario_id, criado_em)",
+        "CREATE INDEX IF NOT EXISTS idx_clientes_nome_lower "
+        "ON clientes (LOWER(nome))",
+        "CREATE INDEX IF NOT EXISTS idx_cliente_historico_cliente "
+        "ON cliente_historico (cliente_id, data_registro)",
+        "CREATE INDEX IF NOT EXISTS idx_solicitacoes_status_data "
+        "ON solicitacoes (status, data_solicitacao)",
+        "CREATE INDEX IF NOT EXISTS idx_usuarios_funcionario "
+        "ON usuarios (funcionario_id)",
+    ):
+        cur.execute(ddl)
+
+
+@migracao(4, "duração e intervalo em minutos dos agendamentos")
+def _duracao_agendamentos(cur):
+    # inicio_min/fim_min: minutos desde 00:00, para checar sobreposição de
+    # horários com uma busca no índice (funcionario_id, data, inicio_min)
+    _adicionar_colunas(cur, "agendamentos", {
+        "duracao": "INTEGER DEFAULT 30",
+        "inicio_min": "INTEGER",
+        "fim_min": "INTEGER",
+    })
+    cur.execute("SELECT id, horario, duracao FROM agendamentos WHERE inicio_min IS NULL")
+    valores = []
+    for ag_id, horario, duracao in cur.fetchall():
+        try:
+            h, m = str(horario).strip().split(":")[:2]
+            inicio = int(h) * 60 + int(m)
+        except ValueError:
+            continue
+        valores.append((inicio, inicio + (duracao or 30), ag_id))
+    if valores:
+        cur.executemany(
+            "UPDATE agendamentos SET inicio_min = ?, fim_min = ? WHERE id = ?", valores
+        )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_agendamentos_funcionario_inicio "
+        "ON agendamentos (funcionario_id, data, inicio_min)"
+    )
+
+
+@migracao(5, "versões da agenda por dia e funcionário")
+def _agenda_versoes(cur):
+    # Contador por (data, funcionario_id), incrementado por toda escrita em
+    # agendamentos/bloqueios (funcionario_id 0 = sem funcionário). A linha
+    # ('*', 0) é a versão global: renomear/remover cliente ou funcionário
+    # muda o que toda a agenda exibe. As ETags das listagens saem daqui.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS agenda_versoes (
+            data TEXT NOT NULL,
+            funcionario_id INTEGER NOT NULL,
+            versao INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (data, funcionario_id)
+        )
+        """
+    )
+
+
+@migracao(6, "séries de agendamentos (várias sessões)")
+def _series(cur):
+    # regra: JSON da recorrência usada para gerar as datas (NULL quando a
+    # série veio de uma lista explícita de datas)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS agendamento_series (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER,
+            funcionario_id INTEGER,
+            servico TEXT,
+            tipo TEXT,
+            horario TEXT,
+            duracao INTEGER,
+            valor_previsto REAL,
+            regra TEXT,
+            criado_em TEXT DEFAULT (datetime('now'))
+        )
+        """
+    )
+    _adicionar_colunas(cur, "agendamentos", {"serie_id": "INTEGER"})
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_agendamentos_serie "
+        "ON agendamentos (serie_id)"
+    )
+
+
+@migracao(7, "nome normalizado e único dos clientes")
+def _clientes_nome_normalizado(cur):
+    # a normalização precisa ser exatamente a usada em runtime
+    from app.core.clientes import normalizar_nome
+
+    _adicionar_colunas(cur, "clientes", {"nome_normalizado": "TEXT"})
+    cur.execute("SELECT id, nome FROM clientes ORDER BY id")
+    vistos, valores = set(), []
+    for cliente_id, nome in cur.fetchall():
+        chave = normalizar_nome(nome)
+        # homônimos já existentes: o mais antigo fica com o nome; os demais
+        # ficam NULL (continuam valendo por id, só não são achados por nome)
+        if not chave or chave in vistos:
+            continue
+        vistos.add(chave)
+        valores.append((chave, cliente_id))
+    if valores:
+        cur.executemany(
+            "UPDATE clientes SET nome_normalizado = ? WHERE id = ?", valores
+        )
+    cur.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_clientes_nome_normalizado "
+        "ON clientes (nome_normalizado)"
+    )
+
+
+# contribuição de uma linha de agendamentos ({ref} = NEW ou OLD) para o
+# resumo do dia; {sinal} "-" desfaz a contribuição da versão antiga
+_DELTA_RESUMO = """
+    INSERT INTO agenda_resumo_diario
+        (data, agendados, aprovados, pagos, valor_previsto, faturamento)
+    SELECT
+        {ref}.data,
+        {sinal}1,
+        {sinal}(CASE WHEN {ref}.aprovado = 1 THEN 1 ELSE 0 END),
+        {sinal}(CASE WHEN {ref}.pago = 1 THEN 1 ELSE 0 END),
+        {sinal}COALESCE({ref}.valor_previsto, 0),
+        {sinal}(CASE WHEN {ref}.aprovado = 1 AND {ref}.pago = 1
+                     THEN COALESCE({ref}.valor_previsto, 0) ELSE 0 END)
+    WHERE {ref}.data IS NOT NULL
+    ON CONFLICT (data) DO UPDATE SET
+        agendados = agenda_resumo_diario.agendados + excluded.agendados,
+        aprovados = agenda_resumo_diario.aprovados + excluded.aprovados,
+        pagos = agenda_resumo_diario.pagos + excluded.pagos,
+        valor_previsto = agenda_resumo_diario.valor_previsto + excluded.valor_previsto,
+        faturamento = agenda_resumo_diario.faturamento + excluded.faturamento
+"""
+
+
+@migracao(8, "resumo diário da agenda mantido por gatilhos")
+def _agenda_resumo_diario(cur):
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS agenda_resumo_diario (
+            data TEXT PRIMARY KEY,
+            agendados INTEGER NOT NULL DEFAULT 0,
+            aprovados INTEGER NOT NULL DEFAULT 0,
+            pagos INTEGER NOT NULL DEFAULT 0,
+            valor_previsto REAL NOT NULL DEFAULT 0,
+            faturamento REAL NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO agenda_resumo_diario
+            (data, agendados, aprovados, pagos, valor_previsto, faturamento)
+        SELECT
+            data,
+            COUNT(*),
+            SUM(CASE WHEN aprovado = 1 THEN 1 ELSE 0 END),
+            SUM(CASE WHEN pago = 1 THEN 1 ELSE 0 END),
+            COALESCE(SUM(valor_previsto), 0),
+            COALESCE(SUM(CASE WHEN aprovado = 1 AND pago = 1 THEN valor_previsto END), 0)
+        FROM agendamentos
+        WHERE data IS NOT NULL
+        GROUP BY data
+        """
+    )
+    # gatilho em vez de código nas rotas: as escritas da agenda são muitas
+    # (SQL cru em rotas, executemany das séries, solicitações) e todas
+    # passam a manter o resumo na mesma transação
+    cur.connection.dialeto.criar_gatilho(
+        cur,
+        "agenda_resumo_diario_sync",
+        "agendamentos",
+        ("data", "aprovado", "pago", "valor_previsto"),
+        desfazer=_DELTA_RESUMO.format(ref="OLD", sinal="-"),
+        aplicar=_DELTA_RESUMO.format(ref="NEW", sinal=""),
+    )
+
+
+@migracao(9, "máscara de slots bloqueados em bloqueios")
+def _bloqueios_mascara(cur):
+    # mesma conversão usada nas escritas de bloqueio
+    from app.core.disponibilidade import mascara_dia_bloqueio
+
+    _adicionar_colunas(cur, "bloqueios", {"mascara": "BIGINT NOT NULL DEFAULT 0"})
+    cur.execute("SELECT id, tipo_bloqueio, horarios_bloqueados FROM bloqueios")
+    valores = [
+        (mascara_dia_bloqueio(tipo, horarios), bloqueio_id)
+        for bloqueio_id, tipo, horarios in cur.fetchall()
+    ]
+    if valores:
+        cur.executemany("UPDATE bloqueios SET mascara = ? WHERE id = ?", valores)
+
+
+@migracao(10, "bloqueios por período (data_fim)")
+def _bloqueios_periodo(cur):
+    _adicionar_colunas(cur, "bloqueios", {"data_fim": "TEXT"})
+    _adicionar_colunas(cur, "bloqueios_historico", {"data_fim": "TEXT"})
+    cur.execute("UPDATE bloqueios SET data_fim = data WHERE data_fim IS NULL")
+    cur.execute("UPDATE bloqueios_historico SET data_fim = data WHERE data_fim IS NULL")
+    # data_fim no índice: a checagem de sobreposição não lê a tabela para
+    # descartar os bloqueios que terminaram antes do período
+    cur.execute("DROP INDEX IF EXISTS idx_bloqueios_funcionario_data")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_bloqueios_funcionario_periodo "
+        "ON bloqueios (funcionario_id, data, data_fim)"
+    )
+
+
+# 11 era só um relatório de agendamentos sobrepostos, sem mudança de
+# schema: o aviso saiu para o startup (main.py). Bancos que já o aplicaram
+# guardam a linha 11 em schema_version; o número não é reaproveitado.
+
+
+@migracao(12, "versões dos caches em memória")
+def _cache_versoes(cur):
+    # Contador por chave ("clientes", "bloqueios:<funcionario_id>"),
+    # incrementado na mesma transação de toda escrita que invalida um cache
+    # em memória. Cada worker confere a versão antes de usar o que guardou:
+    # uma escrita feita em outro worker também invalida o seu cache.
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS cache_versoes (
+            chave TEXT PRIMARY KEY,
+            versao INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
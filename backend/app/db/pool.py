@@ -0,0 +1,155 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class PoolTimeout(RuntimeError):
+    """Nenhuma conexão ficou livre dentro do tempo de espera do pool."""
+
+
+class ConnectionPool:
+    """
+    Pool limitado de conexões com checkout por requisição.
+
+    Cada requisição pega uma conexão com `acquire()` (ou `connection()`),
+    usa com exclusividade e devolve com `release()`. Conexões são abertas
+    sob demanda até `tamanho`; acima disso a requisição espera até
+    `timeout` segundos por uma conexão livre.
+    """
+
+    def __init__(self, factory, tamanho: int = 5, timeout: float = 10.0):
+        if tamanho < 1:
+            raise ValueError("tamanho do pool deve ser >= 1")
+        self._factory = factory
+        self.tamanho = tamanho
+        self.timeout = timeout
+
+        self._cond = threading.Condition()
+        self._livres: list = []
+        self._abertas = 0
+        self._em_uso = 0
+        self._aguardando = 0
+        self._fechado = False
+
+        # métricas
+        self._checkouts = 0
+        self._timeouts = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+
+    # ---------- checkout / devolução ----------
+
+    def acquire(self, timeout: float | None = None):
+        """Pega uma conexão do pool, abrindo uma nova se houver espaço."""
+        limite = self.timeout if timeout is None else timeout
+        inicio = time.perf_counter()
+        deadline = inicio + limite
+        conn = None
+
+        with self._cond:
+            self._aguardando += 1
+            try:
+                while True:
+                    if self._fechado:
+                        raise RuntimeError("pool de conexões encerrado")
+                    if self._livres:
+                        conn = self._livres.pop()
+                        break
+                    if self._abertas < self.tamanho:
+                        # reserva a vaga; a conexão é aberta fora do lock
+                        self._abertas += 1
+                        break
+                    restante = deadline - time.perf_counter()
+                    if restante <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"nenhuma conexão livre após {limite:.1f}s "
+                            f"({self._em_uso}/{self.tamanho} em uso)"
+                        )
+                    self._cond.wait(restante)
+            finally:
+                self._aguardando -= 1
+
+        if conn is None:
+            try:
+                conn = self._factory()
+            except Exception:
+                with self._cond:
+                    self._abertas -= 1
+                    self._cond.notify()
+                raise
+
+        espera = time.perf_counter() - inicio
+        with self._cond:
+            self._em_uso += 1
+            self._checkouts += 1
+            self._espera_total += espera
+            if espera > self._espera_max:
+                self._espera_max = espera
+        return conn
+
+    def release(self, conn, descartar: bool = False):
+        """
+        Devolve a conexão ao pool. Qualquer transação que a requisição
+        deixou aberta é desfeita, para não vazar para o próximo checkout.
+        """
+        if not descartar:
+            try:
+                conn.rollback()
+            except Exception:
+                descartar = True
+
+        with self._cond:
+            self._em_uso -= 1
+            if descartar or self._fechado:
+                self._abertas -= 1
+            else:
+                self._livres.append(conn)
+                conn = None
+            self._cond.notify()
+
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+    @contextmanager
+    def connection(self, timeout: float | None = None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    # ---------- observabilidade / encerramento ----------
+
+    def stats(self) -> dict:
+        with self._cond:
+            checkouts = self._checkouts
+            return {
+                "tamanho": self.tamanho,
+                "abertas": self._abertas,
+                "em_uso": self._em_uso,
+                "livres": len(self._livres),
+                "aguardando": self._aguardando,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "espera_media_ms": round(
+                    (self._espera_total / checkouts) * 1000 if checkouts else 0.0, 3
+                ),
+                "espera_max_ms": round(self._espera_max * 1000, 3),
+            }
+
+    def close(self):
+        """Fecha as conexões livres; as emprestadas fecham ao serem devolvidas."""
+        with self._cond:
+            self._fechado = True
+            livres, self._livres = self._livres, []
+            self._abertas -= len(livres)
+            self._cond.notify_all()
+        for conn in livres:
+            try:
+                conn.close()
+            except Exception:
+                pass
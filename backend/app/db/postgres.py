@@ -0,0 +1,171 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import DictCursor
+from psycopg2.pool import ThreadedConnectionPool
+
+from app.db.dialect import POSTGRES, traduzir_para_postgres
+from app.db.instrumentation import ConsultaMedida
+from app.db.pool import PoolTimeout
+
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# NUMERIC (ex.: DECIMAL(10,2), SUM de DECIMAL) volta como float, igual ao
+# SQLite: o código soma/multiplica com floats e serializa direto em JSON
+_DEC2FLOAT = psycopg2.extensions.new_type(
+    psycopg2.extensions.DECIMAL.values,
+    "DEC2FLOAT",
+    lambda valor, cur: float(valor) if valor is not None else None,
+)
+
+
+class PgCursor(ConsultaMedida, DictCursor):
+    """
+    Cursor que aceita o SQL do app (dialeto SQLite) e devolve linhas
+    acessíveis por índice e por nome, como sqlite3.Row. Cada execute é
+    medido (ver app.db.instrumentation).
+    """
+
+    def execute(self, query, vars=None):
+        sql = traduzir_para_postgres(query, vars is not None)
+        return self._medir(query, vars, lambda: DictCursor.execute(self, sql, vars))
+
+    def executemany(self, query, vars_list):
+        vars_list = list(vars_list)
+        sql = traduzir_para_postgres(query, True)
+        return self._medir(
+            query,
+            vars_list[0] if vars_list else None,
+            lambda: DictCursor.executemany(self, sql, vars_list),
+        )
+
+
+class PgConnection(psycopg2.extensions.connection):
+    dialeto = POSTGRES
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cursor_factory = PgCursor
+        psycopg2.extensions.register_type(_DEC2FLOAT, self)
+
+
+def conectar_postgres(url: str | None = None) -> PgConnection:
+    """Abre uma conexão avulsa (fora do pool)."""
+    conn = psycopg2.connect(url or DATABASE_URL, connection_factory=PgConnection)
+    print("✅ Conectado ao PostgreSQL")
+    return conn
+
+
+class PgConnectionPool:
+    """
+    ThreadedConnectionPool com a mesma interface do ConnectionPool do
+    SQLite (acquire/release/connection/stats/close).
+
+    O ThreadedConnectionPool falha na hora quando está esgotado; o
+    semáforo na frente faz a requisição esperar até `timeout` segundos
+    por uma conexão livre antes de levantar PoolTimeout.
+    """
+
+    def __init__(self, url: str, tamanho: int = 5, timeout: float = 10.0):
+        if tamanho < 1:
+            raise ValueError("tamanho do pool deve ser >= 1")
+        self.tamanho = tamanho
+        self.timeout = timeout
+        self._pool = ThreadedConnectionPool(
+            1, tamanho, url, connection_factory=PgConnection
+        )
+        self._vagas = threading.BoundedSemaphore(tamanho)
+        self._lock = threading.Lock()
+        print("✅ Conectado ao PostgreSQL (pool)")
+
+        self._em_uso = 0
+        self._aguardando = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+
+    # ---------- checkout / devolução ----------
+
+    def acquire(self, timeout: float | None = None):
+        limite = self.timeout if timeout is None else timeout
+        inicio = time.perf_counter()
+        with self._lock:
+            self._aguardando += 1
+        try:
+            if not self._vagas.acquire(timeout=limite):
+                with self._lock:
+                    self._timeouts += 1
+                    em_uso = self._em_uso
+                raise PoolTimeout(
+                    f"nenhuma conexão livre após {limite:.1f}s "
+                    f"({em_uso}/{self.tamanho} em uso)"
+                )
+        finally:
+            with self._lock:
+                self._aguardando -= 1
+
+        try:
+            conn = self._pool.getconn()
+        except Exception:
+            self._vagas.release()
+            raise
+
+        espera = time.perf_counter() - inicio
+        with self._lock:
+            self._em_uso += 1
+            self._checkouts += 1
+            self._espera_total += espera
+            if espera > self._espera_max:
+                self._espera_max = espera
+        return conn
+
+    def release(self, conn, descartar: bool = False):
+        """Devolve a conexão; transação deixada aberta é desfeita."""
+        if not descartar and not conn.closed:
+            try:
+                conn.rollback()
+            except Exception:
+                descartar = True
+        try:
+            self._pool.putconn(conn, close=descartar or bool(conn.closed))
+        finally:
+            with self._lock:
+                self._em_uso -= 1
+            self._vagas.release()
+
+    @contextmanager
+    def connection(self, timeout: float | None = None):
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    # ---------- observabilidade / encerramento ----------
+
+    def stats(self) -> dict:
+        with self._lock:
+            checkouts = self._checkouts
+            em_uso = self._em_uso
+            livres = len(self._pool._pool)
+            return {
+                "tamanho": self.tamanho,
+                "abertas": em_uso + livres,
+                "em_uso": em_uso,
+                "livres": livres,
+                "aguardando": self._aguardando,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "espera_media_ms": round(
+                    (self._espera_total / checkouts) * 1000 if checkouts else 0.0, 3
+                ),
+                "espera_max_ms": round(self._espera_max * 1000, 3),
+            }
+
+    def close(self):
+        self._pool.closeall()
@@ -0,0 +1,149 @@
+"""
+Mapeamento de linhas do banco para a resposta, sem índices posicionais.
+
+Cada consulta declara os campos de saída por nome de coluna
+(`("cliente", "cliente_nome")` = campo "cliente" vem da coluna
+"cliente_nome"). O mapper coluna->índice é compilado uma única vez por
+formato de statement (colunas de cursor.description) e fica em cache; a
+serialização escreve o JSON de cada linha direto do tuple, sem montar um
+dict intermediário por linha.
+"""
+
+import json
+import threading
+from json.encoder import encode_basestring
+from operator import itemgetter
+
+from fastapi.responses import Response
+
+
+def _valor_json(v) -> str:
+    if v is None:
+        return "null"
+    if v is True:
+        return "true"
+    if v is False:
+        return "false"
+    tipo = type(v)
+    if tipo is str:
+        return encode_basestring(v)
+    if tipo is int:
+        return int.__repr__(v)
+    if tipo is float:
+        return float.__repr__(v)
+    return json.dumps(v, default=str)
+
+
+class RowMapper:
+    __slots__ = ("campos", "_getter", "_template")
+
+    def __init__(self, campos: tuple, colunas: list):
+        posicao = {nome: i for i, nome in enumerate(colunas)}
+        faltando = [col for _, col in campos if col not in posicao]
+        if faltando:
+            raise KeyError(f"colunas ausentes na consulta: {faltando}")
+
+        self.campos = tuple(nome for nome, _ in campos)
+        indices = [posicao[col] for _, col in campos]
+        getter = itemgetter(*indices)
+        # itemgetter com um índice só devolve o valor, não um tuple
+        self._getter = getter if len(indices) > 1 else (lambda r: (getter(r),))
+        self._template = (
+            "{"
+            + ",".join(f"{encode_basestring(nome)}:%s" for nome in self.campos)
+            + "}"
+        )
+
+    def dict(self, row) -> dict:
+        return dict(zip(self.campos, self._getter(row)))
+
+    def json(self, row) -> str:
+        return self._template % tuple(map(_valor_json, self._getter(row)))
+
+
+_cache: dict = {}
+_cache_lock = threading.Lock()
+
+
+def mapper_para(cursor, campos: tuple) -> RowMapper:
+    """Mapper da última consulta do cursor; compilado uma vez por (colunas, campos)."""
+    colunas = tuple(d[0] for d in cursor.description)
+    chave = (colunas, campos)
+    mapper = _cache.get(chave)
+    if mapper is None:
+        mapper = RowMapper(campos, colunas)
+        with _cache_lock:
+            _cache[chave] = mapper
+    return mapper
+
+
+class Linhas:
+    """
+    Resultado de uma consulta já com o seu mapper.
+
+    Iterar devolve dicts (para quem precisa manipular em Python);
+    `json()` serializa direto dos tuples para a resposta HTTP.
+    """
+
+    __slots__ = ("mapper", "rows")
+
+    def __init__(self, mapper: RowMapper, rows: list):
+        self.mapper = mapper
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return map(self.mapper.dict, self.rows)
+
+    def json(self) -> bytes:
+        return ("[" + ",".join(map(self.mapper.json, self.rows)) + "]").encode("utf-8")
+
+
+def linhas(cursor, rows: list, campos: tuple) -> Linhas:
+    return Linhas(mapper_para(cursor, campos), rows)
+
+
+class Pagina:
+    """Uma página de `Linhas` mais o cursor opaco da próxima (None na última)."""
+
+    __slots__ = ("linhas", "proximo")
+
+    def __init__(self, linhas: Linhas, proximo: str | None):
+        self.linhas = linhas
+        self.proximo = proximo
+
+    def json(self) -> bytes:
+        return (
+            b'{"itens":' + self.linhas.json()
+            + b',"proximo":' + json.dumps(self.proximo).encode("utf-8") + b"}"
+        )
+
+
+def ndjson(cursor, campos: tuple, lote: int = 500):
+    """
+    Gera o resultado do cursor como NDJSON (uma linha JSON por registro),
+    lendo `lote` registros por vez: a memória não cresce com o resultado.
+    O cursor é fechado no fim ou se o cliente desconectar no meio.
+    """
+    try:
+        rows = cursor.fetchmany(lote)
+        if not rows:
+            return
+        # cursores do lado do servidor só têm description depois do 1º fetch
+        mapper = mapper_para(cursor, campos)
+        while rows:
+            yield ("\n".join(map(mapper.json, rows)) + "\n").encode("utf-8")
+            rows = cursor.fetchmany(lote)
+    finally:
+        cursor.close()
+
+
+class LinhasResponse(Response):
+    """Resposta JSON para `Linhas` (ou `Pagina`), sem revalidação/dict por linha."""
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return content.json()
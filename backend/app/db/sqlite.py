@@ -0,0 +1,138 @@
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from app.db.dialect import SQLITE
+from app.db.instrumentation import ConsultaMedida
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", "studio_tattoo.db")
+
+# Política para SQLITE_BUSY: o busy_timeout do próprio SQLite espera o lock
+# e, se ainda assim der "database is locked", repetimos o comando com
+# backoff exponencial + jitter (evita que vários workers acordem juntos).
+BUSY_TIMEOUT = float(os.getenv("DB_BUSY_TIMEOUT", "5"))
+BUSY_TENTATIVAS = int(os.getenv("DB_BUSY_RETRIES", "5"))
+BUSY_ESPERA_BASE = float(os.getenv("DB_BUSY_BACKOFF", "0.05"))
+
+_BUSY_CODES = {
+    getattr(sqlite3, "SQLITE_BUSY", 5),
+    getattr(sqlite3, "SQLITE_LOCKED", 6),
+}
+
+_lock_stats = threading.Lock()
+_busy_stats = {"retries": 0, "falhas": 0}
+
+
+def _is_busy(exc: sqlite3.OperationalError) -> bool:
+    code = getattr(exc, "sqlite_errorcode", None)
+    if code is not None:
+        # códigos estendidos (ex.: SQLITE_BUSY_SNAPSHOT) guardam o primário no byte baixo
+        return (code & 0xFF) in _BUSY_CODES
+    msg = str(exc)
+    return "database is locked" in msg or "database is busy" in msg
+
+
+def _com_retry(fn, tentativas: int, espera_base: float):
+    tentativa = 0
+    while True:
+        try:
+            return fn()
+        except sqlite3.OperationalError as e:
+            if not _is_busy(e) or tentativa >= tentativas:
+                if _is_busy(e):
+                    with _lock_stats:
+                        _busy_stats["falhas"] += 1
+                raise
+            with _lock_stats:
+                _busy_stats["retries"] += 1
+            time.sleep(random.uniform(0, espera_base * (2 ** tentativa)))
+            tentativa += 1
+
+
+def busy_stats() -> dict:
+    with _lock_stats:
+        return dict(_busy_stats)
+
+
+class RetryCursor(ConsultaMedida, sqlite3.Cursor):
+    """
+    Cursor que repete o comando quando o banco responde SQLITE_BUSY.
+    Cada execute é medido (ver app.db.instrumentation).
+    """
+
+    def execute(self, sql, parameters=()):
+        conn = self.connection
+        return self._medir(sql, parameters, lambda: _com_retry(
+            lambda: sqlite3.Cursor.execute(self, sql, parameters),
+            conn.busy_tentativas,
+            conn.busy_espera_base,
+        ))
+
+    def executemany(self, sql, seq_of_parameters):
+        # materializa para poder repetir caso o primeiro envio falhe
+        params = list(seq_of_parameters)
+        conn = self.connection
+        return self._medir(sql, params[0] if params else (), lambda: _com_retry(
+            lambda: sqlite3.Cursor.executemany(self, sql, params),
+            conn.busy_tentativas,
+            conn.busy_espera_base,
+        ))
+
+
+class RetryConnection(sqlite3.Connection):
+    """Conexão cujos cursores (inclusive conn.execute) e commit usam retry."""
+
+    dialeto = SQLITE
+    busy_tentativas = BUSY_TENTATIVAS
+    busy_espera_base = BUSY_ESPERA_BASE
+
+    def cursor(self, factory=RetryCursor):
+        return super().cursor(factory)
+
+    def commit(self):
+        return _com_retry(
+            super().commit, self.busy_tentativas, self.busy_espera_base
+        )
+
+
+def conectar_sqlite(
+    path: str = SQLITE_PATH,
+    somente_leitura: bool = False,
+    wal: bool = False,
+    busy_timeout: float = BUSY_TIMEOUT,
+) -> sqlite3.Connection:
+    """
+    Abre uma conexão SQLite. Usada como factory dos pools de conexões.
+
+    - somente_leitura: abre com mode=ro (conexões de leitura do modo WAL).
+    - wal: liga journal_mode=WAL (persistente no arquivo do banco).
+    """
+    # check_same_thread=False: a conexão passa de thread em thread do
+    # threadpool do FastAPI, mas só uma requisição a usa por vez (pool).
+    if somente_leitura:
+        conn = sqlite3.connect(
+            f"file:{path}?mode=ro",
+            uri=True,
+            timeout=busy_timeout,
+            check_same_thread=False,
+            factory=RetryConnection,
+        )
+    else:
+        # IMMEDIATE: a transação implícita já pega o lock de escrita no BEGIN,
+        # então um SQLITE_BUSY aparece (e é repetido) antes de qualquer escrita.
+        conn = sqlite3.connect(
+            path,
+            timeout=busy_timeout,
+            check_same_thread=False,
+            isolation_level="IMMEDIATE",
+            factory=RetryConnection,
+        )
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout * 1000)}")
+    if wal and not somente_leitura:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+    print("✅ Conectado ao SQLite local" + (" (leitura)" if somente_leitura else ""))
+    return conn
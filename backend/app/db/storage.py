@@ -0,0 +1,102 @@
+import os
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.db.aio import AsyncDatabase
+from app.db.database import Database
+from app.db.pool import ConnectionPool
+from app.db import sqlite as sqlite_db
+from app.db import postgres as postgres_db
+
+METODOS_LEITURA = frozenset({"GET", "HEAD"})
+
+
+class Storage:
+    """
+    Acesso ao banco no nível da aplicação (criado no startup do main).
+
+    Modos (DB_STORAGE_MODE):
+      - "pool": um único pool de conexões para leitura e escrita.
+      - "wal":  journal WAL; uma conexão de escrita serializada e um pool
+                de conexões somente-leitura, para que leituras longas não
+                bloqueiem escritas (e vice-versa), inclusive entre workers.
+      - "postgres": PostgreSQL em DATABASE_URL, num ThreadedConnectionPool
+                compartilhado por leitura e escrita. É o padrão quando
+                DATABASE_URL está definida.
+    """
+
+    def __init__(
+        self,
+        path: str = sqlite_db.SQLITE_PATH,
+        modo: str | None = None,
+        tamanho: int | None = None,
+        timeout: float | None = None,
+    ):
+        self.path = path
+        url = os.getenv("DATABASE_URL")
+        self.modo = (
+            modo or os.getenv("DB_STORAGE_MODE") or ("postgres" if url else "pool")
+        ).lower()
+        tamanho = tamanho or int(os.getenv("DB_POOL_SIZE", "5"))
+        timeout = timeout if timeout is not None else float(os.getenv("DB_POOL_TIMEOUT", "10"))
+
+        if self.modo == "wal":
+            self.escrita = ConnectionPool(
+                lambda: sqlite_db.conectar_sqlite(path, wal=True),
+                tamanho=1,
+                timeout=timeout,
+            )
+            self.leitura = ConnectionPool(
+                lambda: sqlite_db.conectar_sqlite(path, somente_leitura=True),
+                tamanho=tamanho,
+                timeout=timeout,
+            )
+        elif self.modo == "pool":
+            self.escrita = ConnectionPool(
+                lambda: sqlite_db.conectar_sqlite(path),
+                tamanho=tamanho,
+                timeout=timeout,
+            )
+            self.leitura = self.escrita
+        elif self.modo == "postgres":
+            if not url:
+                raise ValueError("DB_STORAGE_MODE=postgres exige DATABASE_URL")
+            self.escrita = postgres_db.PgConnectionPool(url, tamanho=tamanho, timeout=timeout)
+            self.leitura = self.escrita
+        else:
+            raise ValueError(
+                f"DB_STORAGE_MODE inválido: {self.modo!r} (use 'pool', 'wal' ou 'postgres')"
+            )
+
+        # rotas async: um executor do tamanho dos pools (não mais threads que conexões)
+        self.aio = AsyncDatabase(self, max_workers=tamanho + 1)
+
+    @contextmanager
+    def checkout(self, somente_leitura: bool = False) -> Iterator[Database]:
+        """Empresta uma conexão (com cursor próprio) pelo tempo do bloco."""
+        pool = self.leitura if somente_leitura else self.escrita
+        with pool.connection() as conn:
+            db = Database(conn)
+            try:
+                yield db
+            finally:
+                # registra a última consulta medida antes de devolver a conexão
+                db.cursor.finalizar_medicao()
+
+    def checkout_para(self, request):
+        """Checkout conforme o método HTTP: GET/HEAD vão para as conexões de leitura."""
+        return self.checkout(somente_leitura=request.method in METODOS_LEITURA)
+
+    def stats(self) -> dict:
+        dados = {"modo": self.modo, "escrita": self.escrita.stats()}
+        if self.modo != "postgres":
+            dados["busy"] = sqlite_db.busy_stats()
+        if self.leitura is not self.escrita:
+            dados["leitura"] = self.leitura.stats()
+        return dados
+
+    def close(self):
+        self.aio.close()
+        self.escrita.close()
+        if self.leitura is not self.escrita:
+            self.leitura.close()
@@ -1,6 +1,9 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.db.database import Database
+from app.db.storage import Storage
+from app.core import agenda as core_agenda
+from app.db.migrations import aplicar_migracoes
+from app.db.instrumentation import RotaMiddleware
 from app.routers import (
     agenda, 
     auth, 
@@ -9,10 +12,13 @@ from app.routers import (
     solicitacoes, 
     ocr, 
     clientes,
-    bloqueios  # ✅ NOVO IMPORT
+    bloqueios,  # ✅ NOVO IMPORT
+    admin,
+    eventos,
+    dashboard,
 )
 import os
-from migrations import run_migrations
+from datetime import date
 
 
 app = FastAPI(
@@ -36,8 +42,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# rota de cada requisição visível para a instrumentação das consultas
+app.add_middleware(RotaMiddleware)
+
 
 # ========== ROUTERS ==========
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -48,19 +58,35 @@ app.include_router(solicitacoes.router, prefix="/solicitacoes", tags=["solicitac
 app.include_router(ocr.router, prefix="/ocr", tags=["ocr"])
 app.include_router(clientes.router, prefix="/clientes", tags=["clientes"])
 app.include_router(bloqueios.router, prefix="/bloqueios", tags=["bloqueios"])  # ✅ NOVO ROUTER
+app.include_router(admin.router, prefix="/admin", tags=["admin"])
+app.include_router(eventos.router, prefix="/eventos", tags=["eventos"])
+app.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
 
 
 # ========== STARTUP & SHUTDOWN ==========
 @app.on_event("startup")
 async def startup():
-    """Inicializa o banco de dados na startup"""
+    """Inicializa o storage (pools de conexões) e o banco de dados na startup"""
     try:
-        app.state.db = Database()
-        app.state.db.create_tables()
-        app.state.db.aplicar_migracoes_simples()
+        app.state.storage = Storage()
+        with app.state.storage.checkout() as db:
+            versao = aplicar_migracoes(db)
+            duracao_longa = core_agenda.ajustar_janela_conflito(db)
+            # a checagem de conflito só vale para marcações novas; as que já
+            # se sobrepõem ficam como estão (não dá para escolher qual desmarcar)
+            sobrepostos = db.listar_sobreposicoes(date.today().isoformat())
+        if sobrepostos:
+            print(
+                f"⚠️ {len(sobrepostos)} par(es) de agendamentos sobrepostos a partir de hoje; "
+                "veja GET /admin/agenda/sobreposicoes"
+            )
+        if duracao_longa:
+            print(
+                f"⚠️ Agendamento de {duracao_longa} min no banco, acima do teto de "
+                f"{core_agenda.DURACAO_MAXIMA} min: a checagem de conflito cobre essa janela"
+            )
         print("✅ Backend iniciado com sucesso")
-        print("✅ Tabelas criadas/validadas")
-        print("✅ Migrações aplicadas")
+        print(f"✅ Schema na versão {versao}")
     except Exception as e:
         print(f"❌ Erro ao iniciar backend: {e}")
         raise
@@ -68,11 +94,11 @@ async def startup():
 
 @app.on_event("shutdown")
 async def shutdown():
-    """Fecha conexão com banco de dados na shutdown"""
+    """Fecha as conexões do storage na shutdown"""
     try:
-        if hasattr(app.state, "db"):
-            app.state.db.conn.close()
-            print("✅ Conexão com banco de dados encerrada")
+        if hasattr(app.state, "storage"):
+            app.state.storage.close()
+            print("✅ Conexões com banco de dados encerradas")
     except Exception as e:
         print(f"❌ Erro ao encerrar banco de dados: {e}")
 
@@ -88,6 +114,12 @@ async def health_check():
     }
 
 
+@app.get("/health/db")
+async def health_db():
+    """Estatísticas do storage: modo, pools (tamanho, em uso, espera) e SQLITE_BUSY"""
+    return app.state.storage.stats()
+
+
 # ========== ROOT ==========
 @app.get("/")
 async def root():
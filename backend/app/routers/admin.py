@@ -0,0 +1,53 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Query
+
+from app.core.bloqueios import cache_bloqueios
+from app.db import instrumentation
+from app.db.database import Database
+from app.db.deps import get_db
+
+router = APIRouter()
+
+
+@router.get("/consultas")
+def estatisticas_consultas(
+    ordem: Literal["total_ms", "p95_ms", "p99_ms", "max_ms", "execucoes"] = "total_ms",
+    limite: int = Query(50, ge=1, le=500),
+):
+    """
+    Estatísticas por statement (fingerprint): execuções, tempo total/médio,
+    p50/p95/p99/máx em ms, linhas por execução e rotas que o disparam.
+    """
+    return {
+        "limite_lenta_ms": instrumentation.LIMITE_LENTA_MS,
+        "consultas": instrumentation.estatisticas(ordem, limite),
+    }
+
+
+@router.get("/consultas/lentas")
+def consultas_lentas(limite: int = Query(50, ge=1, le=100)):
+    """Consultas lentas mais recentes, com o plano de execução capturado"""
+    return instrumentation.consultas_lentas(limite)
+
+
+@router.delete("/consultas")
+def limpar_estatisticas():
+    """Zera as estatísticas em memória (o log rotativo em disco é mantido)"""
+    instrumentation.limpar()
+    return {"ok": True}
+
+
+@router.get("/caches")
+def estatisticas_caches():
+    """Caches em memória deste processo: tamanho, hits, misses e invalidações"""
+    return {"bloqueios": cache_bloqueios.stats()}
+
+
+@router.get("/agenda/sobreposicoes")
+def agendamentos_sobrepostos(data_ini: str = "", db: Database = Depends(get_db)):
+    """
+    Pares de agendamentos do mesmo funcionário que se sobrepõem (marcados
+    antes da checagem de conflito), a partir de data_ini, para remarcar.
+    """
+    return db.listar_sobreposicoes(data_ini)
@@ -1,18 +1,20 @@
-from fastapi import APIRouter, Depends, Request, HTTPException
-from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Literal, Optional, List, Dict, Any
+from datetime import date, datetime
 
 from ..db.database import Database
+from ..db.deps import get_db
+from ..db.rows import LinhasResponse
 from ..core import agenda as core_agenda
+from ..core import disponibilidade as core_disp
+from ..core import series as core_series
+from ..core import clientes as core_clientes
 
 router = APIRouter()
 
 
-def get_db(request: Request) -> Database:
-    return request.app.state.db
-
-
 # ======================
 # DASHBOARD - DEVE VIR PRIMEIRO
 # ======================
@@ -29,6 +31,57 @@ def proximos_agendamentos(
     return core_agenda.buscar_proximos_agendamentos(db, hoje_str, funcionario_id)
 
 
+@router.get("/disponibilidade")
+def disponibilidade(
+    data_ini: date,
+    data_fim: date,
+    duracao: int = Query(30, ge=1, description="Duração do serviço em minutos"),
+    funcionario_id: int | None = None,
+    db: Database = Depends(get_db),
+):
+    """
+    Horários de início livres por funcionário e por dia no período,
+    considerando agendamentos e bloqueios, para um serviço de `duracao` minutos.
+    """
+    if data_ini > data_fim:
+        raise HTTPException(status_code=400, detail="data_ini não pode ser maior que data_fim.")
+    if (data_fim - data_ini).days + 1 > core_disp.MAX_DIAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Período máximo é de {core_disp.MAX_DIAS} dias.",
+        )
+    if core_disp.slots_necessarios(duracao) > core_disp.TOTAL_SLOTS:
+        raise HTTPException(status_code=400, detail="Duração maior que o expediente.")
+
+    resultado = core_disp.calcular_disponibilidade(
+        db, data_ini, data_fim, duracao, funcionario_id
+    )
+    # dict grande e já serializável: vai direto para o JSON, sem jsonable_encoder
+    return JSONResponse(resultado)
+
+
+@router.get("/proximo-horario")
+def proximo_horario(
+    duracao: int = Query(30, ge=1, description="Duração do serviço em minutos"),
+    tipo: str | None = Query(None, description="tatuagem | piercing"),
+    funcionario_id: int | None = None,
+    a_partir: date | None = None,
+    limite: int = Query(5, ge=1, le=50),
+    db: Database = Depends(get_db),
+):
+    """
+    Primeiros horários livres para o serviço, do mais cedo para o mais
+    tarde, entre todos os funcionários (ou só `funcionario_id`).
+    """
+    if core_disp.slots_necessarios(duracao) > core_disp.TOTAL_SLOTS:
+        raise HTTPException(status_code=400, detail="Duração maior que o expediente.")
+
+    horarios = core_disp.buscar_proximos_horarios(
+        db, duracao, tipo, funcionario_id, a_partir, limite
+    )
+    return JSONResponse({"duracao": duracao, "tipo": tipo, "horarios": horarios})
+
+
 # ======================
 # MODELS
 # ======================
@@ -44,6 +97,7 @@ class AgendamentoUpdate(BaseModel):
     servico: str
     valor_previsto: Optional[float] = None
     funcionario_id: Optional[int] = None
+    duracao: Optional[int] = Field(None, ge=1, description="Minutos; sem valor mantém a duração atual")
 
 
 class AgendamentoCreate(BaseModel):
@@ -55,12 +109,34 @@ class AgendamentoCreate(BaseModel):
     valor_previsto: Optional[float] = None
     funcionario_id: Optional[int] = None
     aprovado: bool = True
+    duracao: Optional[int] = Field(None, ge=1, description="Minutos; padrão: um slot (30)")
 
 
 class PagamentoAgendamentoPayload(BaseModel):
     pago: bool
 
 
+class RecorrenciaSerie(BaseModel):
+    inicio: date
+    frequencia: Literal["diaria", "semanal", "mensal"] = "semanal"
+    intervalo: int = Field(1, ge=1, description="A cada N dias/semanas/meses")
+    ocorrencias: Optional[int] = Field(None, ge=1)
+    ate: Optional[date] = None
+
+
+class SerieCreate(BaseModel):
+    horario: str
+    cliente: str
+    servico: str
+    tipo: str = "tatuagem"
+    valor_previsto: Optional[float] = Field(None, description="Valor de cada sessão")
+    funcionario_id: Optional[int] = None
+    duracao: Optional[int] = Field(None, ge=1, description="Minutos; padrão: um slot (30)")
+    datas: Optional[List[date]] = Field(None, description="Datas explícitas das sessões")
+    recorrencia: Optional[RecorrenciaSerie] = None
+    atomica: bool = Field(False, description="Não grava nada se alguma sessão não puder ser marcada")
+
+
 # ======================
 # CRIAÇÃO DE AGENDAMENTO
 # ======================
@@ -71,53 +147,77 @@ def criar_agendamento(
     db: Database = Depends(get_db),
 ):
     """Cria um novo agendamento"""
-    
-    print(f"\n🔍 CRIAR AGENDAMENTO:")
-    print(f"   Data: {payload.data}")
-    print(f"   Horário: {payload.horario}")
-    print(f"   Funcionário ID: {payload.funcionario_id}")
-    
-    # VERIFICAR BLOQUEIOS antes de criar o agendamento
-    if payload.funcionario_id:
-        print(f"🔍 Verificando bloqueio para funcionário {payload.funcionario_id}...")
-        bloqueio = db.verificar_bloqueio(
-            payload.funcionario_id,
+    # bloqueios e conflitos são checados na transação que grava o agendamento
+    try:
+        core_agenda.criar_agendamento(
+            db,
             payload.data,
-            payload.horario
+            payload.horario,
+            payload.cliente,
+            payload.servico,
+            payload.tipo,
+            payload.valor_previsto,
+            payload.funcionario_id,
+            payload.duracao,
         )
-        
-        print(f"   Resultado verificação: {bloqueio}")
-        
-        if bloqueio:
-            print(f"🚫 BLOQUEIO DETECTADO - IMPEDINDO AGENDAMENTO")
-            tipo = bloqueio.get("tipo_bloqueio", "dia_completo")
-            if tipo == "dia_completo":
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"O funcionário bloqueou o dia {payload.data} completamente. Não é possível agendar."
-                )
-            else:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"O horário {payload.horario} está bloqueado pelo funcionário. Escolha outro horário."
-                )
+    except core_agenda.HorarioBloqueado as e:
+        if e.tipo_bloqueio == "dia_completo":
+            detail = f"O funcionário bloqueou o dia {payload.data} completamente. Não é possível agendar."
         else:
-            print(f"✅ Sem bloqueio - pode criar agendamento")
-    
-    core_agenda.criar_agendamento(
-        db,
-        payload.data,
-        payload.horario,
-        payload.cliente,
-        payload.servico,
-        payload.tipo,
-        payload.valor_previsto,
-        payload.funcionario_id,
-    )
-    print(f"✅ Agendamento criado com sucesso!\n")
+            detail = f"O horário {payload.horario} está bloqueado pelo funcionário. Escolha outro horário."
+        raise HTTPException(status_code=400, detail=detail)
+    except core_agenda.ConflitoHorario as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"O funcionário já tem um agendamento às {e.horario} que conflita com este horário.",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {"ok": True}
 
 
+@router.post("/serie")
+def criar_serie(
+    payload: SerieCreate,
+    db: Database = Depends(get_db),
+):
+    """
+    Cria uma série de sessões (datas explícitas ou recorrência) numa
+    transação só. Devolve o status de cada ocorrência: criado, bloqueado,
+    conflito, repetido (ou nao_criado, em série atômica recusada → 409).
+    """
+    if (payload.datas is None) == (payload.recorrencia is None):
+        raise HTTPException(
+            status_code=400,
+            detail="Informe 'datas' ou 'recorrencia' (apenas um dos dois)",
+        )
+    try:
+        if payload.recorrencia is not None:
+            regra = payload.recorrencia.dict()
+            datas = core_series.datas_da_regra(**regra)
+        else:
+            regra, datas = None, payload.datas
+        resultado = core_series.criar_serie(
+            db,
+            datas,
+            payload.horario,
+            payload.cliente,
+            payload.servico,
+            payload.tipo,
+            payload.valor_previsto,
+            payload.funcionario_id,
+            payload.duracao,
+            regra=regra,
+            atomica=payload.atomica,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if payload.atomica and resultado["serie_id"] is None:
+        return JSONResponse(status_code=409, content={"ok": False, **resultado})
+    return {"ok": True, **resultado}
+
+
 # ======================
 # ATUALIZAÇÃO E REMOÇÃO
 # ======================
@@ -129,41 +229,33 @@ def atualizar_agendamento(
     db: Database = Depends(get_db),
 ):
     """Atualiza um agendamento"""
-    print("DEBUG UPDATE:", agendamento_id, payload.dict())
-
-    # VERIFICAR BLOQUEIOS antes de atualizar
-    if payload.funcionario_id:
-        print(f"🔍 Verificando bloqueio para funcionário {payload.funcionario_id} em {payload.data} às {payload.horario}")
-        bloqueio = db.verificar_bloqueio(
-            payload.funcionario_id,
+    # bloqueios (com a duração gravada, se o payload não trouxer) e conflitos
+    # são checados na transação que grava a alteração
+    try:
+        ok = core_agenda.atualizar_agendamento(
+            db,
+            agendamento_id,
             payload.data,
-            payload.horario
+            payload.horario,
+            payload.cliente,
+            payload.servico,
+            payload.valor_previsto,
+            payload.funcionario_id,
+            payload.duracao,
         )
-        if bloqueio:
-            print(f"🚫 BLOQUEIO ENCONTRADO: {bloqueio}")
-            tipo = bloqueio.get("tipo_bloqueio", "dia_completo")
-            if tipo == "dia_completo":
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"O funcionário bloqueou o dia {payload.data} completamente."
-                )
-            else:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"O horário {payload.horario} está bloqueado pelo funcionário."
-                )
+    except core_agenda.HorarioBloqueado as e:
+        if e.tipo_bloqueio == "dia_completo":
+            detail = f"O funcionário bloqueou o dia {payload.data} completamente."
         else:
-            print(f"✅ Sem bloqueio - pode atualizar")
-
-    ok = db.atualizar_agendamento(
-        agendamento_id,
-        payload.data,
-        payload.horario,
-        payload.cliente,
-        payload.servico,
-        payload.valor_previsto,
-        payload.funcionario_id,
-    )
+            detail = f"O horário {payload.horario} está bloqueado pelo funcionário."
+        raise HTTPException(status_code=400, detail=detail)
+    except core_agenda.ConflitoHorario as e:
+        raise HTTPException(
+            status_code=409,
+            detail=f"O funcionário já tem um agendamento às {e.horario} que conflita com este horário.",
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not ok:
         return {"ok": False, "detail": "Agendamento não encontrado"}
     return {"ok": True}
@@ -196,7 +288,13 @@ def atualizar_aprovacao_agendamento(
         "UPDATE agendamentos SET aprovado = ? WHERE id = ?",
         (1 if payload.aprovado else 0, agendamento_id),
     )
-    db.conn.commit()
+    chave = db.tocar_agendamento(agendamento_id)
+    if chave:
+        db.emitir(
+            "agendamento", "aprovacao",
+            id=agendamento_id, data=chave[0], funcionario_id=chave[1], aprovado=payload.aprovado,
+        )
+    db.commit()
     return {"ok": True}
 
 
@@ -208,68 +306,56 @@ def atualizar_pagamento_e_historico(
 ):
     """
     Marca agendamento como pago E cria registro no histórico do cliente.
+
+    Tudo numa transação: se o registro no histórico falhar, o pagamento
+    também não é gravado e o erro volta para o cliente.
     """
-    print(f"\n🔍 INICIANDO: agendamento_id={agendamento_id}, pago={payload.pago}")
-    
-    # 1. Buscar os dados do agendamento E o nome do funcionário
-    db.cursor.execute(
-        """
-        SELECT a.cliente, a.cliente_id, a.valor_previsto, a.servico, a.funcionario_id, f.nome
-        FROM agendamentos a
-        LEFT JOIN funcionarios f ON f.id = a.funcionario_id
-        WHERE a.id = ?
-        """,
-        (agendamento_id,),
-    )
-    resultado = db.cursor.fetchone()
-    
-    if not resultado:
-        print(f"❌ Agendamento {agendamento_id} não encontrado!")
-        return {"ok": False, "detail": "Agendamento não encontrado"}
-    
-    cliente_nome, cliente_id, valor, servico, funcionario_id, funcionario_nome = resultado
-    print(f"📋 Agendamento encontrado:")
-    print(f"   - cliente_nome: {cliente_nome}")
-    print(f"   - cliente_id: {cliente_id}")
-    print(f"   - valor: {valor}")
-    print(f"   - servico: {servico}")
-    print(f"   - funcionario_id: {funcionario_id}")
-    print(f"   - funcionario_nome: {funcionario_nome}")
-    
-    # Se não tiver cliente_id, tenta buscar pelo nome
-    if not cliente_id and cliente_nome:
-        print(f"⚠️ cliente_id vazio, buscando por nome: {cliente_nome}")
+    with db.transaction():
+        # 1. Buscar os dados do agendamento E o nome do funcionário
         db.cursor.execute(
-            "SELECT id FROM clientes WHERE LOWER(nome) = LOWER(?)",
-            (cliente_nome,),
+            """
+            SELECT a.cliente, a.cliente_id, a.valor_previsto, a.servico, a.funcionario_id, f.nome, a.data
+            FROM agendamentos a
+            LEFT JOIN funcionarios f ON f.id = a.funcionario_id
+            WHERE a.id = ?
+            """,
+            (agendamento_id,),
         )
-        cliente_result = db.cursor.fetchone()
-        if cliente_result:
-            cliente_id = cliente_result[0]
-            print(f"✅ Cliente encontrado por nome! ID: {cliente_id}")
-        else:
-            print(f"❌ Cliente não encontrado por nome!")
-    
-    # 2. Atualizar status de pagamento
-    db.cursor.execute(
-        "UPDATE agendamentos SET pago = ? WHERE id = ?",
-        (1 if payload.pago else 0, agendamento_id),
-    )
-    print(f"💳 Agendamento marcado como pago: {payload.pago}")
-    
-    # 3. Se marcou como PAGO e tem cliente_id, registra no histórico
-    if payload.pago and cliente_id:
-        try:
+        resultado = db.cursor.fetchone()
+
+        if not resultado:
+            return {"ok": False, "detail": "Agendamento não encontrado"}
+
+        cliente_nome, cliente_id, valor, servico, funcionario_id, funcionario_nome, data_agendamento = resultado
+
+        # Se não tiver cliente_id, tenta buscar pelo nome
+        if not cliente_id and cliente_nome:
+            db.cursor.execute(
+                "SELECT id FROM clientes WHERE nome_normalizado = ?",
+                (core_clientes.normalizar_nome(cliente_nome),),
+            )
+            cliente_result = db.cursor.fetchone()
+            if cliente_result:
+                cliente_id = cliente_result[0]
+
+        # 2. Atualizar status de pagamento
+        db.cursor.execute(
+            "UPDATE agendamentos SET pago = ? WHERE id = ?",
+            (1 if payload.pago else 0, agendamento_id),
+        )
+        db.tocar_agenda(data_agendamento, funcionario_id)
+        db.emitir(
+            "agendamento", "pagamento",
+            id=agendamento_id, data=data_agendamento, funcionario_id=funcionario_id, pago=payload.pago,
+        )
+
+        # 3. Se marcou como PAGO e tem cliente_id, registra no histórico
+        if payload.pago and cliente_id:
             # Monta a descrição com o nome do funcionário
             descricao = f"Pagamento recebido - {servico}"
             if funcionario_nome:
                 descricao += f" (Atendente: {funcionario_nome})"
-            
-            print(f"📝 Tentando inserir histórico...")
-            print(f"   - cliente_id: {cliente_id}")
-            print(f"   - descricao: {descricao}")
-            print(f"   - valor: {valor}")
-            
+
             db.cursor.execute(
                 """
                 INSERT INTO cliente_historico (cliente_id, tipo, descricao, valor, funcionario_id, data_registro)
@@ -283,16 +369,9 @@ def atualizar_pagamento_e_historico(
                     funcionario_id,
                 ),
             )
-            print(f"✅ Histórico inserido com sucesso!")
-        except Exception as e:
-            print(f"❌ Erro ao inserir histórico: {e}")
-            import traceback
-            traceback.print_exc()
-    elif payload.pago and not cliente_id:
-        print(f"⚠️ Não foi possível criar histórico: cliente_id={cliente_id}, pago={payload.pago}")
-    
-    db.conn.commit()
-    print(f"✅ Transação finalizada\n")
+        elif payload.pago:
+            print(f"⚠️ Pagamento do agendamento {agendamento_id} sem cliente: histórico não registrado")
+
     return {"ok": True, "message": "Pagamento atualizado"}
 
 
@@ -310,7 +389,13 @@ def atualizar_pagamento_agendamento(
         "UPDATE agendamentos SET pago = ? WHERE id = ?",
         (1 if payload.pago else 0, agendamento_id),
     )
-    db.conn.commit()
+    chave = db.tocar_agendamento(agendamento_id)
+    if chave:
+        db.emitir(
+            "agendamento", "pagamento",
+            id=agendamento_id, data=chave[0], funcionario_id=chave[1], pago=payload.pago,
+        )
+    db.commit()
     return {"ok": True}
 
 
@@ -318,16 +403,82 @@ def atualizar_pagamento_agendamento(
 # AGENDA DO GESTOR - ROTAS GENÉRICAS VÊM POR ÚLTIMO
 # ======================
 
+PAGINA_PADRAO = 100
+
+
+def _condicional(request: Request, db, data_ini, data_fim, funcionario_id=None):
+    """
+    GET condicional das listagens: devolve (etag, resposta). `resposta` é
+    um 304 quando o If-None-Match bate com a versão atual do período; nesse
+    caso a tabela de agendamentos nem é consultada.
+    """
+    etag = core_agenda.etag_agenda(db, data_ini, data_fim, funcionario_id)
+    if core_agenda.etag_confere(request.headers.get("if-none-match"), etag):
+        return etag, Response(status_code=304, headers=_cabecalhos_cache(etag))
+    return etag, None
+
+
+def _cabecalhos_cache(etag):
+    # no-cache: o navegador guarda a resposta mas revalida sempre (If-None-Match)
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def _com_etag(resposta, etag):
+    resposta.headers.update(_cabecalhos_cache(etag))
+    return resposta
+
+
+def _periodo(db, data_ini, data_fim, limit, after, formato, funcionario_id=None):
+    """
+    Resposta das listagens por período:
+      - sem limit/after: lista completa (formato original);
+      - com limit/after: página {"itens": [...], "proximo": cursor|null},
+        em ordem (data, horario, id); passe `proximo` como `after`;
+      - formato=ndjson: streaming, um agendamento JSON por linha.
+    """
+    try:
+        if formato == "ndjson":
+            return StreamingResponse(
+                core_agenda.stream_agendamentos_periodo(
+                    db, data_ini, data_fim, after, funcionario_id, limit
+                ),
+                media_type="application/x-ndjson",
+            )
+        if limit is not None or after is not None:
+            return LinhasResponse(
+                core_agenda.paginar_agendamentos_periodo(
+                    db, data_ini, data_fim, limit or PAGINA_PADRAO, after, funcionario_id
+                )
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return None
+
+
 @router.get("/agenda-periodo/{data_ini}/{data_fim}", response_model=List[Dict[str, Any]])
 def listar_agendamentos_periodo(
     data_ini: str,
     data_fim: str,
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=1000),
+    after: str | None = None,
+    formato: Literal["json", "ndjson"] = "json",
     db: Database = Depends(get_db),
 ):
     """
     Lista todos os agendamentos de um período (visão do gestor).
+    Aceita paginação por cursor (limit/after) e streaming (formato=ndjson).
+    Responde com ETag e devolve 304 se nada mudou no período.
     """
-    return core_agenda.listar_agendamentos_por_periodo(db, data_ini, data_fim)
+    etag, nao_modificado = _condicional(request, db, data_ini, data_fim)
+    if nao_modificado is not None:
+        return nao_modificado
+    resposta = _periodo(db, data_ini, data_fim, limit, after, formato)
+    if resposta is None:
+        resposta = LinhasResponse(
+            core_agenda.listar_agendamentos_por_periodo(db, data_ini, data_fim)
+        )
+    return _com_etag(resposta, etag)
 
 
 # ======================
@@ -342,17 +493,31 @@ def listar_agendamentos_funcionario_periodo(
     funcionario_id: int,
     data_ini: str,
     data_fim: str,
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=1000),
+    after: str | None = None,
+    formato: Literal["json", "ndjson"] = "json",
     db: Database = Depends(get_db),
 ):
     """
     Lista os agendamentos de um funcionário em um período (De / Até).
+    Aceita paginação por cursor (limit/after) e streaming (formato=ndjson).
+    Responde com ETag e devolve 304 se nada mudou no período.
     """
-    return core_agenda.listar_agendamentos_funcionario_periodo(
-        db,
-        data_ini,
-        data_fim,
-        funcionario_id,
-    )
+    etag, nao_modificado = _condicional(request, db, data_ini, data_fim, funcionario_id)
+    if nao_modificado is not None:
+        return nao_modificado
+    resposta = _periodo(db, data_ini, data_fim, limit, after, formato, funcionario_id)
+    if resposta is None:
+        resposta = LinhasResponse(
+            core_agenda.listar_agendamentos_funcionario_periodo(
+                db,
+                data_ini,
+                data_fim,
+                funcionario_id,
+            )
+        )
+    return _com_etag(resposta, etag)
 
 
 @router.get(
@@ -362,26 +527,56 @@ def listar_agendamentos_funcionario_periodo(
 def listar_agendamentos_funcionario(
     funcionario_id: int,
     data: str,
+    request: Request,
     db: Database = Depends(get_db),
 ):
     """
     Lista os agendamentos de um funcionário específico em um dia.
     """
-    return core_agenda.listar_agendamentos_por_dia_e_funcionario(
-        db,
-        data,
-        funcionario_id,
+    etag, nao_modificado = _condicional(request, db, data, data, funcionario_id)
+    if nao_modificado is not None:
+        return nao_modificado
+    return _com_etag(
+        LinhasResponse(
+            core_agenda.listar_agendamentos_por_dia_e_funcionario(
+                db,
+                data,
+                funcionario_id,
+            )
+        ),
+        etag,
     )
 
 
+@router.get("/resumo-mensal/{ano}/{mes}")
+def resumo_mensal(
+    request: Request,
+    ano: int = Path(..., ge=2000, le=2100),
+    mes: int = Path(..., ge=1, le=12),
+    db: Database = Depends(get_db),
+):
+    """
+    Agendados, aprovados, pagos, valor previsto e faturamento de cada dia
+    do mês (só dias com agendamento), mais os totais do mês.
+    """
+    data_ini, data_fim = core_agenda.periodo_do_mes(ano, mes)
+    etag, nao_modificado = _condicional(request, db, data_ini, data_fim)
+    if nao_modificado is not None:
+        return nao_modificado
+    return _com_etag(JSONResponse(core_agenda.resumo_mensal(db, ano, mes)), etag)
+
+
 # ======================
 # ESTA ROTA DEVE SER A ÚLTIMA (É A MAIS GENÉRICA)
 # ======================
 
 @router.get("/{data}", response_model=List[Dict[str, Any]])
-def listar_agendamentos(data: str, db: Database = Depends(get_db)):
+def listar_agendamentos(data: str, request: Request, db: Database = Depends(get_db)):
     """
     Lista todos os agendamentos de um dia (visão do gestor).
     ATENÇÃO: Esta rota deve ser a última pois captura qualquer /{string}
     """
-    return core_agenda.listar_agendamentos_por_dia(db, data)
+    etag, nao_modificado = _condicional(request, db, data, data)
+    if nao_modificado is not None:
+        return nao_modificado
+    return _com_etag(LinhasResponse(core_agenda.listar_agendamentos_por_dia(db, data)), etag)
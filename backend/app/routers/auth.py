@@ -1,17 +1,15 @@
-from fastapi import APIRouter, Depends, Request, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
 from typing import Optional
 from jose import jwt
 import os
 
 from app.db.database import Database
+from app.db.deps import get_db
 from app.core import funcionarios as core_func
 
 router = APIRouter()
 
-def get_db(request: Request) -> Database:
-    return request.app.state.db
-
 class LoginRequest(BaseModel):
     login: str
     senha: str
@@ -104,7 +102,7 @@ def update_studio_config(payload: StudioConfig, db: Database = Depends(get_db)):
                 "cor_secundaria": "#FFD700",
             },
         )
-        db.conn.commit()
+        db.commit()
         return payload
     except Exception as e:
         print(f"❌ Erro ao salvar studio_config: {e}")
@@ -1,15 +1,21 @@
-from fastapi import APIRouter, Depends, Request, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import date, datetime
 
-from ..db.database import Database
+from ..core import bloqueios as core_bloqueios
+from ..core import disponibilidade as core_disp
+from ..db.aio import AsyncDatabase
+from ..db.database import BLOQUEIO_MAX_DIAS, Database
+from ..db.deps import get_adb, get_db
+from ..db.rows import LinhasResponse
 
 router = APIRouter()
 
-
-def get_db(request: Request) -> Database:
-    return request.app.state.db
+# candidatos por chamada de /verificar-lote
+LOTE_MAX = 500
+# itens por página de /ativos quando só `after` é informado
+PAGINA_PADRAO = 100
 
 
 # ======================
@@ -18,6 +24,7 @@ def get_db(request: Request) -> Database:
 
 class BloqueioCreate(BaseModel):
     data: str
+    data_fim: Optional[str] = None  # último dia (férias, convenções); padrão: só `data`
     tipo_bloqueio: str
     horarios_bloqueados: Optional[str] = None
     motivo: Optional[str] = None
@@ -26,6 +33,7 @@ class BloqueioCreate(BaseModel):
 
 class BloqueioUpdate(BaseModel):
     data: Optional[str] = None
+    data_fim: Optional[str] = None
     tipo_bloqueio: Optional[str] = None
     horarios_bloqueados: Optional[str] = None
     motivo: Optional[str] = None
@@ -38,6 +46,7 @@ class BloqueioUpdate(BaseModel):
 class BloqueioGestorCreate(BaseModel):
     funcionario_id: int
     data: str
+    data_fim: Optional[str] = None
     tipo_bloqueio: str
     horarios_bloqueados: Optional[str] = None
     motivo: Optional[str] = None
@@ -49,6 +58,38 @@ class BloqueioGestorRemover(BaseModel):
     motivo: Optional[str] = None
 
 
+# ======================
+# MODELS DA VERIFICAÇÃO EM LOTE
+# ======================
+
+class CandidatoHorario(BaseModel):
+    funcionario_id: int
+    data: date
+    horario: str
+    duracao: Optional[int] = Field(None, ge=1, description="Minutos; padrão: um slot (30)")
+
+
+class VerificarLotePayload(BaseModel):
+    candidatos: List[CandidatoHorario] = Field(..., max_length=LOTE_MAX)
+
+
+def _validar_periodo(data: str, data_fim: Optional[str]) -> str:
+    """Devolve data_fim (padrão: a própria data) ou 400 se o período for inválido."""
+    data_fim = data_fim or data
+    try:
+        dias = (datetime.strptime(data_fim, "%Y-%m-%d") - datetime.strptime(data, "%Y-%m-%d")).days + 1
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Datas devem estar no formato YYYY-MM-DD")
+    if dias < 1:
+        raise HTTPException(status_code=400, detail="data_fim não pode ser anterior a data")
+    if dias > BLOQUEIO_MAX_DIAS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Um bloqueio pode cobrir no máximo {BLOQUEIO_MAX_DIAS} dias",
+        )
+    return data_fim
+
+
 # ======================
 # BLOQUEIO CRIADO PELO PRÓPRIO FUNCIONÁRIO
 # ======================
@@ -75,12 +116,15 @@ def criar_bloqueio(
             detail="Para bloqueio de horários específicos, é necessário informar os horários",
         )
 
+    data_fim = _validar_periodo(payload.data, payload.data_fim)
+
     bloqueio_id = db.criar_bloqueio(
         funcionario_id=funcionario_id,
         data=payload.data,
         tipo_bloqueio=payload.tipo_bloqueio,
         horarios_bloqueados=payload.horarios_bloqueados,
         motivo=payload.motivo,
+        data_fim=data_fim,
     )
 
     return {"ok": True, "id": bloqueio_id}
@@ -111,25 +155,30 @@ def gestor_criar_bloqueio(
             detail="Para bloqueio de horários específicos, é necessário informar os horários",
         )
 
-    # Cria o bloqueio
-    bloqueio_id = db.criar_bloqueio(
-        funcionario_id=payload.funcionario_id,
-        data=payload.data,
-        tipo_bloqueio=payload.tipo_bloqueio,
-        horarios_bloqueados=payload.horarios_bloqueados,
-        motivo=payload.motivo,
-    )
+    data_fim = _validar_periodo(payload.data, payload.data_fim)
+
+    # Cria o bloqueio e registra histórico numa única transação
+    with db.transaction():
+        bloqueio_id = db.criar_bloqueio(
+            funcionario_id=payload.funcionario_id,
+            data=payload.data,
+            tipo_bloqueio=payload.tipo_bloqueio,
+            horarios_bloqueados=payload.horarios_bloqueados,
+            motivo=payload.motivo,
+            data_fim=data_fim,
+        )
 
-    # Registra histórico
-    db.registrar_historico_bloqueio(
-        gestor_id=payload.gestor_id,
-        funcionario_id=payload.funcionario_id,
-        data=payload.data,
-        tipo_bloqueio=payload.tipo_bloqueio,
-        horarios_bloqueados=payload.horarios_bloqueados,
-        acao="bloquear",
-        motivo=payload.motivo,
-    )
+        # Registra histórico
+        db.registrar_historico_bloqueio(
+            gestor_id=payload.gestor_id,
+            funcionario_id=payload.funcionario_id,
+            data=payload.data,
+            tipo_bloqueio=payload.tipo_bloqueio,
+            horarios_bloqueados=payload.horarios_bloqueados,
+            acao="bloquear",
+            motivo=payload.motivo,
+            data_fim=data_fim,
+        )
 
     return {"ok": True, "id": bloqueio_id}
 
@@ -143,37 +192,62 @@ def gestor_remover_bloqueio(
     """
     Gestor remove um bloqueio de um funcionário, registrando histórico da ação.
     """
-    # Buscar dados do bloqueio antes de remover
-    db.cursor.execute(
-        """
-        SELECT funcionario_id, data, tipo_bloqueio, horarios_bloqueados
-        FROM bloqueios
-        WHERE id = ?
-        """,
-        (bloqueio_id,),
-    )
-    row = db.cursor.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="Bloqueio não encontrado")
+    with db.transaction():
+        # Buscar dados do bloqueio antes de remover
+        db.cursor.execute(
+            """
+            SELECT funcionario_id, data, tipo_bloqueio, horarios_bloqueados, data_fim
+            FROM bloqueios
+            WHERE id = ?
+            """,
+            (bloqueio_id,),
+        )
+        row = db.cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Bloqueio não encontrado")
+
+        funcionario_id, data, tipo_bloqueio, horarios_bloqueados, data_fim = row
+
+        ok = db.remover_bloqueio(bloqueio_id)
+        if not ok:
+            raise HTTPException(status_code=500, detail="Erro ao remover bloqueio")
+
+        # Registrar histórico
+        db.registrar_historico_bloqueio(
+            gestor_id=payload.gestor_id,
+            funcionario_id=funcionario_id,
+            data=data,
+            tipo_bloqueio=tipo_bloqueio,
+            horarios_bloqueados=horarios_bloqueados,
+            acao="desbloquear",
+            motivo=payload.motivo,
+            data_fim=data_fim,
+        )
 
-    funcionario_id, data, tipo_bloqueio, horarios_bloqueados = row
+    return {"ok": True}
 
-    ok = db.remover_bloqueio(bloqueio_id)
-    if not ok:
-        raise HTTPException(status_code=500, detail="Erro ao remover bloqueio")
 
-    # Registrar histórico
-    db.registrar_historico_bloqueio(
-        gestor_id=payload.gestor_id,
-        funcionario_id=funcionario_id,
-        data=data,
-        tipo_bloqueio=tipo_bloqueio,
-        horarios_bloqueados=horarios_bloqueados,
-        acao="desbloquear",
-        motivo=payload.motivo,
-    )
+# ======================
+# VERIFICAÇÃO EM LOTE
+# ======================
 
-    return {"ok": True}
+@router.post("/verificar-lote")
+async def verificar_lote(
+    payload: VerificarLotePayload,
+    adb: AsyncDatabase = Depends(get_adb),
+):
+    """
+    Diz quais (funcionário, data, horário) estão bloqueados, com o
+    bloqueio responsável, na ordem enviada. Uma consulta para o lote
+    inteiro (os dias já em cache nem vão ao banco).
+    """
+    candidatos = [
+        {**c.dict(), "data": c.data.isoformat()} for c in payload.candidatos
+    ]
+    # só leitura, apesar do POST (o lote vai no corpo): conexões de leitura,
+    # sem esperar a de escrita no modo WAL
+    resultados = await adb.run(core_bloqueios.verificar_lote, candidatos, somente_leitura=True)
+    return {"resultados": resultados}
 
 
 # ======================
@@ -193,56 +267,43 @@ def listar_bloqueios_funcionario(
 
 @router.get("/ativos")
 def listar_bloqueios_ativos(
+    funcionario_id: Optional[int] = None,
+    data_ini: Optional[date] = None,
+    data_fim: Optional[date] = None,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[str] = None,
+    compacto: bool = False,
     db: Database = Depends(get_db),
 ):
     """
-    Lista todos os bloqueios ativos (data >= hoje) de todos os funcionários.
-    Ignora bloqueios cujos funcionários não existem mais.
+    Lista os bloqueios ativos (data_fim >= hoje) de todos os funcionários,
+    ignorando os de funcionários que não existem mais.
+
+    Filtros opcionais: funcionario_id e a janela data_ini..data_fim (só os
+    bloqueios que cobrem algum dia dela; data_ini padrão: hoje).
+    compacto=true devolve só id, funcionario_id, data, data_fim,
+    tipo_bloqueio e horarios_bloqueados.
+      - sem limit/after: lista completa;
+      - com limit/after: página {"itens": [...], "proximo": cursor|null},
+        em ordem (data, funcionario_id, id); passe `proximo` como `after`.
     """
-    hoje = datetime.now().strftime("%Y-%m-%d")
-    print(f"\n🔍 LISTAR_BLOQUEIOS_ATIVOS:")
-    print(f"   Data hoje: {hoje}")
-
-    db.cursor.execute(
-        """
-        SELECT 
-            b.id,
-            b.funcionario_id,
-            f.nome as funcionario_nome,
-            b.data,
-            b.tipo_bloqueio,
-            b.horarios_bloqueados,
-            b.motivo,
-            b.criado_em
-        FROM bloqueios b
-        LEFT JOIN funcionarios f ON f.id = b.funcionario_id
-        WHERE b.data >= ? AND f.id IS NOT NULL
-        ORDER BY b.data ASC, f.nome ASC
-        """,
-        (hoje,),
-    )
-
-    rows = db.cursor.fetchall()
-    print(f"   Bloqueios ativos (>= {hoje}): {len(rows)}")
-
-    resultado = []
-
-    for row in rows:
-        bloqueio = {
-            "id": row[0],
-            "funcionario_id": row[1],
-            "funcionario_nome": row[2],
-            "data": row[3],
-            "tipo_bloqueio": row[4],
-            "horarios_bloqueados": row[5],
-            "motivo": row[6],
-            "criado_em": row[7],
-        }
-        print(f"   📌 {bloqueio}")
-        resultado.append(bloqueio)
-
-    print(f"   ✅ Retornando {len(resultado)} bloqueios\n")
-    return resultado
+    inicio = (data_ini or date.today()).isoformat()
+    fim = data_fim.isoformat() if data_fim else None
+    if fim is not None and fim < inicio:
+        raise HTTPException(status_code=400, detail="data_fim não pode ser anterior a data_ini")
+
+    if limit is None and after is None:
+        return LinhasResponse(
+            core_bloqueios.listar_bloqueios_ativos(db, inicio, fim, funcionario_id, compacto)
+        )
+    try:
+        return LinhasResponse(
+            core_bloqueios.paginar_bloqueios_ativos(
+                db, inicio, limit or PAGINA_PADRAO, after, fim, funcionario_id, compacto
+            )
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/historico/{funcionario_id}", response_model=List[Dict[str, Any]])
@@ -266,7 +327,8 @@ def listar_historico_bloqueios(
             h.horarios_bloqueados,
             h.acao,
             h.motivo,
-            h.criado_em
+            h.criado_em,
+            h.data_fim
         FROM bloqueios_historico h
         LEFT JOIN usuarios g ON g.id = h.gestor_id
         LEFT JOIN funcionarios f ON f.id = h.funcionario_id
@@ -292,6 +354,7 @@ def listar_historico_bloqueios(
                 "acao": r[8],
                 "motivo": r[9],
                 "criado_em": r[10],
+                "data_fim": r[11],
             }
         )
     return resultado
@@ -318,7 +381,8 @@ def obter_bloqueio(
             tipo_bloqueio,
             horarios_bloqueados,
             motivo,
-            criado_em
+            criado_em,
+            data_fim
         FROM bloqueios
         WHERE id = ?
         """,
@@ -337,6 +401,7 @@ def obter_bloqueio(
         "horarios_bloqueados": row[4],
         "motivo": row[5],
         "criado_em": row[6],
+        "data_fim": row[7],
     }
 
 
@@ -350,7 +415,7 @@ def atualizar_bloqueio(
     Atualiza um bloqueio existente.
     """
     db.cursor.execute(
-        "SELECT funcionario_id FROM bloqueios WHERE id = ?",
+        "SELECT funcionario_id, tipo_bloqueio, horarios_bloqueados, data, data_fim FROM bloqueios WHERE id = ?",
         (bloqueio_id,),
     )
     row = db.cursor.fetchone()
@@ -361,9 +426,12 @@ def atualizar_bloqueio(
     campos = []
     valores: List[Any] = []
 
-    if payload.data:
-        campos.append("data = ?")
-        valores.append(payload.data)
+    if payload.data or payload.data_fim:
+        data = payload.data or row[3]
+        # bloqueio de um dia que muda de data continua sendo de um dia
+        data_fim = payload.data_fim or (data if row[4] in (None, row[3]) else row[4])
+        campos += ["data = ?", "data_fim = ?"]
+        valores += [data, _validar_periodo(data, data_fim)]
 
     if payload.tipo_bloqueio:
         if payload.tipo_bloqueio not in ["dia_completo", "horarios_especificos"]:
@@ -378,6 +446,14 @@ def atualizar_bloqueio(
         campos.append("horarios_bloqueados = ?")
         valores.append(payload.horarios_bloqueados)
 
+    if payload.tipo_bloqueio or payload.horarios_bloqueados is not None:
+        # a máscara acompanha o tipo/horários resultantes
+        campos.append("mascara = ?")
+        valores.append(core_disp.mascara_dia_bloqueio(
+            payload.tipo_bloqueio or row[1],
+            payload.horarios_bloqueados if payload.horarios_bloqueados is not None else row[2],
+        ))
+
     if payload.motivo is not None:
         campos.append("motivo = ?")
         valores.append(payload.motivo)
@@ -388,8 +464,12 @@ def atualizar_bloqueio(
     valores.append(bloqueio_id)
     query = f"UPDATE bloqueios SET {', '.join(campos)} WHERE id = ?"
 
-    db.cursor.execute(query, valores)
-    db.conn.commit()
+    # versão (e cache) dos dias de origem e, se o período mudou, dos de destino
+    with db.transaction():
+        db.tocar_bloqueio(bloqueio_id)
+        db.cursor.execute(query, valores)
+        data, funcionario_id = db.tocar_bloqueio(bloqueio_id)
+        db.emitir("bloqueio", "atualizado", id=bloqueio_id, data=data, funcionario_id=funcionario_id)
 
     return {"ok": True}
 
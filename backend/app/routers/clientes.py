@@ -1,5 +1,8 @@
-from fastapi import APIRouter, Depends, UploadFile, File
-from app.db.database import Database
+from fastapi import APIRouter, Depends, UploadFile, File, Response
+from starlette.concurrency import run_in_threadpool
+from app.db.aio import AsyncDatabase
+from app.db.deps import get_adb
+from app.core import clientes as core_clientes
 import os
 from datetime import datetime
 import shutil
@@ -12,87 +15,42 @@ FICHAS_DIR = "uploads/fichas"
 os.makedirs(FICHAS_DIR, exist_ok=True)
 
 
-def get_db():
-    """Dependency para obter a instância do banco"""
-    return Database()
+def _salvar_arquivo(origem, destino: str) -> None:
+    with open(destino, "wb") as buffer:
+        shutil.copyfileobj(origem, buffer)
+
+
+def _clientes_json(db) -> bytes:
+    return core_clientes.listar_clientes(db).json()
 
 
 @router.get("/")
-async def listar_clientes(db: Database = Depends(get_db)):
+async def listar_clientes(adb: AsyncDatabase = Depends(get_adb)):
     """Lista todos os clientes (pré-cadastro + confirmados)"""
-    db.cursor.execute(
-        """
-        SELECT id, nome, telefone, email, cpf, endereco, status, tem_ficha, data_criacao, 
-               data_cadastro, informacao, valor, funcionario_id
-        FROM clientes
-        ORDER BY nome ASC
-        """
-    )
-    rows = db.cursor.fetchall()
-    return [dict(row) for row in rows]
+    # JSON montado no executor, direto das linhas: com milhares de clientes,
+    # serializar no event loop (jsonable_encoder) travava o worker
+    corpo = await adb.run(_clientes_json, somente_leitura=True)
+    return Response(corpo, media_type="application/json")
 
 
 @router.post("/")
-async def criar_cliente(data: dict, db: Database = Depends(get_db)):
+async def criar_cliente(data: dict, adb: AsyncDatabase = Depends(get_adb)):
     """Cria um novo cliente (pré-cadastro via agendamento ou manual)"""
-    db.cursor.execute(
-        """
-        INSERT INTO clientes (nome, telefone, email, cpf, endereco, status, tem_ficha, data_criacao)
-        VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))
-        """,
-        (
-            data.get("nome"),
-            data.get("telefone"),
-            data.get("email"),
-            data.get("cpf"),
-            data.get("endereco"),
-            data.get("status", "pre_cadastro"),
-            False,
-        ),
-    )
-    db.conn.commit()
-    return {"id": db.cursor.lastrowid, "message": "Cliente criado"}
+    cliente_id = await adb.run(core_clientes.criar_cliente, data)
+    return {"id": cliente_id, "message": "Cliente criado"}
 
 
 @router.put("/{cliente_id}")
-async def atualizar_cliente(cliente_id: int, data: dict, db: Database = Depends(get_db)):
+async def atualizar_cliente(cliente_id: int, data: dict, adb: AsyncDatabase = Depends(get_adb)):
     """Atualiza um cliente (confirma pré-cadastro ou edita dados)"""
-    db.cursor.execute(
-        """
-        UPDATE clientes
-        SET nome = ?, telefone = ?, email = ?, cpf = ?, endereco = ?, status = ?,
-            data_cadastro = ?, informacao = ?, valor = ?, funcionario_id = ?
-        WHERE id = ?
-        """,
-        (
-            data.get("nome"),
-            data.get("telefone"),
-            data.get("email"),
-            data.get("cpf"),
-            data.get("endereco"),
-            data.get("status", "confirmado"),
-            data.get("data_cadastro"),
-            data.get("informacao"),
-            data.get("valor"),
-            data.get("funcionario_id"),
-            cliente_id,
-        ),
-    )
-    db.conn.commit()
+    await adb.run(core_clientes.atualizar_cliente, cliente_id, data)
     return {"message": "Cliente atualizado"}
 
 
 @router.delete("/{cliente_id}")
-async def deletar_cliente(cliente_id: int, db: Database = Depends(get_db)):
+async def deletar_cliente(cliente_id: int, adb: AsyncDatabase = Depends(get_adb)):
     """Deleta um cliente"""
-    db.cursor.execute(
-        """
-        DELETE FROM clientes
-        WHERE id = ?
-        """,
-        (cliente_id,),
-    )
-    db.conn.commit()
+    await adb.run(core_clientes.deletar_cliente, cliente_id)
     return {"message": "Cliente deletado"}
 
 
@@ -100,13 +58,12 @@ async def deletar_cliente(cliente_id: int, db: Database = Depends(get_db)):
 async def upload_ficha(
     cliente_id: int,
     file: UploadFile = File(...),
-    db: Database = Depends(get_db),
+    adb: AsyncDatabase = Depends(get_adb),
 ):
     """Faz upload da ficha de cadastro (foto) para um cliente"""
 
     # Validar se cliente existe
-    db.cursor.execute("SELECT id FROM clientes WHERE id = ?", (cliente_id,))
-    if not db.cursor.fetchone():
+    if not await adb.run(core_clientes.cliente_existe, cliente_id, somente_leitura=True):
         return {"error": "Cliente não encontrado"}, 404
 
     try:
@@ -115,20 +72,11 @@ async def upload_ficha(
         filename = f"cliente_{cliente_id}_{timestamp}_{file.filename}"
         filepath = os.path.join(FICHAS_DIR, filename)
 
-        # Salvar arquivo
-        with open(filepath, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Salvar arquivo (cópia em thread, fora do event loop)
+        await run_in_threadpool(_salvar_arquivo, file.file, filepath)
 
         # Atualizar no banco que tem ficha
-        db.cursor.execute(
-            """
-            UPDATE clientes
-            SET tem_ficha = ?, ficha_path = ?
-            WHERE id = ?
-            """,
-            (True, filepath, cliente_id),
-        )
-        db.conn.commit()
+        await adb.run(core_clientes.registrar_ficha, cliente_id, filepath)
 
         return {
             "success": True,
@@ -142,60 +90,29 @@ async def upload_ficha(
 
 
 @router.get("/{cliente_id}/historico")
-async def listar_historico_cliente(cliente_id: int, db: Database = Depends(get_db)):
+async def listar_historico_cliente(cliente_id: int, adb: AsyncDatabase = Depends(get_adb)):
     """Lista o histórico de atendimentos/pagamentos do cliente.
 
     Se a tabela cliente_historico não existir (ex.: banco novo na Render),
     retorna lista vazia em vez de derrubar o servidor.
     """
-    try:
-        db.cursor.execute(
-            """
-            SELECT id, tipo, descricao, valor, funcionario_id, data_registro
-            FROM cliente_historico
-            WHERE cliente_id = ?
-            ORDER BY data_registro DESC
-            """,
-            (cliente_id,),
-        )
-        rows = db.cursor.fetchall()
-    except sqlite3.OperationalError as e:
-        if "no such table: cliente_historico" in str(e):
-            rows = []
-        else:
-            raise
-
-    return [dict(row) for row in rows]
+    return await adb.run(core_clientes.listar_historico, cliente_id, somente_leitura=True)
 
 
 @router.post("/{cliente_id}/historico")
-async def adicionar_historico(cliente_id: int, data: dict, db: Database = Depends(get_db)):
+async def adicionar_historico(cliente_id: int, data: dict, adb: AsyncDatabase = Depends(get_adb)):
     """Adiciona um novo registro no histórico.
 
     Se a tabela cliente_historico não existir, retorna erro amigável.
     """
 
     # Validar se cliente existe
-    db.cursor.execute("SELECT id FROM clientes WHERE id = ?", (cliente_id,))
-    if not db.cursor.fetchone():
+    if not await adb.run(core_clientes.cliente_existe, cliente_id, somente_leitura=True):
         return {"error": "Cliente não encontrado"}, 404
 
     try:
-        db.cursor.execute(
-            """
-            INSERT INTO cliente_historico (cliente_id, tipo, descricao, valor, funcionario_id, data_registro)
-            VALUES (?, ?, ?, ?, ?, datetime('now'))
-            """,
-            (
-                cliente_id,
-                data.get("tipo"),
-                data.get("descricao"),
-                data.get("valor"),
-                data.get("funcionario_id"),
-            ),
-        )
-        db.conn.commit()
-        return {"id": db.cursor.lastrowid, "message": "Histórico adicionado"}
+        historico_id = await adb.run(core_clientes.adicionar_historico, cliente_id, data)
+        return {"id": historico_id, "message": "Histórico adicionado"}
 
     except sqlite3.OperationalError as e:
         if "no such table: cliente_historico" in str(e):
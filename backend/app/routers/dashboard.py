@@ -0,0 +1,23 @@
+from datetime import date
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import Response
+
+from app.core import dashboard as core_dashboard
+from app.db.database import Database
+from app.db.deps import get_db
+
+router = APIRouter()
+
+
+@router.get("/gestor")
+def dashboard_gestor(db: Database = Depends(get_db)):
+    """
+    Tudo que o painel do gestor mostra ao abrir, em uma resposta:
+    próximos agendamentos, bloqueios ativos, funcionários, solicitações
+    pendentes e faturamento de hoje/semana/mês.
+    """
+    return Response(
+        content=core_dashboard.dashboard_gestor_json(db, date.today()),
+        media_type="application/json",
+    )
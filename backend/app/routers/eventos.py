@@ -0,0 +1,56 @@
+import asyncio
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Header
+from fastapi.responses import StreamingResponse
+
+from app.db.eventos import RESSINCRONIZAR, broker
+
+router = APIRouter()
+
+# comentário SSE periódico: mantém a conexão viva atrás de proxies
+HEARTBEAT_SEGUNDOS = float(os.getenv("EVENTOS_HEARTBEAT", "15"))
+
+
+@router.get("/stream")
+async def stream_eventos(
+    funcionario_id: Optional[int] = None,
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events com as mudanças de agendamentos, bloqueios e
+    solicitações (event: agendamento | bloqueio | solicitacao | funcionario | cliente,
+    data: {"acao": ..., "id": ..., "data": ..., "funcionario_id": ...}).
+
+    Com funcionario_id, só chegam os eventos daquele funcionário. Ao
+    reconectar, o EventSource manda Last-Event-ID e recebe o que perdeu;
+    `event: resync` pede ao cliente que recarregue as telas.
+    """
+    ultimo_id = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    assinatura = broker.assinar(funcionario_id, ultimo_id)
+
+    async def fluxo():
+        try:
+            yield b"retry: 3000\n\n"
+            # desconexão do cliente cancela o gerador (o finally limpa)
+            while True:
+                try:
+                    mensagem = await asyncio.wait_for(
+                        assinatura.fila.get(), timeout=HEARTBEAT_SEGUNDOS
+                    )
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                yield mensagem
+                if assinatura.perdeu_eventos and mensagem is RESSINCRONIZAR:
+                    # fila estourou: encerra; o cliente reconecta e recarrega
+                    break
+        finally:
+            broker.cancelar(assinatura)
+
+    return StreamingResponse(
+        fluxo(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,18 +1,15 @@
-from fastapi import APIRouter, Depends, Request, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
 from datetime import date
 from typing import Dict, Any, Optional
 
 from app.db.database import Database
+from app.db.deps import get_db
 from app.core import financeiro as core_fin
 
 router = APIRouter()
 
 
-def get_db(request: Request) -> Database:
-    return request.app.state.db
-
-
 class PeriodoRequest(BaseModel):
     data_ini: date = Field(..., example="2026-01-01")
     data_fim: date = Field(..., example="2026-01-31")
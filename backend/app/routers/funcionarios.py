@@ -1,19 +1,16 @@
 # backend/app/routers/funcionarios.py
 
-from fastapi import APIRouter, Depends, Request, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 
 from app.db.database import Database
+from app.db.deps import get_db
 from app.core import funcionarios as core_func
 
 router = APIRouter()  # <<< ESTE É O router QUE O main.py PROCURA
 
 
-def get_db(request: Request) -> Database:
-    return request.app.state.db
-
-
 class FuncionarioBase(BaseModel):
     nome: str = Field(..., min_length=1)
     cargo: str
@@ -1,15 +1,13 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends
 from pydantic import BaseModel
 from typing import List, Dict, Any
 
 from app.db.database import Database
+from app.db.deps import get_db
 from app.core import solicitacoes as core_sol
 
 router = APIRouter()
 
-def get_db(request: Request) -> Database:
-    return request.app.state.db
-
 @router.get("/", response_model=List[Dict[str, Any]])
 def listar_solicitacoes(db: Database = Depends(get_db)):
     return core_sol.listar_solicitacoes_pendentes(db)
@@ -0,0 +1,79 @@
+"""
+Base comum dos scripts de benchmark (rodar a partir de backend/):
+
+    python scripts/bench_<nome>.py [opções]
+
+Cada script sobe o app num banco descartável: SQLite num diretório
+temporário ou, com BENCH_DATABASE_URL definida, o PostgreSQL dessa URL
+(o schema public é APAGADO e recriado, como nos testes). O diretório
+temporário também vira o cwd, para os uploads não sujarem o repositório.
+
+`preparar()` tem de rodar antes de qualquer import de `app`: o caminho do
+SQLite e a pasta de uploads são lidos no import.
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def preparar() -> str:
+    """Configura banco e cwd temporários; devolve o nome do banco usado."""
+    if BACKEND not in sys.path:
+        sys.path.insert(0, BACKEND)
+    pasta = tempfile.mkdtemp(prefix="bench_")
+    os.chdir(pasta)
+
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        os.environ.pop("DATABASE_URL", None)
+        os.environ["SQLITE_PATH"] = os.path.join(pasta, "bench.db")
+        return "SQLite"
+
+    import psycopg2
+
+    conn = psycopg2.connect(url)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+    conn.close()
+    os.environ["DATABASE_URL"] = url
+    return "PostgreSQL"
+
+
+@contextlib.contextmanager
+def silencioso():
+    """Esconde os prints do app (conexão, consultas, bloqueios) durante a medição."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def medir(fn, n: int) -> list:
+    """Executa `fn()` n vezes; devolve as durações em segundos."""
+    tempos = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - t0)
+    return tempos
+
+
+def percentis(tempos: list, escala: float = 1000.0) -> tuple:
+    """(p50, p95) das durações, em ms por padrão (escala=1e6 para µs)."""
+    ordenados = sorted(tempos)
+
+    def p(q):
+        return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))] * escala
+
+    return p(0.50), p(0.95)
+
+
+def linha(rotulo: str, tempos: list, unidade: str = "ms") -> str:
+    escala = 1e6 if unidade == "us" else 1000.0
+    p50, p95 = percentis(tempos, escala)
+    return f"  {rotulo:<40} p50 {p50:8.2f} {unidade}   p95 {p95:8.2f} {unidade}   (n={len(tempos)})"
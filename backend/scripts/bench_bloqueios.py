@@ -0,0 +1,106 @@
+"""
+Cache de bloqueios: checagem de bloqueio com o cache frio (limpo antes de
+cada chamada) e quente, numa marcação recusada pelo bloqueio
+(POST /agenda/ -> 400) e direto em Database.verificar_bloqueio. Cada fase
+quente começa com o cache vazio e o preenche pelo próprio caminho medido.
+
+Com o cache quente a checagem ainda lê a versão do funcionário em
+cache_versoes (uma busca pela chave primária), que é o que mantém os
+workers coerentes; o ganho é não reler e decodificar os bloqueios.
+
+    python scripts/bench_bloqueios.py [--dias 20] [-n 2000]
+"""
+
+import argparse
+import json
+from datetime import date, timedelta
+
+import _bench
+
+INICIO = date(2030, 1, 7)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cache de bloqueios: frio vs quente")
+    parser.add_argument("--dias", type=int, default=20, help="dias bloqueados, consultados em ciclo")
+    parser.add_argument("-n", type=int, default=2000)
+    args = parser.parse_args()
+
+    banco = _bench.preparar()
+
+    from fastapi.testclient import TestClient
+    from app.core.bloqueios import cache_bloqueios
+    from app.main import app
+
+    dias = [(INICIO + timedelta(days=i)).isoformat() for i in range(args.dias)]
+
+    with _bench.silencioso(), TestClient(app) as client:
+        storage = app.state.storage
+        funcionario = client.post(
+            "/funcionarios/",
+            json={"nome": "Ana", "cargo": "Tatuador", "perc_funcionario": 70, "requer_aprovacao": False},
+        ).json()["id"]
+        with storage.checkout() as db:
+            for i, dia in enumerate(dias):
+                # metade dia completo, metade só a manhã
+                if i % 2:
+                    db.criar_bloqueio(funcionario, dia, "dia_completo", motivo="folga")
+                else:
+                    manha = json.dumps([f"{h:02d}:{m:02d}" for h in range(9, 12) for m in (0, 30)])
+                    db.criar_bloqueio(funcionario, dia, "horarios_especificos", manha)
+
+        def em_ciclo(fn):
+            proximo = iter(range(10**9))
+            return lambda: fn(dias[next(proximo) % len(dias)])
+
+        def verificar(dia):
+            with storage.checkout() as db:
+                assert db.verificar_bloqueio(funcionario, dia, "10:00") is not None
+
+        def marcar(dia):
+            resposta = client.post("/agenda/", json={
+                "data": dia, "horario": "10:00", "cliente": "Maria", "servico": "rosa",
+                "funcionario_id": funcionario,
+            })
+            assert resposta.status_code == 400, resposta.text
+
+        def frio(fn):
+            def chamada(dia):
+                cache_bloqueios.limpar()
+                fn(dia)
+            return chamada
+
+        def aquecer(fn):
+            # cache vazio, preenchido só pelo próprio caminho medido
+            cache_bloqueios.limpar()
+            for dia in dias:
+                fn(dia)
+            return cache_bloqueios.stats()
+
+        resultados = [
+            ("POST /agenda/ recusado, frio", _bench.medir(em_ciclo(frio(marcar)), args.n // 4), "ms"),
+        ]
+        antes = aquecer(marcar)
+        resultados.append(
+            ("POST /agenda/ recusado, quente", _bench.medir(em_ciclo(marcar), args.n // 4), "ms")
+        )
+        depois = cache_bloqueios.stats()
+        hits_marcacao = depois["hits"] - antes["hits"]
+        misses_marcacao = depois["misses"] - antes["misses"]
+
+        resultados.append(
+            ("verificar_bloqueio, frio", _bench.medir(em_ciclo(frio(verificar)), args.n), "us")
+        )
+        aquecer(verificar)
+        resultados.append(
+            ("verificar_bloqueio, quente", _bench.medir(em_ciclo(verificar), args.n), "us")
+        )
+
+    print(f"📊 Cache de bloqueios ({banco}, {args.dias} dias bloqueados em ciclo)")
+    for rotulo, tempos, unidade in resultados:
+        print(_bench.linha(rotulo, tempos, unidade))
+    print(f"  cache nas marcações quentes: {hits_marcacao} hits, {misses_marcacao} misses")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Custo de conexão por requisição e crescimento de descritores de arquivo.
+
+Compara abrir uma conexão nova por requisição (o que as rotas faziam com
+Database() antes do Storage) com emprestar uma do pool, e depois passa
+requisições de leitura e escrita pelo app (TestClient) contando os
+descritores abertos do processo e as conexões abertas do pool. Sai com
+código 1 se os descritores crescerem além da folga: uma rota voltando a
+abrir conexão sem fechar aparece aqui.
+
+    python scripts/bench_conexoes.py [-n 2000] [--folga 5]
+"""
+
+import argparse
+import os
+import sys
+
+import _bench
+
+
+def descritores() -> int | None:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except FileNotFoundError:  # fora do Linux
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conexão por requisição vs pool")
+    parser.add_argument("-n", type=int, default=2000, help="requisições por rota")
+    parser.add_argument("--folga", type=int, default=5, help="descritores a mais tolerados")
+    args = parser.parse_args()
+
+    banco = _bench.preparar()
+
+    from fastapi.testclient import TestClient
+    from app.db import postgres as postgres_db
+    from app.db import sqlite as sqlite_db
+    from app.db.database import Database
+    from app.main import app
+
+    def conexao_nova():
+        if os.getenv("DATABASE_URL"):
+            conn = postgres_db.conectar_postgres()
+        else:
+            conn = sqlite_db.conectar_sqlite()
+        db = Database(conn)
+        db.cursor.execute("SELECT 1")
+        conn.close()
+
+    with _bench.silencioso(), TestClient(app) as client:
+        storage = app.state.storage
+
+        def do_pool():
+            with storage.checkout() as db:
+                db.cursor.execute("SELECT 1")
+
+        nova = _bench.medir(conexao_nova, min(args.n, 500))
+        pool = _bench.medir(do_pool, args.n)
+
+        funcionario = client.post(
+            "/funcionarios/",
+            json={"nome": "Ana", "cargo": "Tatuador", "perc_funcionario": 70, "requer_aprovacao": False},
+        ).json()["id"]
+        for i in range(20):
+            client.post("/agenda/", json={
+                "data": "2030-01-10", "horario": f"{9 + i // 2:02d}:{30 * (i % 2):02d}",
+                "cliente": f"Cliente {i}", "servico": "rosa", "funcionario_id": funcionario,
+            })
+
+        def requisicao(metodo, url, **kwargs):
+            resposta = client.request(metodo, url, **kwargs)
+            assert resposta.status_code == 200, resposta.text
+
+        fds_antes = descritores()
+        leitura = _bench.medir(lambda: requisicao("GET", "/agenda/2030-01-10"), args.n)
+        escrita = _bench.medir(
+            lambda: requisicao("POST", "/clientes/", json={"nome": "Maria"}), args.n
+        )
+        listagem = _bench.medir(lambda: requisicao("GET", "/clientes/"), args.n // 10)
+        fds_depois = descritores()
+        abertas = storage.stats()["escrita"]["abertas"]
+
+    print(f"📊 Conexões ({banco})")
+    print(_bench.linha("conexão nova por requisição", nova, "us"))
+    print(_bench.linha("checkout do pool", pool, "us"))
+    print(_bench.linha("GET /agenda/{data} (get_db)", leitura))
+    print(_bench.linha("POST /clientes/ (get_adb)", escrita))
+    print(_bench.linha("GET /clientes/ (get_adb)", listagem))
+    print(f"  conexões abertas no pool: {abertas}")
+    if fds_antes is None:
+        print("  descritores: /proc indisponível, contagem ignorada")
+        return
+    print(f"  descritores: {fds_antes} -> {fds_depois}")
+    if fds_depois - fds_antes > args.folga:
+        print(f"❌ descritores cresceram {fds_depois - fds_antes} (folga {args.folga})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
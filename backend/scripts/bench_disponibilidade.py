@@ -0,0 +1,94 @@
+"""
+Tempo do cálculo de disponibilidade (core e GET /agenda/disponibilidade)
+num estúdio cheio: vários funcionários, uma janela longa e a agenda
+ocupada com durações variadas.
+
+    python scripts/bench_disponibilidade.py [--funcionarios 10] [--dias 90]
+        [--agendamentos 1500] [--duracao 90]
+"""
+
+import argparse
+import random
+from datetime import date, timedelta
+
+import _bench
+
+INICIO = date(2030, 1, 7)
+
+
+def popular(storage, funcionarios: int, dias: int, agendamentos: int) -> None:
+    aleatorio = random.Random(42)
+    with storage.checkout() as db:
+        with db.transaction():
+            ids = [
+                db.inserir(
+                    "INSERT INTO funcionarios (nome, cargo) VALUES (?, 'Tatuador')",
+                    (f"Funcionário {i}",),
+                )
+                for i in range(funcionarios)
+            ]
+            linhas = []
+            for _ in range(agendamentos):
+                dia = (INICIO + timedelta(days=aleatorio.randrange(dias))).isoformat()
+                inicio = 9 * 60 + 30 * aleatorio.randrange(18)
+                duracao = aleatorio.choice((30, 60, 90, 120))
+                linhas.append((
+                    dia, f"{inicio // 60:02d}:{inicio % 60:02d}", aleatorio.choice(ids),
+                    duracao, inicio, inicio + duracao,
+                ))
+            db.cursor.executemany(
+                """
+                INSERT INTO agendamentos
+                    (data, horario, servico, funcionario_id, aprovado, duracao, inicio_min, fim_min)
+                VALUES (?, ?, 'tattoo', ?, 1, ?, ?, ?)
+                """,
+                linhas,
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cálculo de disponibilidade num estúdio cheio")
+    parser.add_argument("--funcionarios", type=int, default=10)
+    parser.add_argument("--dias", type=int, default=90, help="tamanho da janela consultada")
+    parser.add_argument("--agendamentos", type=int, default=1500)
+    parser.add_argument("--duracao", type=int, default=90, help="duração do serviço (min)")
+    parser.add_argument("-n", type=int, default=200)
+    args = parser.parse_args()
+
+    banco = _bench.preparar()
+
+    from fastapi.testclient import TestClient
+    from app.core import disponibilidade as core_disp
+    from app.main import app
+
+    data_fim = INICIO + timedelta(days=args.dias - 1)
+    url = (
+        f"/agenda/disponibilidade?data_ini={INICIO}&data_fim={data_fim}"
+        f"&duracao={args.duracao}"
+    )
+
+    with _bench.silencioso(), TestClient(app) as client:
+        storage = app.state.storage
+        popular(storage, args.funcionarios, args.dias, args.agendamentos)
+
+        def no_core():
+            with storage.checkout(somente_leitura=True) as db:
+                core_disp.calcular_disponibilidade(db, INICIO, data_fim, args.duracao)
+
+        def pela_api():
+            resposta = client.get(url)
+            assert resposta.status_code == 200, resposta.text
+
+        core = _bench.medir(no_core, args.n)
+        http = _bench.medir(pela_api, args.n)
+
+    print(
+        f"📊 Disponibilidade ({banco}, {args.funcionarios} funcionários, {args.dias} dias, "
+        f"{args.agendamentos} agendamentos, serviço de {args.duracao} min)"
+    )
+    print(_bench.linha("calcular_disponibilidade", core))
+    print(_bench.linha("GET /agenda/disponibilidade", http))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Latência do /health enquanto o mesmo worker atende listagens de clientes
+e uploads de ficha.
+
+As rotas de clientes rodam o banco e a cópia do arquivo fora do event
+loop; se alguma voltar a bloquear o loop, o p95 do /health com carga
+dispara em relação ao ocioso. O app roda no event loop do próprio script
+(httpx.ASGITransport), como num worker do uvicorn, sem rede no meio.
+
+    python scripts/bench_health.py [--clientes 5000] [--upload-mb 8]
+"""
+
+import argparse
+import asyncio
+import time
+
+import _bench
+
+
+def popular(storage, n: int) -> None:
+    with storage.checkout() as db:
+        with db.transaction():
+            db.cursor.executemany(
+                "INSERT INTO clientes (nome, nome_normalizado, telefone, status)"
+                " VALUES (?, ?, '11999990000', 'pre_cadastro')",
+                [(f"Cliente {i}", f"cliente {i}") for i in range(n)],
+            )
+
+
+async def medir_health(cliente, n: int) -> list:
+    # cada /health é uma tarefa nova, como uma requisição chegando no
+    # worker: só começa quando o loop fica livre, e essa espera conta
+    tempos = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        resposta = await asyncio.create_task(cliente.get("/health"))
+        tempos.append(time.perf_counter() - t0)
+        assert resposta.status_code == 200, resposta.text
+        await asyncio.sleep(0.002)
+    return tempos
+
+
+async def executar(args) -> tuple:
+    import httpx
+    from app import main
+
+    with _bench.silencioso():
+        await main.startup()
+        popular(main.app.state.storage, args.clientes)
+
+    ficha = b"\0" * int(args.upload_mb * 1024 * 1024)
+    transporte = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=60) as c:
+        ocioso = await medir_health(c, args.n)
+
+        parar = asyncio.Event()
+        feitas = {"listagens": 0, "uploads": 0}
+
+        async def carga(i: int):
+            while not parar.is_set():
+                if args.carga == "listagens" or (args.carga == "ambas" and i % 2):
+                    resposta = await c.get("/clientes/")
+                    feitas["listagens"] += 1
+                else:
+                    resposta = await c.post(
+                        "/clientes/1/upload-ficha",
+                        files={"file": ("ficha.png", ficha, "image/png")},
+                    )
+                    feitas["uploads"] += 1
+                assert resposta.status_code == 200, resposta.text
+
+        with _bench.silencioso():
+            tarefas = [asyncio.create_task(carga(i)) for i in range(args.concorrencia)]
+            await asyncio.sleep(0.2)
+            com_carga = await medir_health(c, args.n)
+            parar.set()
+            await asyncio.gather(*tarefas)
+
+    with _bench.silencioso():
+        await main.shutdown()
+    return ocioso, com_carga, feitas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência do /health sob carga de clientes")
+    parser.add_argument("--clientes", type=int, default=5000, help="clientes cadastrados")
+    parser.add_argument("--upload-mb", type=float, default=8, help="tamanho de cada ficha")
+    parser.add_argument("--concorrencia", type=int, default=8, help="requisições de carga simultâneas")
+    parser.add_argument(
+        "--carga", choices=("ambas", "listagens", "uploads"), default="ambas",
+        help="o que as requisições de carga fazem",
+    )
+    parser.add_argument("-n", type=int, default=300, help="amostras do /health")
+    args = parser.parse_args()
+
+    banco = _bench.preparar()
+    ocioso, com_carga, feitas = asyncio.run(executar(args))
+
+    print(f"📊 /health ({banco}, {args.clientes} clientes, fichas de {args.upload_mb:g} MB)")
+    print(_bench.linha("ocioso", ocioso))
+    print(_bench.linha(f"com {args.concorrencia} requisições de carga", com_carga))
+    print(f"  carga atendida: {feitas['listagens']} listagens, {feitas['uploads']} uploads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Fixtures dos testes. Cada teste que usa `conectar`/`db`/`client` roda
+duas vezes: no SQLite (arquivo temporário) e no PostgreSQL apontado por
+TEST_DATABASE_URL (um banco descartável: o schema public é recriado a
+cada teste). Sem TEST_DATABASE_URL, a variante postgres é pulada.
+
+    cd backend
+    TEST_DATABASE_URL=postgresql://localhost/studio_testes python -m pytest
+"""
+
+import functools
+import os
+
+import pytest
+
+from app.core import clientes as core_clientes
+from app.core import dashboard as core_dashboard
+from app.core.bloqueios import cache_bloqueios
+from app.db.database import Database
+from app.db.migrations import aplicar_migracoes
+from app.db.sqlite import conectar_sqlite
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def _recriar_schema_postgres(url: str):
+    from app.db.postgres import conectar_postgres
+
+    conn = conectar_postgres(url)
+    try:
+        cur = conn.cursor()
+        cur.execute("DROP SCHEMA IF EXISTS public CASCADE")
+        cur.execute("CREATE SCHEMA public")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def banco(request, tmp_path):
+    """("sqlite", caminho) ou ("postgres", url) de um banco vazio."""
+    if request.param == "sqlite":
+        return "sqlite", str(tmp_path / "teste.db")
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL não definida")
+    _recriar_schema_postgres(TEST_DATABASE_URL)
+    return "postgres", TEST_DATABASE_URL
+
+
+@pytest.fixture
+def conectar(banco):
+    """Factory de conexões novas com o banco de teste; fecha todas no fim."""
+    tipo, alvo = banco
+    abertas = []
+
+    def nova():
+        if tipo == "sqlite":
+            conn = conectar_sqlite(alvo)
+        else:
+            from app.db.postgres import conectar_postgres
+
+            conn = conectar_postgres(alvo)
+        abertas.append(conn)
+        return conn
+
+    yield nova
+    for conn in abertas:
+        conn.close()
+
+
+@pytest.fixture(autouse=True)
+def caches_limpos():
+    # caches por processo: cada teste começa de um banco novo
+    cache_bloqueios.limpar()
+    core_clientes.cache_nomes.limpar()
+    core_dashboard.limpar_cache()
+    yield
+
+
+@pytest.fixture
+def db(conectar) -> Database:
+    """Database já migrado até a última versão."""
+    db = Database(conectar())
+    aplicar_migracoes(db)
+    return db
+
+
+@pytest.fixture
+def client(banco, monkeypatch):
+    """TestClient da API inteira sobre o banco de teste."""
+    from fastapi.testclient import TestClient
+
+    from app import main
+    from app.db.storage import Storage
+
+    tipo, alvo = banco
+    if tipo == "sqlite":
+        monkeypatch.delenv("DATABASE_URL", raising=False)
+        monkeypatch.setattr(main, "Storage", functools.partial(Storage, path=alvo, modo="pool"))
+    else:
+        monkeypatch.setenv("DATABASE_URL", alvo)
+        monkeypatch.setattr(main, "Storage", functools.partial(Storage, modo="postgres"))
+    with TestClient(main.app) as c:
+        yield c
+
+
+@pytest.fixture
+def funcionario(db) -> int:
+    with db.transaction():
+        return db.inserir(
+            "INSERT INTO funcionarios (nome, cargo, requer_aprovacao) VALUES (?, ?, 0)",
+            ("Ana", "Tatuador"),
+        )
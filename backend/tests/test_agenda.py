@@ -0,0 +1,199 @@
+"""Fluxos da agenda pela API, nos dois bancos."""
+
+import json
+
+import pytest
+
+from app.core import agenda as core_agenda
+
+DIA = "2030-01-10"
+
+
+def _ok(resposta):
+    assert resposta.status_code == 200, resposta.text
+    return resposta.json()
+
+
+@pytest.fixture
+def ana(client) -> int:
+    return _ok(client.post(
+        "/funcionarios/",
+        json={"nome": "Ana", "cargo": "Tatuador", "perc_funcionario": 70, "requer_aprovacao": False},
+    ))["id"]
+
+
+def _agendar(client, funcionario_id, horario, duracao=None, data=DIA):
+    payload = {
+        "data": data, "horario": horario, "cliente": "Maria", "servico": "rosa",
+        "funcionario_id": funcionario_id, "valor_previsto": 300,
+    }
+    if duracao is not None:
+        payload["duracao"] = duracao
+    return client.post("/agenda/", json=payload)
+
+
+def _do_dia(client, data=DIA):
+    return _ok(client.get(f"/agenda/{data}"))
+
+
+def test_pagamento_com_historico_falhando_nao_grava_pagamento(client, ana):
+    _ok(_agendar(client, ana, "10:00"))
+    ag = _do_dia(client)[0]
+    with client.app.state.storage.checkout() as db:
+        # histórico indisponível: o INSERT do registro vai falhar
+        db.cursor.execute("ALTER TABLE cliente_historico RENAME TO cliente_historico_fora")
+        db.conn.commit()
+
+    with pytest.raises(Exception):
+        client.put(f"/agenda/{ag['id']}/pagamento-com-historico", json={"pago": True})
+
+    assert not _do_dia(client)[0]["pago"]
+
+
+def test_pagamento_com_historico_grava_os_dois(client, ana):
+    _ok(_agendar(client, ana, "10:00"))
+    ag = _do_dia(client)[0]
+    _ok(client.put(f"/agenda/{ag['id']}/pagamento-com-historico", json={"pago": True}))
+
+    assert _do_dia(client)[0]["pago"]
+    cliente = _ok(client.get("/clientes/"))[0]
+    historico = _ok(client.get(f"/clientes/{cliente['id']}/historico"))
+    assert [h["tipo"] for h in historico] == ["pagamento"]
+
+
+def _legado(client, funcionario_id, horario, inicio_min, fim_min):
+    """Agendamento gravado direto no banco, sem passar pela checagem de conflito."""
+    with client.app.state.storage.checkout() as db:
+        with db.transaction():
+            return db.inserir(
+                """
+                INSERT INTO agendamentos
+                    (data, horario, servico, funcionario_id, aprovado, duracao, inicio_min, fim_min)
+                VALUES (?, ?, 'legado', ?, 1, ?, ?, ?)
+                """,
+                (
+                    DIA, horario, funcionario_id,
+                    None if inicio_min is None else fim_min - inicio_min, inicio_min, fim_min,
+                ),
+            )
+
+
+def test_conflito_com_agendamento_longo_antigo_ja_sobreposto(client, ana):
+    # 10:00-13:00 e 10:30-11:00 já se sobrepunham antes da checagem existir
+    longo = _legado(client, ana, "10:00", 600, 780)
+    _legado(client, ana, "10:30", 630, 660)
+
+    resposta = _agendar(client, ana, "12:00")
+    assert resposta.status_code == 409
+    assert "10:00" in resposta.json()["detail"]
+
+    _ok(_agendar(client, ana, "13:00"))
+    pares = _ok(client.get("/admin/agenda/sobreposicoes"))
+    assert [(p["agendamento_id"], p["horario"], p["outro_horario"]) for p in pares] == [
+        (longo, "10:00", "10:30")
+    ]
+
+
+def test_agendamento_sem_minutos_conta_como_conflito(client, ana):
+    _legado(client, ana, "de manhã", None, None)
+    assert _agendar(client, ana, "15:00").status_code == 409
+
+
+def test_horario_ilegivel_e_recusado(client, ana):
+    resposta = _agendar(client, ana, "10h")
+    assert resposta.status_code == 400
+    assert _do_dia(client) == []
+
+
+def test_encaixe_sem_sobreposicao_e_aceito(client, ana):
+    _ok(_agendar(client, ana, "10:00", duracao=60))
+    _ok(_agendar(client, ana, "11:00"))
+    _ok(_agendar(client, ana, "09:30"))
+    assert _agendar(client, ana, "10:30").status_code == 409
+
+
+def test_periodo_em_ndjson_le_com_a_conexao_da_requisicao(client, ana):
+    for horario in ("09:00", "10:00", "11:00"):
+        _ok(_agendar(client, ana, horario))
+    _ok(_agendar(client, ana, "10:00", data="2030-01-11"))
+
+    resposta = client.get("/agenda/agenda-periodo/2030-01-10/2030-01-11?formato=ndjson")
+    assert resposta.status_code == 200, resposta.text
+    assert resposta.headers["content-type"].startswith("application/x-ndjson")
+    linhas = [json.loads(linha) for linha in resposta.text.splitlines()]
+    assert [(a["data"], a["horario"]) for a in linhas] == [
+        (DIA, "09:00"), (DIA, "10:00"), (DIA, "11:00"), ("2030-01-11", "10:00"),
+    ]
+    # a conexão voltou ao pool depois do streaming
+    assert client.app.state.storage.stats()["escrita"]["em_uso"] == 0
+
+
+def _bloquear(client, funcionario_id, horarios=None, data=DIA):
+    payload = {"funcionario_id": funcionario_id, "data": data, "tipo_bloqueio": "dia_completo"}
+    if horarios is not None:
+        payload.update(tipo_bloqueio="horarios_especificos", horarios_bloqueados=json.dumps(horarios))
+    return _ok(client.post("/bloqueios/", json=payload))
+
+
+def test_bloqueio_recusa_marcacao_sem_gravar_nada(client, ana):
+    _bloquear(client, ana, ["11:00"])
+
+    resposta = _agendar(client, ana, "10:30", duracao=60)
+    assert resposta.status_code == 400
+    assert "11:00" not in resposta.json()["detail"]
+    assert "10:30 está bloqueado" in resposta.json()["detail"]
+    assert _do_dia(client) == []
+    # o cliente da marcação recusada também não fica gravado
+    assert _ok(client.get("/clientes/")) == []
+
+    _bloquear(client, ana, data="2030-01-11")
+    resposta = _agendar(client, ana, "15:00", data="2030-01-11")
+    assert resposta.status_code == 400
+    assert "completamente" in resposta.json()["detail"]
+
+
+def test_remarcar_sem_duracao_usa_a_duracao_gravada_no_bloqueio(client, ana):
+    _ok(_agendar(client, ana, "14:00", duracao=120))
+    ag = _do_dia(client)[0]
+    _bloquear(client, ana, ["11:00"])
+
+    remarcacao = {
+        "data": DIA, "horario": "10:00", "cliente": "Maria", "servico": "rosa",
+        "funcionario_id": ana, "valor_previsto": 300,
+    }
+    # 10:00 + 120 min passa pelo slot das 11:00
+    resposta = client.put(f"/agenda/{ag['id']}", json=remarcacao)
+    assert resposta.status_code == 400
+    assert "bloqueado" in resposta.json()["detail"]
+    assert _do_dia(client)[0]["horario"] == "14:00"
+
+    _ok(client.put(f"/agenda/{ag['id']}", json={**remarcacao, "horario": "09:00", "duracao": 60}))
+    assert _do_dia(client)[0]["horario"] == "09:00"
+
+
+def test_duracao_acima_do_teto_e_recusada(client, ana):
+    resposta = _agendar(client, ana, "10:00", duracao=core_agenda.DURACAO_MAXIMA + 1)
+    assert resposta.status_code == 400
+    assert _do_dia(client) == []
+
+
+def test_agendamento_antigo_mais_longo_que_o_teto_alarga_a_checagem(client, ana, monkeypatch):
+    monkeypatch.setattr(core_agenda, "janela_conflito", core_agenda.janela_conflito)
+    # 00:30 até 1h depois do fim da janela normal: gravado antes do teto
+    fim = 30 + core_agenda.DURACAO_MAXIMA + 60
+    _legado(client, ana, "00:30", 30, fim)
+    with client.app.state.storage.checkout() as db:
+        assert core_agenda.ajustar_janela_conflito(db) == fim - 30
+
+    resposta = _agendar(client, ana, f"{(fim - 30) // 60:02d}:{(fim - 30) % 60:02d}")
+    assert resposta.status_code == 409
+    assert "00:30" in resposta.json()["detail"]
+
+
+def test_atualizar_agendamento_inexistente_nao_cria_cliente(client, ana):
+    resposta = _ok(client.put("/agenda/999", json={
+        "data": DIA, "horario": "10:00", "cliente": "Fulano Novo", "servico": "rosa",
+        "funcionario_id": ana,
+    }))
+    assert resposta["ok"] is False
+    assert _ok(client.get("/clientes/")) == []
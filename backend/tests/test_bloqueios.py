@@ -0,0 +1,43 @@
+"""Rotas de bloqueios pela API."""
+
+import functools
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.db.storage import Storage
+
+DIA = "2030-01-10"
+
+
+@pytest.fixture
+def client_wal(tmp_path, monkeypatch):
+    """App no modo WAL: uma conexão de escrita e um pool de leitura."""
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setattr(
+        main, "Storage", functools.partial(Storage, path=str(tmp_path / "wal.db"), modo="wal")
+    )
+    with TestClient(main.app) as c:
+        yield c
+
+
+def test_verificar_lote_usa_as_conexoes_de_leitura(client_wal):
+    ana = client_wal.post(
+        "/funcionarios/",
+        json={"nome": "Ana", "cargo": "Tatuador", "perc_funcionario": 70, "requer_aprovacao": False},
+    ).json()["id"]
+    client_wal.post("/bloqueios/", json={"funcionario_id": ana, "data": DIA, "tipo_bloqueio": "dia_completo"})
+
+    storage = client_wal.app.state.storage
+    escrita = storage.stats()["escrita"]["checkouts"]
+    leitura = storage.stats()["leitura"]["checkouts"]
+    resposta = client_wal.post("/bloqueios/verificar-lote", json={"candidatos": [
+        {"funcionario_id": ana, "data": DIA, "horario": "10:00"},
+        {"funcionario_id": ana, "data": "2030-01-11", "horario": "10:00"},
+    ]})
+
+    assert resposta.status_code == 200, resposta.text
+    assert [r["bloqueado"] for r in resposta.json()["resultados"]] == [True, False]
+    assert storage.stats()["escrita"]["checkouts"] == escrita
+    assert storage.stats()["leitura"]["checkouts"] == leitura + 1
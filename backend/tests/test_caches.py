@@ -0,0 +1,137 @@
+"""
+Caches em memória com vários workers: uma escrita feita em outro processo
+não passa pelo descarte local deste nem pelos eventos dele, só pelas
+versões no banco (cache_versoes, agenda_versoes). Aqui o "outro worker" é
+outra conexão com o descarte local e a publicação de eventos desligados.
+"""
+
+import json
+from datetime import date
+
+import pytest
+
+from app.core import agenda as core_agenda
+from app.core import clientes as core_clientes
+from app.core import dashboard as core_dashboard
+from app.core.bloqueios import cache_bloqueios
+from app.db import eventos
+from app.db.database import Database
+
+DIA = "2030-01-10"
+
+
+@pytest.fixture
+def outro_worker(conectar, monkeypatch):
+    monkeypatch.setattr(cache_bloqueios, "esquecer", lambda *a, **k: None)
+    monkeypatch.setattr(core_clientes.cache_nomes, "esquecer_cliente", lambda *a, **k: None)
+    monkeypatch.setattr(eventos.broker, "publicar", lambda *a, **k: None)
+    return Database(conectar())
+
+
+def test_bloqueio_criado_em_outro_worker_invalida_o_cache(db, funcionario, outro_worker):
+    assert db.verificar_bloqueio(funcionario, DIA, "10:00") is None
+    hits = cache_bloqueios.stats()["hits"]
+    assert db.verificar_bloqueio(funcionario, DIA, "10:00") is None
+    assert cache_bloqueios.stats()["hits"] > hits
+
+    desatualizados = cache_bloqueios.stats()["desatualizados"]
+    outro_worker.criar_bloqueio(funcionario, DIA, "dia_completo", motivo="médico")
+
+    bloqueio = db.verificar_bloqueio(funcionario, DIA, "10:00")
+    assert bloqueio is not None and bloqueio["motivo"] == "médico"
+    assert cache_bloqueios.stats()["desatualizados"] == desatualizados + 1
+
+
+def test_bloqueio_removido_em_outro_worker_libera_o_horario(db, funcionario, outro_worker):
+    bloqueio_id = db.criar_bloqueio(funcionario, DIA, "dia_completo")
+    assert db.verificar_bloqueio(funcionario, DIA, "10:00") is not None
+
+    outro_worker.remover_bloqueio(bloqueio_id)
+
+    assert db.verificar_bloqueio(funcionario, DIA, "10:00") is None
+
+
+def test_cliente_removido_em_outro_worker_nao_fica_no_cache_de_nomes(db, outro_worker):
+    antigo = core_agenda.obter_ou_criar_cliente(db, "Maria")
+    assert core_agenda.obter_ou_criar_cliente(db, " maria ") == antigo
+
+    core_clientes.deletar_cliente(outro_worker, antigo)
+
+    novo = core_agenda.obter_ou_criar_cliente(db, "Maria")
+    assert novo != antigo
+    assert core_clientes.cliente_existe(db, novo)
+
+
+def test_agendamento_criado_em_outro_worker_renova_o_dashboard(db, funcionario, outro_worker):
+    hoje = date(2030, 1, 10)
+    corpo = core_dashboard.dashboard_gestor_json(db, hoje)
+    assert core_dashboard.dashboard_gestor_json(db, hoje) is corpo
+    assert json.loads(corpo)["proximos"] == []
+
+    with outro_worker.transaction():
+        outro_worker.criar_agendamento(
+            "2030-01-11", "10:00", None, "rosa", "tattoo", 300.0, funcionario,
+            inicio_min=600,
+        )
+
+    proximos = json.loads(core_dashboard.dashboard_gestor_json(db, hoje))["proximos"]
+    assert [p["data"] for p in proximos] == ["2030-01-11"]
+
+
+def test_funcionario_criado_em_outro_worker_aparece_no_dashboard(db, funcionario, outro_worker):
+    hoje = date(2030, 1, 10)
+    funcionarios = json.loads(core_dashboard.dashboard_gestor_json(db, hoje))["funcionarios"]
+    assert len(funcionarios) == 1
+
+    outro_worker.criar_funcionario("Bia", "Tatuador", 70, 0)
+
+    funcionarios = json.loads(core_dashboard.dashboard_gestor_json(db, hoje))["funcionarios"]
+    assert sorted(f["nome"] for f in funcionarios) == ["Ana", "Bia"]
+
+
+def test_checagem_da_marcacao_usa_o_cache(client):
+    ana = client.post(
+        "/funcionarios/",
+        json={"nome": "Ana", "cargo": "Tatuador", "perc_funcionario": 70, "requer_aprovacao": False},
+    ).json()["id"]
+    client.post("/bloqueios/", json={"funcionario_id": ana, "data": DIA, "tipo_bloqueio": "dia_completo"})
+
+    def marcar():
+        return client.post("/agenda/", json={
+            "data": DIA, "horario": "10:00", "cliente": "Maria", "servico": "rosa",
+            "funcionario_id": ana,
+        })
+
+    assert marcar().status_code == 400
+    antes = cache_bloqueios.stats()
+    assert marcar().status_code == 400
+    depois = cache_bloqueios.stats()
+    assert depois["hits"] == antes["hits"] + 1
+    assert depois["misses"] == antes["misses"]
+
+
+def test_leitura_na_transacao_que_criou_o_bloqueio_nao_fica_no_cache(db, funcionario):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.criar_bloqueio(funcionario, DIA, "dia_completo")
+            assert db.verificar_bloqueio(funcionario, DIA, "10:00") is not None
+            raise RuntimeError("desfaz")
+
+    assert cache_bloqueios.stats()["tamanho"] == 0
+    assert db.verificar_bloqueio(funcionario, DIA, "10:00") is None
+
+
+def test_leitura_antes_de_escrever_bloqueio_na_mesma_transacao(db, funcionario):
+    # lida antes da escrita: estado confirmado, pode ficar no cache; a
+    # escrita a descarta e o rollback devolve a versão lida
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            assert db.verificar_bloqueio(funcionario, DIA, "10:00") is None
+            db.criar_bloqueio(funcionario, DIA, "dia_completo")
+            assert db.verificar_bloqueio(funcionario, DIA, "10:00") is not None
+            raise RuntimeError("desfaz")
+
+    assert db.verificar_bloqueio(funcionario, DIA, "10:00") is None
+    hits = cache_bloqueios.stats()["hits"]
+    assert db.verificar_bloqueio(funcionario, DIA, "10:00") is None
+    assert cache_bloqueios.stats()["hits"] == hits + 1
@@ -0,0 +1,127 @@
+"""
+Camada de banco nos dois dialetos: migrações, ids gerados, tradução do
+SQL do app e as travas que serializam escritas na agenda.
+"""
+
+import re
+import threading
+
+import pytest
+
+from app.db.database import Database
+from app.db.dialect import traduzir_para_postgres
+from app.db.migrations import MIGRACOES, aplicar_migracoes, ultima_versao, versao_atual
+
+FORMATO_DATA_HORA = r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d"
+
+
+def test_traducao_preserva_strings_e_comentarios():
+    sql = "SELECT '?', nome FROM t WHERE a = ? AND b LIKE '5%' -- e ?\n"
+    assert traduzir_para_postgres(sql, True) == (
+        "SELECT '?', nome FROM t WHERE a = %s AND b LIKE '5%%' -- e ?\n"
+    )
+    assert traduzir_para_postgres("SELECT datetime('now')", False) == (
+        "SELECT to_char(now(), 'YYYY-MM-DD HH24:MI:SS')"
+    )
+
+
+def test_migracoes_chegam_na_ultima_versao(db):
+    assert versao_atual(db.cursor) == ultima_versao()
+    assert {"mascara", "data_fim"} <= db.dialeto.colunas(db.cursor, "bloqueios")
+    assert {"duracao", "inicio_min", "fim_min"} <= db.dialeto.colunas(db.cursor, "agendamentos")
+    assert "nome_normalizado" in db.dialeto.colunas(db.cursor, "clientes")
+
+
+def test_migracoes_nao_reaplicam(db, conectar):
+    # segundo worker subindo com o banco já migrado
+    outro = Database(conectar())
+    assert aplicar_migracoes(outro) == ultima_versao()
+    outro.cursor.execute("SELECT COUNT(*) FROM schema_version")
+    assert outro.cursor.fetchone()[0] == len(MIGRACOES)
+
+
+def test_inserir_devolve_id_gerado(db):
+    with db.transaction():
+        primeiro = db.inserir("INSERT INTO funcionarios (nome) VALUES (?)", ("Ana",))
+        segundo = db.inserir("INSERT INTO funcionarios (nome) VALUES (?);", ("Bia",))
+    assert segundo > primeiro
+    db.cursor.execute("SELECT nome FROM funcionarios WHERE id = ?", (segundo,))
+    assert db.cursor.fetchone()[0] == "Bia"
+
+
+def test_inserir_ou_ignorar_devolve_none_se_ja_existe(db):
+    sql = (
+        "INSERT INTO clientes (nome, nome_normalizado) VALUES (?, ?) "
+        "ON CONFLICT (nome_normalizado) DO NOTHING"
+    )
+    with db.transaction():
+        novo = db.inserir_ou_ignorar(sql, ("Carla", "carla"))
+        repetido = db.inserir_ou_ignorar(sql, ("CARLA", "carla"))
+    assert novo is not None
+    assert repetido is None
+
+
+def test_datetime_now_grava_texto_no_formato_do_sqlite(db):
+    with db.transaction():
+        cliente_id = db.inserir(
+            "INSERT INTO clientes (nome, nome_normalizado) VALUES (?, ?)", ("Dani", "dani")
+        )
+        db.cursor.execute(
+            """
+            INSERT INTO cliente_historico (cliente_id, tipo, descricao, data_registro)
+            VALUES (?, 'nota', '50% pago', datetime('now'))
+            """,
+            (cliente_id,),
+        )
+    db.cursor.execute(
+        "SELECT data_registro, created_at, descricao FROM cliente_historico WHERE cliente_id = ?",
+        (cliente_id,),
+    )
+    registro, criado, descricao = db.cursor.fetchone()
+    assert re.fullmatch(FORMATO_DATA_HORA, registro)
+    # DEFAULT CURRENT_TIMESTAMP também vira texto no PostgreSQL
+    assert re.fullmatch(FORMATO_DATA_HORA, criado)
+    assert descricao == "50% pago"
+
+
+def test_trava_da_agenda_serializa_escritas_no_mesmo_dia(db, conectar, funcionario):
+    outro = Database(conectar())
+    ordem = []
+
+    def segunda_escrita():
+        with outro.transaction():
+            outro.dialeto.travar_agenda(outro.cursor, funcionario, "2030-01-10")
+            ordem.append("segunda")
+
+    with db.transaction():
+        db.dialeto.travar_agenda(db.cursor, funcionario, "2030-01-10")
+        t = threading.Thread(target=segunda_escrita)
+        t.start()
+        t.join(0.5)
+        assert t.is_alive(), "a segunda escrita não esperou a trava"
+        ordem.append("primeira")
+    t.join(10)
+    assert ordem == ["primeira", "segunda"]
+
+
+def _tenta_travar(db: Database, funcionario_id: int, data: str) -> bool:
+    db.cursor.execute(
+        "SELECT pg_try_advisory_xact_lock(?, hashtext(?))", (funcionario_id, data)
+    )
+    conseguiu = db.cursor.fetchone()[0]
+    db.conn.rollback()
+    return conseguiu
+
+
+def test_advisory_lock_vale_por_funcionario_e_dia(db, conectar, funcionario):
+    if not db.is_postgres:
+        pytest.skip("no SQLite a trava de escrita é do banco inteiro")
+    outro = Database(conectar())
+    with db.transaction():
+        db.dialeto.travar_agenda_dias(db.cursor, funcionario, ["2030-01-12", "2030-01-10"])
+        assert not _tenta_travar(outro, funcionario, "2030-01-10")
+        assert not _tenta_travar(outro, funcionario, "2030-01-12")
+        assert _tenta_travar(outro, funcionario, "2030-01-11")
+        assert _tenta_travar(outro, funcionario + 1, "2030-01-10")
+    # liberada no commit
+    assert _tenta_travar(outro, funcionario, "2030-01-10")
@@ -0,0 +1,131 @@
+"""
+As consultas quentes não podem cair em varredura de tabela: cada uma roda
+num banco SQLite migrado, o SQL executado é capturado (já com os
+parâmetros) e nenhum passo do EXPLAIN QUERY PLAN pode ser um SCAN.
+"""
+
+import sqlite3
+
+import pytest
+
+from app.core import agenda as core_agenda
+from app.core import clientes as core_clientes
+from app.core import solicitacoes as core_sol
+from app.db.database import Database
+from app.db.migrations import aplicar_migracoes
+from app.db.sqlite import conectar_sqlite
+
+DIA = "2030-01-10"
+FIM = "2030-01-31"
+
+
+def _conflito(db):
+    with db.transaction():
+        core_agenda.verificar_conflito(db, 1, DIA, 600, 660)
+
+
+CONSULTAS = {
+    "agenda do dia": lambda db: db.get_agendamentos_por_dia(DIA),
+    "agenda do dia por funcionário": lambda db: db.get_agendamentos_por_dia_e_funcionario(DIA, 1),
+    "agenda do período": lambda db: db.get_agendamentos_por_periodo(DIA, FIM),
+    "agenda do funcionário no período": (
+        lambda db: db.get_agendamentos_funcionario_periodo(DIA, FIM, 1)
+    ),
+    "página do período": (
+        lambda db: db.cursor_agendamentos_periodo(DIA, FIM, None, (DIA, "10:00", 1), 101).fetchall()
+    ),
+    "conflito de horário": _conflito,
+    "financeiro do período": lambda db: db.calcularfinanceiroperiodo(DIA, FIM),
+    "bloqueios do dia": lambda db: db.verificar_bloqueio(1, DIA, "10:00", 60),
+    "bloqueios do funcionário": lambda db: db.listar_bloqueios_por_funcionario(1),
+    "bloqueios ativos": (
+        lambda db: db.cursor_bloqueios_ativos(DIA, FIM, None, (DIA, 1, 1), 101).fetchall()
+    ),
+    "bloqueios ativos do funcionário": (
+        lambda db: db.cursor_bloqueios_ativos(DIA, FIM, 1).fetchall()
+    ),
+    "cliente por nome normalizado": lambda db: core_agenda.obter_ou_criar_cliente(db, "Maria"),
+    "solicitações pendentes": core_sol.listar_solicitacoes_pendentes,
+    "histórico do cliente": lambda db: core_clientes.listar_historico(db, 1),
+}
+
+
+@pytest.fixture(scope="module")
+def db_sqlite(tmp_path_factory):
+    caminho = tmp_path_factory.mktemp("planos") / "teste.db"
+    db = Database(conectar_sqlite(str(caminho)))
+    aplicar_migracoes(db)
+    yield db
+    db.conn.close()
+
+
+def _planos(db: Database, chamada) -> dict:
+    """SELECT executados pela chamada -> passos do EXPLAIN QUERY PLAN."""
+    executados = []
+    db.conn.set_trace_callback(executados.append)
+    try:
+        chamada(db)
+    finally:
+        db.conn.set_trace_callback(None)
+
+    cur = db.conn.cursor(sqlite3.Cursor)
+    planos = {}
+    for sql in executados:
+        if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            continue
+        cur.execute("EXPLAIN QUERY PLAN " + sql)
+        planos[" ".join(sql.split())] = [row[3] for row in cur.fetchall()]
+    cur.close()
+    return planos
+
+
+@pytest.mark.parametrize("nome", sorted(CONSULTAS))
+def test_consulta_quente_usa_indice(db_sqlite, nome):
+    planos = _planos(db_sqlite, CONSULTAS[nome])
+    assert planos, f"{nome}: nenhum SELECT executado"
+    varreduras = {
+        sql: passos
+        for sql, passos in planos.items()
+        if any(p.startswith("SCAN") for p in passos)
+    }
+    assert not varreduras, varreduras
+
+
+def _passos_da_checagem(db: Database, inicio_min: int) -> int:
+    """Instruções da VM do SQLite gastas por uma checagem de conflito."""
+    passos = [0]
+
+    def contar():
+        passos[0] += 1
+        return 0
+
+    db.conn.set_progress_handler(contar, 10)
+    try:
+        with db.transaction():
+            core_agenda.verificar_conflito(db, 2, DIA, inicio_min, inicio_min + 30)
+    finally:
+        db.conn.set_progress_handler(None, 0)
+    return passos[0]
+
+
+def _encher_dia(db: Database, inicio: int, fim: int, por_minuto: int) -> None:
+    """Agendamentos de 1 minuto (legados, sobrepostos) entre inicio e fim."""
+    with db.transaction():
+        db.cursor.executemany(
+            """
+            INSERT INTO agendamentos (data, horario, servico, funcionario_id, duracao, inicio_min, fim_min)
+            VALUES (?, '00:00', 'legado', 2, 1, ?, ?)
+            """,
+            [(DIA, m, m + 1) for m in range(inicio, fim) for _ in range(por_minuto)],
+        )
+
+
+def test_checagem_de_conflito_nao_cresce_com_o_resto_do_dia(db_sqlite):
+    # só o que começa a menos de DURACAO_MAXIMA minutos antes do intervalo
+    # (ou dentro dele) entra na busca: o meio do dia cheio não pode pesar
+    # na checagem das 00:00 nem na das 23:00
+    noite = 23 * 60
+    antes = (_passos_da_checagem(db_sqlite, 0), _passos_da_checagem(db_sqlite, noite))
+    _encher_dia(db_sqlite, 60, noite - core_agenda.DURACAO_MAXIMA, por_minuto=10)
+    depois = (_passos_da_checagem(db_sqlite, 0), _passos_da_checagem(db_sqlite, noite))
+    assert all(d <= a + 1 for a, d in zip(antes, depois)), (antes, depois)